@@ -16,18 +16,20 @@
 
 """ Collector Widget.
 """
-from __future__ import print_function
+from __future__ import division, print_function
 
-import logging, os
+import logging, math, os
 import numpy as np
-import numpy.ma as ma
 
 from argos.collect.collectortree import CollectorTree, CollectorSpinBox
+from argos.collect.playback import SlicePlayer, DEFAULT_PLAYBACK_FPS, PLAYBACK_FPS_CHOICES
+from argos.collect.reduction import Reduction, NO_REDUCTION, REDUCER_NAMES
+from argos.collect.slicecache import SliceCache, sliceKey, readSliceUncached, REGION_TILE_SIZE
+from argos.collect.slicefetcher import SliceFetcher
 from argos.inspector.abstract import UpdateReason
 from argos.qt import Qt, QtWidgets, QtGui, QtCore, QtSignal, QtSlot
 from argos.repo.baserti import BaseRti
-from argos.utils.cls import check_class, check_is_a_sequence, check_is_an_array, is_an_array
-from argos.utils.masks import ArrayWithMask
+from argos.utils.cls import check_class, check_is_a_sequence, check_is_an_array
 from argos.widgets.constants import TOP_DOCK_HEIGHT, DOCK_SPACING, DOCK_MARGIN
 
 logger = logging.getLogger(__name__)
@@ -36,6 +38,23 @@ FAKE_DIM_NAME = '-'     # The name of the fake dimension with length 1
 FAKE_DIM_OFFSET = 1000  # Fake dimensions start here (so all arrays must have a smaller ndim)
 
 
+
+def levelOfDetailStep(numElements, numPixels):
+    """ Returns the step with which numElements are read to display them on numPixels pixels.
+
+        The step is rounded down to a power of two, so that small zoom changes don't result in a
+        new read. Returns 1 (full resolution) if the number of pixels is unknown.
+    """
+    if not numPixels or numPixels <= 0 or numElements <= numPixels:
+        return 1
+    return 2 ** int(math.floor(math.log(numElements / numPixels, 2)))
+
+
+PREFETCH_NUM_SLICES = 5         # Number of slices that are prefetched in both directions
+PREFETCH_CACHE_FRACTION = 0.5   # Prefetching may use at most this fraction of the slice cache
+REGION_MARGIN_FRACTION = 0.5    # Margin around the visible region, as fraction of its length
+
+
 # Qt classes have many ancestors
 #pylint: disable=R0901
 
@@ -49,6 +68,7 @@ class Collector(QtWidgets.QWidget):
         itself.
     """
     sigContentsChanged = QtSignal(str) # one of the UpdateReason values.
+    sigSliceLoading = QtSignal(bool)   # True when a slice is being read in the background.
 
     def __init__(self, windowNumber):
         """ Constructor
@@ -67,6 +87,37 @@ class Collector(QtWidgets.QWidget):
         self._comboBoxes = []        # Will be set in clearAndSetComboBoxes
         self._spinBoxes = []         # Will be set in createSpinBoxes
 
+        # Spin box dimensions can be reduced over a range from the spin box value up to and
+        # including the value of the range end spin box.
+        self._reducerComboBoxes = []  # Will be set in createSpinBoxes
+        self._rangeEndSpinBoxes = []  # Will be set in createSpinBoxes
+
+        # Slices requested by the spin boxes are read in a worker thread.
+        self._isLoading = False
+        self._requestedSlice = None  # (rti, sliceTuple, reason) of the pending request
+        self._fetchedSlice = None    # (rti, sliceKey, slicedArray) of the last fetched slice
+        self._sliceFetcher = SliceFetcher(parent=self)
+        self._sliceFetcher.sigSliceFetched.connect(self._sliceFetched)
+        self._lastSpinBoxValues = {} # dim_nr to value, used to determine the stepping direction
+        self._lastChangedSpinBox = None
+
+        # Inspectors that read blocks themselves don't need the complete slice to be fetched.
+        self._blockReading = False
+
+        # Each spin box has a play button. At most one dimension is played at the time.
+        self._playButtons = []       # Will be set in createSpinBoxes
+        self._slicePlayer = SlicePlayer(parent=self)
+        self._slicePlayer.sigFrame.connect(self._playbackFrame)
+        self._slicePlayer.sigStatistics.connect(self._playbackStatistics)
+        self._playDimNr = None
+        self._fpsMenu = self._createFpsMenu()
+
+        # The inspectors can report their visible range, per axis, as (start, stop, numPixels)
+        # tuples. In level of detail mode, the combo box dimensions are then read with a step.
+        # In region of interest mode, only the visible region plus a margin is read.
+        self._axisViewRanges = []
+        self._axisRegions = []       # Per axis the (start, stop, step) of the region that is read
+
         self.layout = QtWidgets.QHBoxLayout(self)
         self.layout.setSpacing(DOCK_SPACING)
         self.layout.setContentsMargins(DOCK_MARGIN, DOCK_MARGIN, DOCK_MARGIN, DOCK_MARGIN)
@@ -77,6 +128,30 @@ class Collector(QtWidgets.QWidget):
         self.tree = CollectorTree(self)
         self.layout.addWidget(self.tree)
 
+        self.prefetchAction = QtWidgets.QAction("Prefetch Neighbouring Slices", self)
+        self.prefetchAction.setCheckable(True)
+        self.prefetchAction.setChecked(False)
+        self.prefetchAction.setToolTip("Read the slices next to the current spin box values in "
+                                       "the background")
+        self.prefetchAction.toggled.connect(self._prefetchToggled)
+        self.tree.addAction(self.prefetchAction)
+
+        self.levelOfDetailAction = QtWidgets.QAction("Reduce Resolution to Fit Viewport", self)
+        self.levelOfDetailAction.setCheckable(True)
+        self.levelOfDetailAction.setChecked(False)
+        self.levelOfDetailAction.setToolTip("Read the data with a step, so that the resolution "
+                                            "roughly matches the inspector's viewport")
+        self.levelOfDetailAction.toggled.connect(self._viewportModeToggled)
+        self.tree.addAction(self.levelOfDetailAction)
+
+        self.regionOfInterestAction = QtWidgets.QAction("Read Visible Region Only", self)
+        self.regionOfInterestAction.setCheckable(True)
+        self.regionOfInterestAction.setChecked(False)
+        self.regionOfInterestAction.setToolTip("Read only the region that is visible in the "
+                                               "inspector, plus a margin")
+        self.regionOfInterestAction.toggled.connect(self._viewportModeToggled)
+        self.tree.addAction(self.regionOfInterestAction)
+
         # Add buttons (not yet implemented)
         # self.addVisItemButton = QtWidgets.QPushButton("Add")
         # self.addVisItemButton.setEnabled(False) # not yet implemented
@@ -111,7 +186,7 @@ class Collector(QtWidgets.QWidget):
     def rtiIsSliceable(self):
         """ Returns true if the RTI is not None and is sliceable
         """
-        return self._rti and self._rti.isSliceable
+        return self._rti and self._rti.metadata.isSliceable
 
 
     @property
@@ -160,7 +235,7 @@ class Collector(QtWidgets.QWidget):
         """ Sets the column count given the current axes and selected RTI.
             Returns the newly set column count.
         """
-        numRtiDims = self.rti.nDims if self.rti and self.rti.isSliceable else 0
+        numRtiDims = self.rti.metadata.nDims if self.rti and self.rti.metadata.isSliceable else 0
 
         colCount = self.COL_FIRST_COMBO + max(numRtiDims, len(self.axisNames))
         self.tree.model().setColumnCount(colCount)
@@ -177,15 +252,22 @@ class Collector(QtWidgets.QWidget):
         self._setColumnCountForContents()
 
 
-    def clearAndSetComboBoxes(self, axesNames):
+    def clearAndSetComboBoxes(self, axesNames, blockReading=False):
         """ Removes all comboboxes.
+
+            :param blockReading: True if the inspector reads the data in blocks (see
+                AbstractInspector.readsBlocks). Complete slices are then not read in the
+                background, and neighbouring slices are not prefetched.
         """
         logger.debug("Collector clearAndSetComboBoxes: {}".format(axesNames))
         check_is_a_sequence(axesNames)
+        self._blockReading = blockReading
         row = 0
         self._deleteComboBoxes(row)
         self.clear()
         self._setAxesNames(axesNames)
+        self._axisViewRanges = [None] * len(axesNames)
+        self._axisRegions = [None] * len(axesNames)
         self._createComboBoxes(row)
         self._updateWidgets()
 
@@ -227,6 +309,7 @@ class Collector(QtWidgets.QWidget):
         #assert rti.isSliceable, "RTI must be sliceable" # TODO: maybe later
 
         self._rti = rti
+        self._fetchedSlice = None
         self._updateWidgets()
         self._updateRtiInfo()
 
@@ -237,6 +320,8 @@ class Collector(QtWidgets.QWidget):
         """
         row = 0
         model = self.tree.model()
+        self._cancelSliceFetching()
+        self._resetAxisViewRanges()
 
         # Create path label
         nodePath = '' if self.rti is None else self.rti.nodePath
@@ -305,7 +390,7 @@ class Collector(QtWidgets.QWidget):
                 comboBox.setEnabled(False)
             return
 
-        nDims = self._rti.nDims
+        nDims = self._rti.metadata.nDims
         nCombos = len(self._comboBoxes)
 
         for comboBoxNr, comboBox in enumerate(self._comboBoxes):
@@ -313,7 +398,7 @@ class Collector(QtWidgets.QWidget):
             comboBox.addItem(FAKE_DIM_NAME, userData = FAKE_DIM_OFFSET + comboBoxNr)
 
             for dimNr in range(nDims):
-                comboBox.addItem(self._rti.dimensionNames[dimNr], userData=dimNr)
+                comboBox.addItem(self._rti.metadata.dimensionNames[dimNr], userData=dimNr)
 
             # Set combobox current index
             if nDims >= nCombos:
@@ -363,6 +448,31 @@ class Collector(QtWidgets.QWidget):
         return False
 
 
+    def _createFpsMenu(self):
+        """ Creates the menu of the play buttons, which allows the user to set the frame rate.
+        """
+        menu = QtWidgets.QMenu("Frames per Second", parent=self)
+        actionGroup = QtWidgets.QActionGroup(menu)
+        actionGroup.setExclusive(True)
+
+        for fps in PLAYBACK_FPS_CHOICES:
+            action = QtWidgets.QAction("{} fps".format(fps), actionGroup)
+            action.setCheckable(True)
+            action.setChecked(fps == DEFAULT_PLAYBACK_FPS)
+            action.setData(fps)
+            menu.addAction(action)
+
+        actionGroup.triggered.connect(self._fpsActionTriggered)
+        return menu
+
+
+    @QtSlot(QtWidgets.QAction)
+    def _fpsActionTriggered(self, action):
+        """ Sets the target frame rate of the playback.
+        """
+        self._slicePlayer.targetFps = action.data()
+
+
     def _createSpinBoxes(self, row):
         """ Creates a spinBox for each dimension that is not selected in a combo box.
         """
@@ -371,7 +481,7 @@ class Collector(QtWidgets.QWidget):
         if not self.rtiIsSliceable:
             return
 
-        logger.debug("_createSpinBoxes, array shape: {}".format(self._rti.arrayShape))
+        logger.debug("_createSpinBoxes, array shape: {}".format(self._rti.metadata.arrayShape))
 
         self._setColumnCountForContents()
 
@@ -379,7 +489,7 @@ class Collector(QtWidgets.QWidget):
         model = self.tree.model()
         col = self.COL_FIRST_COMBO + self.maxCombos
 
-        for dimNr, dimSize in enumerate(self._rti.arrayShape):
+        for dimNr, dimSize in enumerate(self._rti.metadata.arrayShape):
 
             if self._dimensionSelectedInComboBox(dimNr):
                 continue
@@ -396,7 +506,7 @@ class Collector(QtWidgets.QWidget):
             spinBox.setMaximum(dimSize - 1)
             spinBox.setSingleStep(1)
             spinBox.setValue(dimSize // 2) # select the middle of the slice
-            spinBox.setPrefix("{}: ".format(self._rti.dimensionNames[dimNr]))
+            spinBox.setPrefix("{}: ".format(self._rti.metadata.dimensionNames[dimNr]))
             spinBox.setSuffix("/{}".format(spinBox.maximum()))
             spinBox.setProperty("dim_nr", dimNr)
             #spinBox.adjustSize() # necessary?
@@ -404,7 +514,50 @@ class Collector(QtWidgets.QWidget):
             # This must be done after setValue to prevent emitting too many signals
             spinBox.valueChanged[int].connect(self._spinboxValueChanged)
 
-            tree.setIndexWidget(model.index(row, col), spinBox)
+            playButton = QtWidgets.QToolButton()
+            self._playButtons.append(playButton)
+            playButton.setCheckable(True)
+            playButton.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay))
+            playButton.setToolTip("Play")
+            playButton.setPopupMode(QtWidgets.QToolButton.MenuButtonPopup)
+            playButton.setMenu(self._fpsMenu)
+            playButton.setProperty("dim_nr", dimNr)
+            playButton.toggled.connect(self._playButtonToggled)
+
+            reducerComboBox = QtWidgets.QComboBox()
+            self._reducerComboBoxes.append(reducerComboBox)
+            reducerComboBox.addItem("index", NO_REDUCTION)
+            for reducer in REDUCER_NAMES:
+                reducerComboBox.addItem(reducer, reducer)
+            reducerComboBox.setToolTip("Select a single index, or reduce the dimension over a "
+                                       "range of indices")
+            reducerComboBox.setProperty("dim_nr", dimNr)
+            reducerComboBox.activated[int].connect(self._reducerComboBoxActivated)
+
+            rangeEndSpinBox = CollectorSpinBox()
+            self._rangeEndSpinBoxes.append(rangeEndSpinBox)
+            rangeEndSpinBox.setKeyboardTracking(False)
+            rangeEndSpinBox.setCorrectionMode(QtWidgets.QAbstractSpinBox.CorrectToNearestValue)
+            rangeEndSpinBox.setMinimum(0)
+            rangeEndSpinBox.setMaximum(dimSize - 1)
+            rangeEndSpinBox.setValue(dimSize - 1)
+            rangeEndSpinBox.setPrefix("to ")
+            rangeEndSpinBox.setSuffix("/{}".format(rangeEndSpinBox.maximum()))
+            rangeEndSpinBox.setToolTip("Last index of the reduction range")
+            rangeEndSpinBox.setProperty("dim_nr", dimNr)
+            rangeEndSpinBox.setVisible(False)
+            rangeEndSpinBox.valueChanged[int].connect(self._rangeEndValueChanged)
+
+            widget = QtWidgets.QWidget()
+            layout = QtWidgets.QHBoxLayout(widget)
+            layout.setContentsMargins(0, 0, 0, 0)
+            layout.setSpacing(0)
+            layout.addWidget(reducerComboBox, stretch=0)
+            layout.addWidget(spinBox, stretch=1)
+            layout.addWidget(rangeEndSpinBox, stretch=1)
+            layout.addWidget(playButton, stretch=0)
+
+            tree.setIndexWidget(model.index(row, col), widget)
             col += 1
 
         # Resize the spinbox columns to their new contents
@@ -416,11 +569,19 @@ class Collector(QtWidgets.QWidget):
         """
         tree = self.tree
         model = self.tree.model()
+        self._stopPlayback()
 
         for col, spinBox in enumerate(self._spinBoxes, self.COL_FIRST_COMBO + self.maxCombos):
             spinBox.valueChanged[int].disconnect(self._spinboxValueChanged)
             tree.setIndexWidget(model.index(row, col), None)
+        for rangeEndSpinBox in self._rangeEndSpinBoxes:
+            rangeEndSpinBox.valueChanged[int].disconnect(self._rangeEndValueChanged)
         self._spinBoxes = []
+        self._reducerComboBoxes = []
+        self._rangeEndSpinBoxes = []
+        self._playButtons = []
+        self._lastChangedSpinBox = None
+        self._lastSpinBoxValues = {}
 
         self._setColumnCountForContents()
 
@@ -437,6 +598,8 @@ class Collector(QtWidgets.QWidget):
         assert comboBox, "comboBox not defined and not the sender"
 
         blocked = self.blockChildrenSignals(True)
+        self._cancelSliceFetching()
+        self._resetAxisViewRanges()
 
         # If one of the other combo boxes has the same value, set it to the fake dimension
         curDimIdx = self._comboBoxDimensionIndex(comboBox)
@@ -472,78 +635,500 @@ class Collector(QtWidgets.QWidget):
             spinBox = self.sender()
         assert spinBox, "spinBox not defined and not the sender"
 
-        logger.debug("{} sigContentsChanged signal (spinBox)"
+        # A manual change stops the playback.
+        self._stopPlayback()
+
+        # Neighbouring slices are prefetched again after this slice has been read.
+        self._sliceFetcher.cancelPrefetch()
+        self._lastChangedSpinBox = spinBox
+
+        self._fetchAndEmitContentsChanged(UpdateReason.COLLECTOR_SPIN_BOX)
+
+
+    @QtSlot(int)
+    def _reducerComboBoxActivated(self, index):
+        """ Is called when the user selects a reducer (or a single index) for a spin box dimension.
+
+            The range end spin box is shown, and playing is disabled, when the dimension is reduced.
+        """
+        reducerComboBox = self.sender()
+        assert reducerComboBox, "reducerComboBox not defined and not the sender"
+        spinNr = self._reducerComboBoxes.index(reducerComboBox)
+        isReduced = bool(reducerComboBox.itemData(index))
+
+        if self._playDimNr == reducerComboBox.property("dim_nr"):
+            self._stopPlayback()
+        self._rangeEndSpinBoxes[spinNr].setVisible(isReduced)
+        self._playButtons[spinNr].setEnabled(not isReduced)
+        self.tree.resizeColumnsToContents(startCol=self.COL_FIRST_COMBO + self.maxCombos)
+
+        self._sliceFetcher.cancelPrefetch()
+        self._lastChangedSpinBox = self._spinBoxes[spinNr]
+        self._updateRtiInfo()
+        self._fetchAndEmitContentsChanged(UpdateReason.COLLECTOR_SPIN_BOX)
+
+
+    @QtSlot(int)
+    def _rangeEndValueChanged(self, _value):
+        """ Is called when the last index of a reduction range was changed.
+        """
+        rangeEndSpinBox = self.sender()
+        assert rangeEndSpinBox, "rangeEndSpinBox not defined and not the sender"
+
+        self._stopPlayback()
+        self._sliceFetcher.cancelPrefetch()
+        self._lastChangedSpinBox = self._spinBoxes[self._rangeEndSpinBoxes.index(rangeEndSpinBox)]
+        self._updateRtiInfo()
+        self._fetchAndEmitContentsChanged(UpdateReason.COLLECTOR_SPIN_BOX)
+
+
+    def _spinBoxSliceElement(self, spinNr):
+        """ Returns the slice tuple element of the dimension of a spin box.
+
+            This is the spin box value, or a Reduction if a reducer is selected for the dimension.
+        """
+        spinBox = self._spinBoxes[spinNr]
+        reducerComboBox = self._reducerComboBoxes[spinNr]
+        reducer = reducerComboBox.itemData(reducerComboBox.currentIndex())
+        if not reducer:
+            return spinBox.value()
+
+        first, last = sorted([spinBox.value(), self._rangeEndSpinBoxes[spinNr].value()])
+        return Reduction(first, last + 1, reducer)
+
+
+    def _fetchAndEmitContentsChanged(self, reason):
+        """ Emits sigContentsChanged with the reason.
+
+            Slices of files that are not yet cached are first read in the background. The signal
+            is then emitted when the slice has been read (see _sliceFetched).
+        """
+        sliceTuple = self._sliceTuple()
+        sliceCache = SliceCache.singleton()
+        if (not self._blockReading and sliceCache.fileModificationTime(self.rti) is not None
+                and not sliceCache.isCached(self.rti, sliceTuple)):
+            logger.debug("Fetching slice in the background: {}".format(sliceTuple))
+            self._requestedSlice = (self.rti, sliceTuple, reason)
+            self._sliceFetcher.request(self.rti, sliceTuple)
+            self._setLoading(True)
+            return
+
+        self._cancelSliceFetching()
+        logger.debug("{} sigContentsChanged signal ({})"
+                      .format("Blocked" if self.signalsBlocked() else "Emitting", reason))
+        self.sigContentsChanged.emit(reason)
+        if reason == UpdateReason.COLLECTOR_SPIN_BOX:
+            self._prefetchNeighbours(self._lastChangedSpinBox)
+
+
+    @QtSlot(int, object, object)
+    def _sliceFetched(self, requestNr, slicedArray, exception):
+        """ Is called when the slice fetcher has read a slice.
+
+            Results of requests that have been superseded are ignored. If an exception occurred,
+            the inspector is updated anyway. It will then read the slice itself and show the error.
+        """
+        if not self._sliceFetcher.isCurrent(requestNr):
+            logger.debug("Ignoring superseded slice request: {}".format(requestNr))
+            return
+
+        rti, sliceTuple, reason = self._requestedSlice
+        self._requestedSlice = None
+        if exception is None:
+            self._fetchedSlice = (rti, sliceKey(sliceTuple), slicedArray)
+        self._setLoading(False)
+
+        logger.debug("{} sigContentsChanged signal (slice fetched)"
                       .format("Blocked" if self.signalsBlocked() else "Emitting"))
+        self.sigContentsChanged.emit(reason)
+        if reason == UpdateReason.COLLECTOR_SPIN_BOX:
+            self._prefetchNeighbours(self._lastChangedSpinBox)
+
+
+    def _spinBoxForDimension(self, dimNr):
+        """ Returns the spin box of the dimension. Returns None if there is no such spin box.
+        """
+        for spinBox in self._spinBoxes:
+            if spinBox.property("dim_nr") == dimNr:
+                return spinBox
+        return None
+
+
+    @QtSlot(bool)
+    def _playButtonToggled(self, checked):
+        """ Starts or stops playing the dimension of the play button.
+        """
+        playButton = self.sender()
+        assert playButton, "playButton not defined and not the sender"
+
+        self._stopPlayback()
+        if not checked:
+            return
+
+        dimNr = playButton.property("dim_nr")
+        spinBox = self._spinBoxForDimension(dimNr)
+        if spinBox is None or not self.rtiIsSliceable:
+            return
+
+        if isinstance(self._sliceTuple()[dimNr], Reduction):
+            return # Reduced dimensions can't be played.
+
+        self._cancelSliceFetching()
+        dimSize = spinBox.maximum() + 1
+        firstIndex = (spinBox.value() + 1) % dimSize
+
+        playButton.blockSignals(True)
+        playButton.setChecked(True)
+        playButton.blockSignals(False)
+        playButton.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_MediaStop))
+
+        self._playDimNr = dimNr
+        self._slicePlayer.start(self.rti, self._sliceTuple(), dimNr, firstIndex, dimSize)
+
+
+    def _stopPlayback(self):
+        """ Stops the playback (if playing) and resets the play buttons.
+        """
+        self._slicePlayer.stop()
+        self._playDimNr = None
+
+        for playButton in self._playButtons:
+            if playButton.isChecked():
+                playButton.blockSignals(True)
+                playButton.setChecked(False)
+                playButton.blockSignals(False)
+            playButton.setIcon(self.style().standardIcon(QtWidgets.QStyle.SP_MediaPlay))
+            playButton.setToolTip("Play")
+
+
+    @QtSlot(int, object)
+    def _playbackFrame(self, index, slicedArray):
+        """ Shows a frame of the playback. The frame's slice is used by getSlicedArray.
+        """
+        spinBox = self._spinBoxForDimension(self._playDimNr)
+        if spinBox is None:
+            return
+
+        spinBox.blockSignals(True)
+        try:
+            spinBox.setValue(index)
+        finally:
+            spinBox.blockSignals(False)
+
+        self._fetchedSlice = (self.rti, sliceKey(self._sliceTuple()), slicedArray)
         self.sigContentsChanged.emit(UpdateReason.COLLECTOR_SPIN_BOX)
 
 
-    def getSlicedArray(self, copy=True):
-        """ Slice the rti using a tuple of slices made from the values of the combo and spin boxes.
+    @QtSlot(float, int)
+    def _playbackStatistics(self, achievedFps, droppedFrames):
+        """ Reports the achieved frame rate and dropped frames in the play button's tool tip.
+        """
+        for playButton in self._playButtons:
+            if playButton.isChecked():
+                playButton.setToolTip("Playing at {:.1f} of {} fps ({} dropped frames)"
+                                      .format(achievedFps, self._slicePlayer.targetFps,
+                                              droppedFrames))
 
-            :param copy: If True (the default), a copy is made so that inspectors cannot
-                accidentally modify the underlying of the RTIs. You can set copy=False as a
-                potential optimization, but only if you are absolutely sure that you don't modify
-                the the slicedArray in your inspector! Note that this function calls transpose,
-                which can still make a copy of the array for certain permutations.
 
-            :return: Numpy masked array with the same number of dimension as the number of
-                comboboxes (this can be zero!).
+    def _prefetchNeighbours(self, spinBox):
+        """ Prefetches the slices next to the current value of the spin box (if enabled).
 
-                Returns None if no slice can be made (i.e. the RTI is not sliceable).
+            The slices in the direction of the last step are prefetched first. A far jump
+            cancels the prefetching in _spinboxValueChanged, after which the neighbours of the new
+            position are prefetched.
         """
-        #logger.debug("getSlicedArray() called")
+        if spinBox is None or spinBox not in self._spinBoxes:
+            return
 
-        if not self.rtiIsSliceable:
-            return None
+        dimNr = spinBox.property("dim_nr")
+        value = spinBox.value()
+        lastValue = self._lastSpinBoxValues.get(dimNr, value)
+        self._lastSpinBoxValues[dimNr] = value
 
-        # The dimensions that are selected in the combo boxes will be set to slice(None),
-        # the values from the spin boxes will be set as a single integer value
-        nDims = self.rti.nDims
-        sliceList = [slice(None)] * nDims
+        if (not self.prefetchAction.isChecked() or not self.rtiIsSliceable
+                or self._blockReading):
+            return
 
-        for spinBox in self._spinBoxes:
+        sliceList = list(self._sliceTuple())
+        if isinstance(sliceList[dimNr], Reduction):
+            return # Only single indices are prefetched.
+
+        direction = -1 if value < lastValue else 1
+        offsets = []
+        for step in range(1, PREFETCH_NUM_SLICES + 1):
+            offsets.extend([direction * step, -direction * step])
+
+        sliceTuples = []
+        for offset in offsets:
+            if spinBox.minimum() <= value + offset <= spinBox.maximum():
+                sliceList[dimNr] = value + offset
+                sliceTuples.append(tuple(sliceList))
+
+        maxBytes = int(SliceCache.singleton().maxBytes * PREFETCH_CACHE_FRACTION)
+        logger.debug("Prefetching {} slices around {}".format(len(sliceTuples), value))
+        self._sliceFetcher.prefetch(self.rti, sliceTuples, maxBytes)
+
+
+    @QtSlot(bool)
+    def _prefetchToggled(self, checked):
+        """ Starts or stops prefetching when the prefetch action is toggled.
+        """
+        if checked:
+            self._prefetchNeighbours(self._lastChangedSpinBox)
+        else:
+            self._sliceFetcher.cancelPrefetch()
+
+
+    def _resetAxisViewRanges(self):
+        """ Resets the visible ranges to the complete dimensions (e.g. after a new RTI is set).
+
+            The number of pixels is retained, so that the first read of a new RTI is already done
+            at a reduced resolution. In region of interest mode the length of the visible range
+            is retained as well, but the range is moved to the start of the dimension. This way
+            the first read of a large RTI doesn't read the complete dimension.
+        """
+        viewRanges = []
+        for viewRange in self._axisViewRanges:
+            if viewRange is None:
+                viewRanges.append(None)
+            elif (self.regionOfInterestAction.isChecked()
+                  and viewRange[0] is not None and viewRange[1] is not None):
+                viewRanges.append((0, viewRange[1] - viewRange[0], viewRange[2]))
+            else:
+                viewRanges.append((None, None, viewRange[2]))
+        self._axisViewRanges = viewRanges
+        self._axisRegions = [None] * len(self._axisViewRanges)
+
+
+    def setAxisViewRanges(self, viewRanges, emitSignal=True):
+        """ Sets the visible range of the inspector axes.
+
+            Inspectors call this so that, in level of detail mode, the data is read with a step
+            that matches the resolution of the viewport. In region of interest mode only the
+            visible region (plus a margin) is read.
+
+            :param viewRanges: list with for each axis (in the order of the axesNames) a tuple
+                (start, stop, numPixels) or None. The start and stop are in (fractional) array
+                indices and may be None to indicate the complete dimension.
+            :param emitSignal: if True, and the slices change, sigContentsChanged is emitted
+                (with reason COLLECTOR_VIEWPORT) so that the inspector will redraw.
+            :return: True if the slices have changed.
+        """
+        check_is_a_sequence(viewRanges)
+        assert len(viewRanges) == self.maxCombos, \
+            "Expected {} view ranges, got: {}".format(self.maxCombos, len(viewRanges))
+
+        oldSliceTuple = self._sliceTuple() if self.rtiIsSliceable else None
+        self._axisViewRanges = list(viewRanges)
+        newSliceTuple = self._sliceTuple() if self.rtiIsSliceable else None
+
+        changed = sliceKey(oldSliceTuple or ()) != sliceKey(newSliceTuple or ())
+        if changed and emitSignal:
+            logger.debug("Slices changed by viewport: {}".format(newSliceTuple))
+            self._fetchAndEmitContentsChanged(UpdateReason.COLLECTOR_VIEWPORT)
+        return changed
+
+
+    @QtSlot(bool)
+    def _viewportModeToggled(self, checked):
+        """ Redraws the inspector when the level of detail or region of interest mode is
+            switched on or off.
+        """
+        if self.rtiIsSliceable:
+            self._fetchAndEmitContentsChanged(UpdateReason.COLLECTOR_VIEWPORT)
+
+
+    def _comboSlice(self, axisNr, dimSize):
+        """ Returns the slice with which the dimension of the combo box of axisNr is read.
+
+            This is slice(None) unless the level of detail or region of interest mode is on and
+            the inspector has reported its visible range for this axis.
+        """
+        levelOfDetail = self.levelOfDetailAction.isChecked()
+        regionOfInterest = self.regionOfInterestAction.isChecked()
+        if not (levelOfDetail or regionOfInterest) or axisNr >= len(self._axisViewRanges):
+            return slice(None)
+
+        viewRange = self._axisViewRanges[axisNr]
+        if viewRange is None:
+            return slice(None)
+
+        start, stop, numPixels = viewRange
+        start = 0 if start is None else int(np.clip(math.floor(start), 0, dimSize))
+        stop = dimSize if stop is None else int(np.clip(math.ceil(stop), start, dimSize))
+
+        step = levelOfDetailStep(stop - start, numPixels) if levelOfDetail else 1
+        if regionOfInterest and (start > 0 or stop < dimSize):
+            regionStart, regionStop = self._regionOfInterest(axisNr, start, stop, step, dimSize)
+            if regionStart > 0 or regionStop < dimSize:
+                return slice(regionStart, regionStop, step)
+
+        return slice(None, None, step) if step > 1 else slice(None)
+
+
+    def _regionOfInterest(self, axisNr, start, stop, step, dimSize):
+        """ Returns the (start, stop) of the region that is read to show the range start:stop.
+
+            The region is the visible range plus a margin on both sides, aligned to the tiles of
+            the slice cache. While the visible range stays within the previous region (and the
+            step is unchanged), the previous region is returned so that panning doesn't cause a
+            read until the margin is exhausted. New regions share their tiles with the previous
+            one, so only the newly exposed tiles are read.
+        """
+        if axisNr < len(self._axisRegions):
+            previous = self._axisRegions[axisNr]
+            if previous is not None:
+                prevStart, prevStop, prevStep = previous
+                if prevStep == step and prevStart <= start and stop <= prevStop:
+                    return prevStart, prevStop
+
+        margin = int(math.ceil((stop - start) * REGION_MARGIN_FRACTION))
+        tileLength = REGION_TILE_SIZE * step
+        regionStart = max(0, (start - margin) // tileLength * tileLength)
+        regionStop = min(dimSize, int(math.ceil((stop + margin) / tileLength)) * tileLength)
+
+        if axisNr < len(self._axisRegions):
+            self._axisRegions[axisNr] = (regionStart, regionStop, step)
+        return regionStart, regionStop
+
+
+    def comboSlices(self):
+        """ Returns for each axis, the slice with which the sliced array has been read.
+
+            The slices have explicit start, stop and step values. So the element at index i of
+            the sliced array corresponds to index start + i * step in the RTI. Fake dimensions
+            return slice(0, 1, 1).
+        """
+        result = []
+        for axisNr, comboBox in enumerate(self._comboBoxes):
+            dimNr = self._comboBoxDimensionIndex(comboBox)
+            if not self.rtiIsSliceable or dimNr is None or dimNr >= FAKE_DIM_OFFSET:
+                result.append(slice(0, 1, 1))
+            else:
+                dimSize = self.rti.metadata.arrayShape[dimNr]
+                result.append(slice(*self._comboSlice(axisNr, dimSize).indices(dimSize)))
+        return result
+
+
+    def comboDimensionSizes(self):
+        """ Returns for each axis, the length of the complete dimension that is selected in the
+            combo box. Fake dimensions have length 1.
+        """
+        result = []
+        for comboBox in self._comboBoxes:
+            dimNr = self._comboBoxDimensionIndex(comboBox)
+            if not self.rtiIsSliceable or dimNr is None or dimNr >= FAKE_DIM_OFFSET:
+                result.append(1)
+            else:
+                result.append(self.rti.metadata.arrayShape[dimNr])
+        return result
+
+
+    def _cancelSliceFetching(self):
+        """ Cancels the pending slice request (if any) and any prefetching.
+        """
+        self._sliceFetcher.cancelPrefetch()
+        if self._requestedSlice is not None:
+            self._sliceFetcher.cancel()
+            self._requestedSlice = None
+        self._setLoading(False)
+
+
+    def _setLoading(self, isLoading):
+        """ Sets the loading state and emits sigSliceLoading if it changed.
+        """
+        if isLoading != self._isLoading:
+            self._isLoading = isLoading
+            self.sigSliceLoading.emit(isLoading)
+
+
+    def _sliceTuple(self, comboSlices=None):
+        """ Returns the tuple that is used to index the RTI.
+
+            The dimensions that are selected in the combo boxes will be set to slice(None),
+            the values from the spin boxes will be set as a single integer value. Spin box
+            dimensions that are reduced over a range are set to a Reduction.
+
+            :param comboSlices: optional list with, per combo box axis, the slice with which the
+                dimension is read. Overrides the level of detail and region of interest modes.
+                The slices of fake dimensions are ignored.
+        """
+        sliceList = [slice(None)] * self.rti.metadata.nDims
+
+        for spinNr, spinBox in enumerate(self._spinBoxes):
             dimNr = spinBox.property("dim_nr")
-            sliceList[dimNr] = spinBox.value()
+            sliceList[dimNr] = self._spinBoxSliceElement(spinNr)
+
+        arrayShape = self.rti.metadata.arrayShape
+        for axisNr, comboBox in enumerate(self._comboBoxes):
+            dimNr = self._comboBoxDimensionIndex(comboBox)
+            if dimNr is not None and dimNr < FAKE_DIM_OFFSET:
+                if comboSlices is None:
+                    sliceList[dimNr] = self._comboSlice(axisNr, arrayShape[dimNr])
+                else:
+                    sliceList[dimNr] = comboSlices[axisNr]
 
         # Make the array slicer. It needs to be a tuple, a list of only integers will be
         # interpreted as an index. With a tuple, array[(exp1, exp2, ..., expN)] is equivalent to
         # array[exp1, exp2, ..., expN].
         # See: http://docs.scipy.org/doc/numpy/reference/arrays.indexing.html
-        logger.debug("Array slice list: {}".format(str(sliceList)))
-        slicedArray = self.rti[tuple(sliceList)]
+        return tuple(sliceList)
 
-        # Make a copy to prevent inspectors from modifying the underlying array.
-        if copy:
-            slicedArray = ma.copy(slicedArray)
 
+    def getSlicedArray(self, copy=False, comboSlices=None, useCache=True):
+        """ Slice the rti using a tuple of slices made from the values of the combo and spin boxes.
+
+            No copies of the data are made unless copy is True. The sliced array then shares its
+            memory with the slice cache (and possibly with the RTI). To prevent inspectors from
+            accidentally modifying the underlying data, the data and mask are marked read-only.
+            Inspectors that need to modify the data must copy it first; the replaceMaskedValue
+            methods of ArrayWithMask do this automatically (copy-on-write).
+
+            :param copy: If True, a writeable copy is returned.
+            :param comboSlices: optional list with, per combo box axis, the slice that is read.
+                Can be used to read a block of the sliced array. Blocks that are aligned on the
+                REGION_TILE_SIZE are read as one tile of the slice cache.
+            :param useCache: If False, the slice is read from the RTI without using or filling
+                the slice cache. Can be used to read a large part of the data once (e.g. when
+                exporting it) without discarding the slices that are displayed.
+
+            :return: ArrayWithMask with the same number of dimension as the number of
+                comboboxes (this can be zero!).
+
+                Returns None if no slice can be made (i.e. the RTI is not sliceable).
+        """
+        #logger.debug("getSlicedArray() called")
+
+        if not self.rtiIsSliceable:
+            return None
+
+        sliceTuple = self._sliceTuple(comboSlices)
+        logger.debug("Array slice tuple: {}".format(str(sliceTuple)))
+        # The slice is an ArrayWithMask of which the mask was compacted when it was read.
         # If there are no comboboxes the sliceList will contain no Slices objects, only ints. Then
-        # the resulting slicedArray will be a usually a scalar (only structured fields may yield an
-        # array). We convert this scalar to a zero-dimensional Numpy array so that inspectors
-        # always get an array (having the same number of dimensions as the dimensionality of the
-        # inspector, i.e. the number of comboboxes).
-        if self.maxCombos == 0:
-            slicedArray = ma.MaskedArray(slicedArray)
+        # the slice will usually be zero-dimensional (only structured fields may yield an array),
+        # so that inspectors always get an array (having the same number of dimensions as the
+        # dimensionality of the inspector, i.e. the number of comboboxes).
+        if useCache:
+            awm = self._readSlice(sliceTuple)
+        else:
+            awm = readSliceUncached(self.rti, sliceTuple)
 
         # Post-condition type check
-        check_is_an_array(slicedArray, np.ndarray)
+        check_is_an_array(awm.data, np.ndarray)
 
-        # Enforce the return type to be a masked array.
-        if not isinstance(slicedArray, ma.MaskedArray):
-            slicedArray = ma.MaskedArray(slicedArray)
+        if copy:
+            awm = awm.copy()
 
         # Add fake dimensions of length 1 so that result.ndim will equal the number of combo boxes
-        for dimNr in range(slicedArray.ndim, self.maxCombos):
+        for dimNr in range(awm.data.ndim, self.maxCombos):
             #logger.debug("Adding fake dimension: {}".format(dimNr))
-            slicedArray = ma.expand_dims(slicedArray, dimNr)
+            awm = awm.expandDims(dimNr)
 
         # Post-condition dimension check
-        assert slicedArray.ndim == self.maxCombos, \
+        assert awm.data.ndim == self.maxCombos, \
             "Bug: getSlicedArray should return a {:d}D array, got: {}D" \
-            .format(self.maxCombos, slicedArray.ndim)
-
-        # Convert to ArrayWithMask class for working around issues with the numpy maskedarray
-        awm = ArrayWithMask.createFromMaskedArray(slicedArray)
-        del slicedArray
+            .format(self.maxCombos, awm.data.ndim)
 
         # Shuffle the dimensions to be in the order as specified by the combo boxes
         comboDims = [self._comboBoxDimensionIndex(cb) for cb in self._comboBoxes]
@@ -551,27 +1136,58 @@ class Collector(QtWidgets.QWidget):
         logger.debug("slicedArray.shape: {}".format(awm.data.shape))
         logger.debug("Transposing dimensions: {}".format(permutations))
         awm = awm.transpose(permutations)
-
         awm.checkIsConsistent()
 
+        if not copy:
+            awm.setReadOnly()
+
         return awm
 
 
+    def _readSlice(self, sliceTuple):
+        """ Reads a slice from the RTI, or gets it from the shared slice cache if available.
+
+            The returned array may be in the cache, so it should not be modified.
+        """
+        if self._fetchedSlice is not None:
+            fetchedRti, fetchedKey, fetchedArray = self._fetchedSlice
+            if fetchedRti is self.rti and fetchedKey == sliceKey(sliceTuple):
+                return fetchedArray
+
+        return SliceCache.singleton().readSlice(self.rti, sliceTuple)
+
+
+    def prefetchBlocks(self, comboSlicesList):
+        """ Reads blocks of the sliced array into the slice cache in the background.
+
+            Replaces the blocks (or slices) that are still waiting to be prefetched.
+
+            :param comboSlicesList: list of blocks. Each block is given by a list of slices per
+                combo box axis, as in getSlicedArray.
+        """
+        if not self.rtiIsSliceable:
+            return
+        sliceTuples = [self._sliceTuple(comboSlices) for comboSlices in comboSlicesList]
+        maxBytes = int(SliceCache.singleton().maxBytes * PREFETCH_CACHE_FRACTION)
+        self._sliceFetcher.prefetch(self.rti, sliceTuples, maxBytes)
+
+
     def getSlicesString(self):
         """ Returns a string representation of the slices that are used to get the sliced array.
-            For example returns '[:, 5]' if the combo box selects dimension 0 and the spin box 5.
+            For example returns '[:, 5]' if the combo box selects dimension 0 and the spin box 5,
+            or '[:, mean(0:10)]' if the second dimension is averaged over its first ten indices.
         """
         if not self.rtiIsSliceable:
             return ''
 
         # The dimensions that are selected in the combo boxes will be set to slice(None),
         # the values from the spin boxes will be set as a single integer value
-        nDims = self.rti.nDims
+        nDims = self.rti.metadata.nDims
         sliceList = [':'] * nDims
 
-        for spinBox in self._spinBoxes:
+        for spinNr, spinBox in enumerate(self._spinBoxes):
             dimNr = spinBox.property("dim_nr")
-            sliceList[dimNr] = str(spinBox.value())
+            sliceList[dimNr] = str(self._spinBoxSliceElement(spinNr))
 
         # No need to shuffle combobox dimensions like in getSlicedArray; all combobox dimensions
         # yield a colon.
@@ -644,8 +1260,8 @@ class Collector(QtWidgets.QWidget):
                     'file-name': rti.fileName,
                     'dir-name': dirName,
                     'base-name': baseName,
-                    'unit': '({})'.format(rti.unit) if rti.unit else '',
-                    'raw-unit': rti.unit}
+                    'unit': '({})'.format(rti.metadata.unit) if rti.metadata.unit else '',
+                    'raw-unit': rti.metadata.unit}
 
         # Add the info of the independent dimensions (appended with the axis name of that dim).
         for axisName, comboBox in zip(self._axisNames, self._comboBoxes):
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Playback (animation) of a collector dimension.
+"""
+from __future__ import print_function
+
+import logging, threading, time
+
+from collections import deque
+
+from argos.collect.slicecache import readSliceUncached
+from argos.qt import QtCore, QtSignal, QtSlot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAYBACK_FPS = 10
+PLAYBACK_FPS_CHOICES = (1, 2, 5, 10, 15, 20, 25, 30, 50, 60)
+PLAYBACK_BUFFER_SIZE = 10 # Number of frames that the producer thread reads ahead.
+PLAYBACK_STOP_TIMEOUT = 0.1 # Seconds that stop waits for the producer thread to finish.
+
+
+class RingBuffer(object):
+    """ Bounded, thread-safe, first-in first-out buffer.
+
+        The producer blocks when the buffer is full. The consumer never blocks; get returns None
+        if the buffer is empty.
+    """
+    def __init__(self, maxSize):
+        """ Constructor
+        """
+        self._condition = threading.Condition()
+        self._items = deque()
+        self._maxSize = maxSize
+        self._isClosed = False
+
+
+    def __len__(self):
+        return len(self._items)
+
+
+    @property
+    def isClosed(self):
+        """ True if the buffer is closed. Closed buffers don't accept new items.
+        """
+        return self._isClosed
+
+
+    def close(self):
+        """ Closes the buffer and wakes up the producer that may be waiting.
+        """
+        with self._condition:
+            self._isClosed = True
+            self._items.clear()
+            self._condition.notify_all()
+
+
+    def put(self, item):
+        """ Appends an item. Waits until there is room in the buffer.
+
+            Returns False if the buffer was closed (the item is then discarded).
+        """
+        with self._condition:
+            while len(self._items) >= self._maxSize and not self._isClosed:
+                self._condition.wait()
+            if self._isClosed:
+                return False
+            self._items.append(item)
+            return True
+
+
+    def get(self):
+        """ Removes and returns the oldest item. Returns None if the buffer is empty.
+        """
+        with self._condition:
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._condition.notify_all()
+            return item
+
+
+
+class SlicePlayer(QtCore.QObject):
+    """ Steps through a dimension of an RTI at a target frame rate.
+
+        A producer thread reads the slices ahead of the display into a ring buffer. A timer in
+        the GUI thread takes the frames from the buffer and emits them with sigFrame. If the
+        display can't keep up, frames are skipped to keep pace with the target frame rate. Timer
+        ticks for which no frame was available yet are also counted as dropped frames.
+    """
+    sigFrame = QtSignal(int, object)       # index in the dimension, sliced array
+    sigStatistics = QtSignal(float, int)   # achieved frames per second, number of dropped frames
+
+    def __init__(self, parent=None):
+        """ Constructor
+        """
+        super(SlicePlayer, self).__init__(parent=parent)
+        self._ringBuffer = None
+        self._producer = None
+        self._targetFps = DEFAULT_PLAYBACK_FPS
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self._timer.timeout.connect(self._showNextFrame)
+
+        self._lastTickTime = None
+        self._statsStartTime = None
+        self._statsNumFrames = 0
+        self._achievedFps = 0.0
+        self._droppedFrames = 0
+
+
+    @property
+    def isPlaying(self):
+        """ True if the playback is running.
+        """
+        return self._timer.isActive()
+
+
+    @property
+    def targetFps(self):
+        """ The target number of frames per second.
+        """
+        return self._targetFps
+
+
+    @targetFps.setter
+    def targetFps(self, fps):
+        """ Sets the target number of frames per second.
+        """
+        self._targetFps = fps
+        self._timer.setInterval(int(round(1000.0 / fps)))
+
+
+    @property
+    def achievedFps(self):
+        """ The number of frames per second shown during the last second of playback.
+        """
+        return self._achievedFps
+
+
+    @property
+    def droppedFrames(self):
+        """ The number of dropped frames since the playback was started.
+        """
+        return self._droppedFrames
+
+
+    def start(self, rti, sliceTuple, dimNr, firstIndex, dimSize):
+        """ Starts playing.
+
+            :param rti: the repository tree item that is played.
+            :param sliceTuple: slice tuple of the current slice. The element at dimNr is replaced
+                by the index of the frame.
+            :param dimNr: the dimension that is played.
+            :param firstIndex: the index of the first frame.
+            :param dimSize: the length of the dimension. Playback loops when the end is reached.
+        """
+        self.stop()
+        logger.debug("Start playing dimension {} of {} at {} fps"
+                     .format(dimNr, rti, self._targetFps))
+
+        self._ringBuffer = RingBuffer(PLAYBACK_BUFFER_SIZE)
+        self._producer = threading.Thread(target=self._produceFrames, name="SlicePlayer",
+                                          args=(self._ringBuffer, rti, sliceTuple, dimNr,
+                                                firstIndex, dimSize))
+        self._producer.daemon = True
+        self._producer.start()
+
+        self._lastTickTime = None
+        self._statsStartTime = time.time()
+        self._statsNumFrames = 0
+        self._achievedFps = 0.0
+        self._droppedFrames = 0
+        self._timer.start(int(round(1000.0 / self._targetFps)))
+
+
+    def stop(self):
+        """ Stops playing.
+
+            Waits a short while for the producer thread to finish. If it is still in the middle
+            of a slow read, the thread is detached so that the GUI doesn't freeze. Because its
+            ring buffer is closed, the result of that read is discarded and the thread ends.
+        """
+        self._timer.stop()
+        if self._ringBuffer is not None:
+            self._ringBuffer.close()
+            self._ringBuffer = None
+        if self._producer is not None:
+            self._producer.join(PLAYBACK_STOP_TIMEOUT)
+            if self._producer.is_alive():
+                logger.debug("Detaching playback producer that is still reading")
+            self._producer = None
+
+
+    @staticmethod
+    def _produceFrames(ringBuffer, rti, sliceTuple, dimNr, firstIndex, dimSize):
+        """ Producer thread. Reads the frames into the ring buffer until the buffer is closed.
+
+            The frames are read uncached. A single loop through a dimension would otherwise
+            evict all other slices from the shared slice cache.
+        """
+        sliceList = list(sliceTuple)
+        index = firstIndex
+        while not ringBuffer.isClosed:
+            sliceList[dimNr] = index
+            try:
+                slicedArray = readSliceUncached(rti, tuple(sliceList))
+            except Exception as ex:
+                logger.warning("Playback stopped. Unable to read slice: {}".format(ex))
+                return
+
+            if not ringBuffer.put((index, slicedArray)):
+                return
+            index = (index + 1) % dimSize
+
+
+    @QtSlot()
+    def _showNextFrame(self):
+        """ Takes the next frame from the ring buffer and emits it.
+
+            If more than one timer interval has passed since the previous tick (because drawing
+            took too long), the frames that should have been shown in between are skipped.
+        """
+        if self._ringBuffer is None:
+            return
+
+        now = time.time()
+        numFrames = 1
+        if self._lastTickTime is not None:
+            interval = 1.0 / self._targetFps
+            numFrames = max(1, int(round((now - self._lastTickTime) / interval)))
+        self._lastTickTime = now
+
+        frame = None
+        for _ in range(numFrames):
+            nextFrame = self._ringBuffer.get()
+            if nextFrame is None:
+                break
+            if frame is not None:
+                self._droppedFrames += 1
+            frame = nextFrame
+
+        if frame is None:
+            self._droppedFrames += 1 # The producer could not keep up
+        else:
+            self._statsNumFrames += 1
+            index, slicedArray = frame
+            self.sigFrame.emit(index, slicedArray)
+
+        duration = time.time() - self._statsStartTime
+        if duration >= 1.0:
+            self._achievedFps = self._statsNumFrames / duration
+            self._statsStartTime = time.time()
+            self._statsNumFrames = 0
+            logger.debug("Playback: {:.1f} fps, {} dropped frames"
+                         .format(self._achievedFps, self._droppedFrames))
+            self.sigStatistics.emit(self._achievedFps, self._droppedFrames)
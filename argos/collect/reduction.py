@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Reduction (e.g. mean or maximum) of a dimension over a range of indices.
+
+    The reduction is computed in a streaming fashion. The range is read in chunks and each chunk
+    is added to an accumulator, so the complete range never has to be in memory.
+"""
+from __future__ import print_function
+
+import logging
+import numpy as np
+import numpy.ma as ma
+
+from collections import namedtuple
+
+from argos.repo.baserti import RTI_READ_LOCK
+
+logger = logging.getLogger(__name__)
+
+NO_REDUCTION = ''
+REDUCER_NAMES = ('mean', 'nanmean', 'max', 'min', 'sum')
+
+REDUCTION_CHUNK_BYTES = 32 * 1024 * 1024  # Read at most this many bytes per chunk.
+
+
+class Reduction(namedtuple('Reduction', ['start', 'stop', 'reducer'])):
+    """ Element of a slice tuple that reduces a dimension over the range start:stop.
+
+        It is hashable so that it can be part of the key of the slice cache. The result is thus
+        cached per range and reducer.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return "{}({}:{})".format(self.reducer, self.start, self.stop)
+
+
+
+def isReduction(elem):
+    """ Returns True if the element of a slice tuple is a Reduction.
+    """
+    return isinstance(elem, Reduction)
+
+
+
+class ReductionAccumulator(object):
+    """ Accumulates chunks of an array and reduces them along an axis.
+
+        Masked values are ignored. For the nanmean reducer NaNs are ignored as well. Elements for
+        which all values were ignored are masked in the result.
+    """
+    def __init__(self, reducer, axis):
+        """ Constructor
+
+            :param reducer: one of the REDUCER_NAMES
+            :param axis: the axis of the chunks that is reduced.
+        """
+        assert reducer in REDUCER_NAMES, "Unknown reducer: {!r}".format(reducer)
+        self._reducer = reducer
+        self._axis = axis
+        self._result = None  # The running sum, maximum or minimum.
+        self._count = None   # The number of values that are not ignored.
+
+
+    def add(self, chunk):
+        """ Adds a chunk (regular or masked array) to the reduction.
+        """
+        data = ma.getdata(chunk)
+        if data.dtype.names:
+            raise TypeError("Structured arrays can't be reduced")
+
+        valid = ~ma.getmaskarray(chunk)
+        if self._reducer == 'nanmean' and data.dtype.kind in 'fc':
+            valid &= ~np.isnan(data)
+
+        if self._reducer in ('max', 'min'):
+            identity = self._identity(data.dtype)
+            chunkResult = np.where(valid, data, identity)
+            if self._reducer == 'max':
+                chunkResult = np.max(chunkResult, axis=self._axis)
+            else:
+                chunkResult = np.min(chunkResult, axis=self._axis)
+        else:
+            dtype = np.float64 if self._reducer in ('mean', 'nanmean') else None
+            if dtype is None and data.dtype.kind in 'biu':
+                dtype = np.int64
+            chunkResult = np.sum(np.where(valid, data, 0), axis=self._axis, dtype=dtype)
+
+        chunkCount = np.sum(valid, axis=self._axis)
+
+        if self._result is None:
+            self._result = chunkResult
+            self._count = chunkCount
+        else:
+            if self._reducer == 'max':
+                self._result = np.maximum(self._result, chunkResult)
+            elif self._reducer == 'min':
+                self._result = np.minimum(self._result, chunkResult)
+            else:
+                self._result = self._result + chunkResult
+            self._count = self._count + chunkCount
+
+
+    def _identity(self, dtype):
+        """ Returns the value that is used for ignored elements in a maximum or minimum.
+        """
+        isMax = self._reducer == 'max'
+        if dtype.kind in 'fc':
+            return -np.inf if isMax else np.inf
+        elif dtype.kind in 'iu':
+            info = np.iinfo(dtype)
+            return info.min if isMax else info.max
+        elif dtype.kind == 'b':
+            return not isMax
+        else:
+            raise TypeError("Can't compute the {} of an array of type {}"
+                            .format(self._reducer, dtype))
+
+
+    def result(self):
+        """ Returns the reduction as a masked array.
+        """
+        assert self._result is not None, "No chunks have been added"
+        mask = self._count == 0
+        if self._reducer in ('mean', 'nanmean'):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                data = self._result / np.maximum(self._count, 1)
+        else:
+            data = self._result
+        return ma.MaskedArray(data, mask=mask)
+
+
+
+def reductionChunkLength(rti, sliceTuple, dimNr):
+    """ Returns the number of indices of dimension dimNr that are read per chunk.
+
+        The chunks are such that they don't exceed REDUCTION_CHUNK_BYTES (assuming 8 bytes per
+        element), but contain at least one index.
+    """
+    with RTI_READ_LOCK:
+        arrayShape = rti.arrayShape
+
+    numElements = 1
+    for elem, dimSize in zip(sliceTuple, arrayShape):
+        if isinstance(elem, slice):
+            numElements *= len(range(*elem.indices(dimSize)))
+    return max(1, REDUCTION_CHUNK_BYTES // (8 * max(1, numElements)))
+
+
+def readReduction(readFunction, rti, sliceTuple):
+    """ Reads a slice tuple that contains one or more Reduction elements.
+
+        The first reduced dimension is read in chunks. Each chunk is read with readFunction,
+        which is called recursively if the chunk still contains reductions.
+
+        :param readFunction: function(rti, sliceTuple) that reads the chunks without reductions.
+        :return: masked array.
+    """
+    reducedNrs = [nr for nr, elem in enumerate(sliceTuple) if isReduction(elem)]
+    assert reducedNrs, "Slice tuple contains no reductions: {}".format(sliceTuple)
+    dimNr = reducedNrs[0]
+    reduction = sliceTuple[dimNr]
+    start, stop = reduction.start, reduction.stop
+    if stop <= start:
+        raise ValueError("Empty reduction range: {}".format(reduction))
+
+    # Dimensions that are indexed with an integer, or reduced, don't occur in the chunks.
+    axis = len([elem for elem in sliceTuple[:dimNr] if isinstance(elem, slice)])
+
+    chunkLength = reductionChunkLength(rti, sliceTuple, dimNr)
+    accumulator = ReductionAccumulator(reduction.reducer, axis)
+    sliceList = list(sliceTuple)
+    for chunkStart in range(start, stop, chunkLength):
+        sliceList[dimNr] = slice(chunkStart, min(stop, chunkStart + chunkLength))
+        chunkTuple = tuple(sliceList)
+        if len(reducedNrs) > 1:
+            chunk = readReduction(readFunction, rti, chunkTuple)
+        else:
+            chunk = readFunction(rti, chunkTuple)
+        accumulator.add(chunk)
+
+    return accumulator.result()
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Cache for the slices that the collectors read from the repository tree items.
+"""
+from __future__ import print_function
+
+import itertools, logging, os, threading
+import numpy as np
+import numpy.ma as ma
+
+from collections import OrderedDict
+
+from argos.collect.reduction import isReduction, readReduction
+from argos.repo.baserti import RTI_READ_LOCK
+from argos.utils.masks import ArrayWithMask
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+REGION_TILE_SIZE = 256  # Number of elements per dimension of the tiles of a region of interest
+
+
+def sliceKey(sliceTuple):
+    """ Converts a tuple of slices and integers to a hashable key.
+
+        Slice objects are not hashable (in Python < 3.12), so they are replaced by a
+        (start, stop, step) tuple.
+    """
+    key = []
+    for elem in sliceTuple:
+        if isinstance(elem, slice):
+            key.append(('slice', elem.start, elem.stop, elem.step))
+        else:
+            key.append(elem)
+    return tuple(key)
+
+
+def isRegionSlice(elem):
+    """ Returns True if the element of a slice tuple selects a region of interest.
+
+        Regions of interest are slices with an explicit start and stop. They are read in tiles.
+    """
+    return isinstance(elem, slice) and elem.start is not None and elem.stop is not None
+
+
+def regionTiles(regionSlice):
+    """ Splits the slice of a region of interest into tiles.
+
+        The tile boundaries lie on a fixed grid (anchored at index 0), so that overlapping
+        regions share their tiles. The slice step is retained.
+    """
+    start, stop, step = regionSlice.start, regionSlice.stop, regionSlice.step or 1
+    tileLength = REGION_TILE_SIZE * step
+    tiles = []
+    tileStart = start
+    while tileStart < stop:
+        tileStop = min(stop, (tileStart // tileLength + 1) * tileLength)
+        tiles.append(slice(tileStart, tileStop, step))
+        tileStart = tileStop
+    return tiles
+
+
+def readFromRti(rti, sliceTuple):
+    """ Reads a slice from the RTI, bypassing the cache.
+    """
+    with RTI_READ_LOCK:
+        return rti[sliceTuple]
+
+
+def readSliceUncached(rti, sliceTuple):
+    """ Reads a slice from the RTI, bypassing the cache. Reductions are computed chunk by chunk.
+
+        Returns an ArrayWithMask with a compact mask (see compactSlice).
+    """
+    if any(isReduction(elem) for elem in sliceTuple):
+        slicedArray = readReduction(readFromRti, rti, sliceTuple)
+    else:
+        slicedArray = readFromRti(rti, sliceTuple)
+    return compactSlice(slicedArray, rti.metadata.missingDataValue)
+
+
+def compactSlice(slicedArray, missingValue=None):
+    """ Converts a slice (e.g. a masked array or scalar) to an ArrayWithMask with a compact mask.
+
+        The mask is compacted once, when the slice is read, so that the slice cache holds the
+        compact mask instead of a boolean array.
+    """
+    # The getdata function converts a scalar to a zero-dimensional array.
+    awm = ArrayWithMask(ma.getdata(slicedArray), ma.getmask(slicedArray),
+                        getattr(slicedArray, 'fill_value', None))
+    awm.compactMask(missingValue=missingValue)
+    return awm
+
+
+def arrayNumBytes(array):
+    """ Returns the number of bytes that the data and mask of a (masked) array occupy.
+
+        The array can also be an ArrayWithMask, of which the stored (compact) mask is counted.
+    """
+    if isinstance(array, ArrayWithMask):
+        mask = array.storedMask
+        return array.data.nbytes + (0 if isinstance(mask, bool) else mask.nbytes)
+
+    numBytes = array.nbytes
+    if isinstance(array, ma.MaskedArray) and array.mask is not ma.nomask:
+        numBytes += array.mask.nbytes
+    return numBytes
+
+
+class SliceCache(object):
+    """ Least recently used (LRU) cache for slices read from repository tree items (RTIs).
+
+        The cache is shared between all collectors (and thus all windows). Entries are
+        identified by file name, node path, slice tuple and the modification time of the file,
+        so that a file that is changed on disk will not yield stale slices.
+
+        Only RTIs that are backed by a file are cached. The data of in-memory RTIs is already
+        available so there is no need to cache it.
+
+        The total number of bytes of the cached arrays is kept below maxBytes by discarding the
+        least recently used slices first. Slices that are larger than maxBytes are not cached.
+    """
+    _singleInstance = None
+
+    def __init__(self, maxBytes=DEFAULT_MAX_BYTES):
+        """ Constructor
+
+            :param maxBytes: the memory budget of the cache in bytes.
+        """
+        self._lock = threading.RLock()
+        self._entries = OrderedDict() # maps key to (array, numBytes) tuples
+        self._maxBytes = maxBytes
+        self._numBytes = 0
+        self._hits = 0
+        self._misses = 0
+
+
+    @classmethod
+    def singleton(cls):
+        """ Returns the SliceCache singleton, which is shared by all collectors.
+        """
+        if cls._singleInstance is None:
+            cls._singleInstance = cls()
+        return cls._singleInstance
+
+
+    def __repr__(self):
+        return ("<SliceCache: {} entries, {} of {} bytes, {} hits, {} misses>"
+                .format(len(self._entries), self._numBytes, self._maxBytes,
+                        self._hits, self._misses))
+
+
+    @property
+    def maxBytes(self):
+        """ The memory budget of the cache in bytes.
+        """
+        return self._maxBytes
+
+
+    @maxBytes.setter
+    def maxBytes(self, maxBytes):
+        """ Sets the memory budget. Discards the least recently used slices if needed.
+        """
+        with self._lock:
+            self._maxBytes = maxBytes
+            self._evict()
+
+
+    @property
+    def numBytes(self):
+        """ The number of bytes that is currently in use by the cached slices.
+        """
+        return self._numBytes
+
+
+    @property
+    def hits(self):
+        """ The number of cache hits since the cache was created or cleared.
+        """
+        return self._hits
+
+
+    @property
+    def misses(self):
+        """ The number of cache misses since the cache was created or cleared.
+        """
+        return self._misses
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+    @staticmethod
+    def fileModificationTime(rti):
+        """ Returns the modification time of the file of the RTI. Returns None if the RTI can't
+            be cached because it is not backed by a file.
+        """
+        fileName = rti.fileName
+        if not fileName or not os.path.isfile(fileName):
+            return None
+
+        try:
+            return os.path.getmtime(fileName)
+        except OSError as ex:
+            logger.debug("Unable to get modification time of {}: {}".format(fileName, ex))
+            return None
+
+
+    def createKey(self, rti, sliceTuple):
+        """ Returns the cache key of the slice of an RTI. Returns None if the RTI can't be cached.
+
+            The key consists of the file name, node path, slice tuple and file modification time.
+        """
+        modificationTime = self.fileModificationTime(rti)
+        if modificationTime is None:
+            return None
+        return self._createKey(rti, sliceTuple, modificationTime)
+
+
+    @staticmethod
+    def _createKey(rti, sliceTuple, modificationTime):
+        """ Returns the cache key given the modification time of the file of the RTI.
+        """
+        return (rti.fileName, rti.nodePath, sliceKey(sliceTuple), modificationTime)
+
+
+    def get(self, key):
+        """ Returns the cached array or None if the key is not in the cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries[key] = self._entries.pop(key) # Mark as most recently used
+            return entry[0]
+
+
+    def put(self, key, array):
+        """ Stores an array in the cache. Discards least recently used entries if needed.
+        """
+        numBytes = arrayNumBytes(array)
+        with self._lock:
+            self._remove(key)
+            if numBytes > self._maxBytes:
+                logger.debug("Slice of {} bytes exceeds cache size (not cached)".format(numBytes))
+                return
+
+            self._entries[key] = (array, numBytes)
+            self._numBytes += numBytes
+            self._evict()
+
+
+    def isCached(self, rti, sliceTuple):
+        """ Returns True if the slice (or all tiles of a region of interest) are in the cache.
+        """
+        modificationTime = self.fileModificationTime(rti)
+        if modificationTime is None:
+            return False
+
+        for tileTuple in self._tileTuples(sliceTuple):
+            if self._createKey(rti, tileTuple, modificationTime) not in self:
+                return False
+        return True
+
+
+    def readSlice(self, rti, sliceTuple):
+        """ Returns the slice of the RTI. Gets it from the cache or reads (and caches) it.
+
+            The slice is returned as an ArrayWithMask, so that the cache holds compact masks.
+            Regions of interest (slices with an explicit start and stop) are read per tile, so
+            that only the tiles that are not yet in the cache are read when the region moves.
+            Reductions are computed chunk by chunk; only their result is cached.
+
+            Can be called from a worker thread. The returned array may be in the cache, so it
+            should not be modified.
+        """
+        # The modification time is determined once, not for every tile.
+        modificationTime = self.fileModificationTime(rti)
+        tileTuples = self._tileTuples(sliceTuple)
+        if len(tileTuples) > 1:
+            return self._readRegion(rti, sliceTuple, tileTuples, modificationTime)
+        else:
+            return self._readTile(rti, sliceTuple, modificationTime)
+
+
+    def _readTile(self, rti, sliceTuple, modificationTime):
+        """ Returns a slice (or a tile of a region) from the cache or reads (and caches) it.
+
+            The slice is not cached if the modificationTime is None.
+        """
+        key = None
+        if modificationTime is not None:
+            key = self._createKey(rti, sliceTuple, modificationTime)
+            slicedArray = self.get(key)
+            if slicedArray is not None:
+                return slicedArray
+
+        slicedArray = readSliceUncached(rti, sliceTuple)
+        if key is not None:
+            self.put(key, slicedArray)
+        return slicedArray
+
+
+    @staticmethod
+    def _tileTuples(sliceTuple):
+        """ Returns the slice tuples of all tiles of a slice tuple.
+        """
+        tilesPerElem = [regionTiles(elem) if isRegionSlice(elem) else [elem]
+                        for elem in sliceTuple]
+        return [tuple(tileTuple) for tileTuple in itertools.product(*tilesPerElem)]
+
+
+    def _readRegion(self, rti, sliceTuple, tileTuples, modificationTime):
+        """ Reads a region of interest by reading its tiles and combining them into one array.
+
+            The combined array itself is not cached, only its tiles. Its mask is a boolean if
+            the masks of all tiles are the same boolean, otherwise a boolean array.
+        """
+        # The dimensions that are indexed with an integer don't occur in the result.
+        resultSlices = [elem for elem in sliceTuple if isinstance(elem, slice)]
+
+        data = None
+        fillValue = None
+        tiles = [] # (index, tile) tuples
+        for tileTuple in tileTuples:
+            tile = self._readTile(rti, tileTuple, modificationTime)
+            tileSlices = [elem for elem in tileTuple if isinstance(elem, slice)]
+            if data is None:
+                shape = [len(range(*elem.indices(dimSize))) for elem, dimSize
+                         in zip(resultSlices, self._resultDimSizes(rti, sliceTuple))]
+                data = np.empty(shape, dtype=tile.dtype)
+                fillValue = tile.fill_value
+
+            index = []
+            for resultSlice, tileSlice in zip(resultSlices, tileSlices):
+                offset = (tileSlice.start - resultSlice.start) // (resultSlice.step or 1)
+                index.append(slice(offset, offset + len(range(tileSlice.start, tileSlice.stop,
+                                                              tileSlice.step or 1))))
+            index = tuple(index)
+            data[index] = tile.data
+            tiles.append((index, tile))
+
+        storedMasks = [tile.storedMask for _index, tile in tiles]
+        if all(storedMask is False for storedMask in storedMasks):
+            mask = False
+        elif all(storedMask is True for storedMask in storedMasks):
+            mask = True
+        else:
+            mask = np.zeros(data.shape, dtype=ma.make_mask_descr(data.dtype))
+            for index, tile in tiles:
+                if tile.storedMask is not False:
+                    mask[index] = tile.mask
+
+        return ArrayWithMask(data, mask, fillValue)
+
+
+    @staticmethod
+    def _resultDimSizes(rti, sliceTuple):
+        """ Returns the RTI dimension sizes of the dimensions that are indexed with a slice.
+        """
+        with RTI_READ_LOCK:
+            arrayShape = rti.arrayShape
+        return [dimSize for elem, dimSize in zip(sliceTuple, arrayShape)
+                if isinstance(elem, slice)]
+
+
+    def clear(self):
+        """ Removes all slices from the cache and resets the statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._numBytes = 0
+            self._hits = 0
+            self._misses = 0
+
+
+    def _remove(self, key):
+        """ Removes an entry from the cache if present.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._numBytes -= entry[1]
+
+
+    def _evict(self):
+        """ Discards the least recently used entries until the cache is within its budget.
+        """
+        while self._entries and self._numBytes > self._maxBytes:
+            _key, (_array, numBytes) = self._entries.popitem(last=False)
+            self._numBytes -= numBytes
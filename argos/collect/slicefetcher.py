@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Reads slices from repository tree items in a worker thread.
+"""
+from __future__ import print_function
+
+import logging, threading
+
+from argos.collect.slicecache import SliceCache, arrayNumBytes
+from argos.qt import QtCore, QtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class SliceFetcher(QtCore.QObject):
+    """ Reads slices in a worker thread so that the GUI remains responsive.
+
+        There is at most one pending request. A new request replaces the pending one, so that
+        superseded requests are dropped without being read. When a slice has been read, the
+        sigSliceFetched signal is emitted. Since the fetcher lives in the GUI thread, the signal
+        is delivered there via the event loop.
+
+        The request number is passed along with the signal, so the receiver can ignore results of
+        requests that have been superseded while they were being read.
+
+        Slices can also be prefetched. These are read into the slice cache when there is no
+        pending request; no signal is emitted for them.
+    """
+    sigSliceFetched = QtSignal(int, object, object) # request number, sliced array, exception
+
+    def __init__(self, parent=None):
+        """ Constructor
+        """
+        super(SliceFetcher, self).__init__(parent=parent)
+        self._condition = threading.Condition()
+        self._pending = None        # (requestNr, rti, sliceTuple) tuple
+        self._lastRequestNr = 0
+        self._prefetchQueue = []    # list of (rti, sliceTuple) tuples
+        self._prefetchMaxBytes = 0
+        self._prefetchedBytes = 0
+        self._thread = None
+
+
+    @property
+    def lastRequestNr(self):
+        """ The number of the most recent request (or cancellation).
+        """
+        return self._lastRequestNr
+
+
+    def request(self, rti, sliceTuple):
+        """ Requests that a slice is read in the worker thread. Replaces any pending request.
+
+            Returns the request number.
+        """
+        with self._condition:
+            self._lastRequestNr += 1
+            self._pending = (self._lastRequestNr, rti, sliceTuple)
+            self._condition.notify()
+
+        self._startThread()
+        return self._lastRequestNr
+
+
+    def prefetch(self, rti, sliceTuples, maxBytes):
+        """ Reads the slices into the slice cache when the fetcher is otherwise idle.
+
+            Replaces the slices that are still waiting to be prefetched. Prefetching stops
+            when the total size of the prefetched slices exceeds maxBytes.
+        """
+        with self._condition:
+            self._prefetchQueue = [(rti, sliceTuple) for sliceTuple in sliceTuples]
+            self._prefetchMaxBytes = maxBytes
+            self._prefetchedBytes = 0
+            self._condition.notify()
+
+        self._startThread()
+
+
+    def cancelPrefetch(self):
+        """ Removes the slices that are waiting to be prefetched.
+        """
+        with self._condition:
+            self._prefetchQueue = []
+
+
+    def _startThread(self):
+        """ Starts the worker thread if it is not yet running.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="SliceFetcher")
+            self._thread.daemon = True
+            self._thread.start()
+
+
+    def cancel(self):
+        """ Drops the pending request. The result of a read that is in progress will be ignored
+            by the receiver since the request number is increased.
+        """
+        with self._condition:
+            self._lastRequestNr += 1
+            self._pending = None
+
+
+    def isCurrent(self, requestNr):
+        """ Returns True if the request has not been superseded or cancelled.
+        """
+        return requestNr == self._lastRequestNr
+
+
+    def _run(self):
+        """ Worker thread loop. Reads the requested slices and, when idle, prefetches slices.
+        """
+        while True:
+            with self._condition:
+                while self._pending is None and not self._prefetchQueue:
+                    self._condition.wait()
+
+                if self._pending is not None:
+                    requestNr, rti, sliceTuple = self._pending
+                    self._pending = None
+                else:
+                    requestNr = None
+                    rti, sliceTuple = self._prefetchQueue.pop(0)
+
+            if requestNr is None:
+                self._prefetchSlice(rti, sliceTuple)
+                continue
+
+            try:
+                slicedArray = SliceCache.singleton().readSlice(rti, sliceTuple)
+            except Exception as ex:
+                logger.warning("Unable to read slice {} of {}: {}".format(sliceTuple, rti, ex))
+                self.sigSliceFetched.emit(requestNr, None, ex)
+            else:
+                self.sigSliceFetched.emit(requestNr, slicedArray, None)
+
+
+    def _prefetchSlice(self, rti, sliceTuple):
+        """ Reads a slice into the slice cache. Stops prefetching when the memory cap is reached.
+        """
+        sliceCache = SliceCache.singleton()
+        key = sliceCache.createKey(rti, sliceTuple)
+        if key is None or key in sliceCache:
+            return
+
+        try:
+            slicedArray = sliceCache.readSlice(rti, sliceTuple)
+        except Exception as ex:
+            logger.debug("Unable to prefetch slice {} of {}: {}".format(sliceTuple, rti, ex))
+            return
+
+        with self._condition:
+            self._prefetchedBytes += arrayNumBytes(slicedArray)
+            if self._prefetchedBytes >= self._prefetchMaxBytes:
+                logger.debug("Prefetch memory cap reached ({} bytes)".format(self._prefetchedBytes))
+                self._prefetchQueue = []
@@ -20,13 +20,15 @@
 import logging
 from argos.config.groupcti import MainGroupCti
 from argos.info import DEBUGGING
-from argos.qt import QtWidgets, QtSlot
+from argos.qt import Qt, QtCore, QtWidgets, QtSlot
 from argos.utils.cls import type_name, check_class
 from argos.widgets.constants import DOCK_SPACING, DOCK_MARGIN
 from argos.widgets.display import MessageDisplay
 
 logger = logging.getLogger(__name__)
 
+LOADING_INDICATOR_DELAY = 250 # ms before the loading page is shown (prevents flickering)
+
 class InvalidDataError(Exception):
     """ Exception that should be raised if the inspector cannot handle this type of data.
         Can be used to distuingish the situation from other exceptions an then, for example,
@@ -43,10 +45,11 @@ class UpdateReason(object):
     RTI_CHANGED         = "repo tree item changed"
     COLLECTOR_COMBO_BOX = "collector combobox changed"
     COLLECTOR_SPIN_BOX  = "collector spinbox changed"
+    COLLECTOR_VIEWPORT  = "collector viewport changed"
     CONFIG_CHANGED      = "config changed"
 
     __VALID_REASONS = (NEW_MAIN_WINDOW, INSPECTOR_CHANGED, RTI_CHANGED,
-                       COLLECTOR_COMBO_BOX, COLLECTOR_SPIN_BOX, CONFIG_CHANGED)
+                       COLLECTOR_COMBO_BOX, COLLECTOR_SPIN_BOX, COLLECTOR_VIEWPORT, CONFIG_CHANGED)
 
 
     @classmethod
@@ -67,11 +70,13 @@ class UpdateReason(object):
 
 class AbstractInspector(QtWidgets.QStackedWidget):
     """ Abstract base class for inspectors.
-        An inspector is a stacked widget; it has a contents page and and error page.
+        An inspector is a stacked widget; it has a contents page, an error page and a page that
+        is shown while the collector is loading a slice.
     """
     _fullName = "base" # see the fullName() class method for explanation
     ERROR_PAGE_IDX = 0
     CONTENTS_PAGE_IDX = 1
+    LOADING_PAGE_IDX = 2
 
     def __init__(self, collector, parent=None):
         """ Constructor.
@@ -103,6 +108,16 @@ class AbstractInspector(QtWidgets.QStackedWidget):
         self.contentsLayout.setContentsMargins(DOCK_MARGIN, DOCK_MARGIN, DOCK_MARGIN, DOCK_MARGIN)
         self.contentsWidget.setLayout(self.contentsLayout)
 
+        self.loadingWidget = QtWidgets.QLabel("Loading...")
+        self.loadingWidget.setAlignment(Qt.AlignCenter)
+        self.addWidget(self.loadingWidget)
+
+        self._pageIdxBeforeLoading = self.CONTENTS_PAGE_IDX
+        self._loadingTimer = QtCore.QTimer(self)
+        self._loadingTimer.setSingleShot(True)
+        self._loadingTimer.setInterval(LOADING_INDICATOR_DELAY)
+        self._loadingTimer.timeout.connect(self._showLoadingPage)
+
         self.setCurrentIndex(self.CONTENTS_PAGE_IDX)
 
 
@@ -151,6 +166,16 @@ class AbstractInspector(QtWidgets.QStackedWidget):
         return tuple()
 
 
+    @classmethod
+    def readsBlocks(cls):
+        """ Returns True if the inspector reads the data itself in blocks (see
+            Collector.getSlicedArray), instead of using the complete sliced array.
+
+            The collector then doesn't read complete slices in the background.
+        """
+        return False
+
+
     @property
     def collector(self):
         """ The data collector from where this inspector gets its data
@@ -241,6 +266,29 @@ class AbstractInspector(QtWidgets.QStackedWidget):
         raise NotImplementedError()
 
 
+    def setLoading(self, isLoading):
+        """ Shows the loading page while the collector is loading a slice in the background.
+
+            The loading page is only shown after a short delay, so that it doesn't flicker when
+            a slice is loaded quickly.
+        """
+        if isLoading:
+            if not self._loadingTimer.isActive() and self.currentIndex() != self.LOADING_PAGE_IDX:
+                self._loadingTimer.start()
+        else:
+            self._loadingTimer.stop()
+            if self.currentIndex() == self.LOADING_PAGE_IDX:
+                self.setCurrentIndex(self._pageIdxBeforeLoading)
+
+
+    @QtSlot()
+    def _showLoadingPage(self):
+        """ Shows the loading page. Is called when the loading timer times out.
+        """
+        self._pageIdxBeforeLoading = self.currentIndex()
+        self.setCurrentIndex(self.LOADING_PAGE_IDX)
+
+
     def _showError(self, msg="", title="Error"):
         """ Shows an error message.
         """
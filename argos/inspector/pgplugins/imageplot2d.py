@@ -28,6 +28,7 @@ from collections import OrderedDict
 from argos.info import DEBUGGING
 from argos.config.boolcti import BoolCti, BoolGroupCti
 from argos.config.choicecti import ChoiceCti
+from argos.config.intcti import IntCti
 from argos.config.groupcti import MainGroupCti
 from argos.inspector.abstract import AbstractInspector, InvalidDataError, UpdateReason
 from argos.inspector.pgplugins.pgctis import (X_AXIS, Y_AXIS, BOTH_AXES, viewBoxAxisRange,
@@ -37,10 +38,12 @@ from argos.inspector.pgplugins.pgctis import (X_AXIS, Y_AXIS, BOTH_AXES, viewBox
                                                  PgGradientEditorItemCti, setXYAxesAutoRangeOn,
                                                  PgPlotDataItemCti)
 from argos.inspector.pgplugins.pgplotitem import ArgosPgPlotItem
-from argos.inspector.pgplugins.pghistlutitem import HistogramLUTItem
+from argos.inspector.pgplugins.pghistlutitem import (HistogramLUTItem,
+                                                     DEFAULT_HISTOGRAM_SAMPLE_SIZE)
+from argos.inspector.pgplugins.imagepyramid import PyramidImageItem
 from argos.qt import Qt, QtCore, QtGui, QtSlot
 from argos.utils.cls import array_has_real_numbers, check_class, is_an_array, to_string
-from argos.utils.masks import replaceMaskedValueWithFloat, maskedNanPercentile, ArrayWithMask
+from argos.utils.masks import replaceMaskedValueWithFloat, ArrayWithMask, DisplayBufferPool
 
 logger = logging.getLogger(__name__)
 
@@ -51,9 +54,13 @@ ROW_IMAGE,    COL_IMAGE    = 2, 1
 ROW_VER_LINE, COL_VER_LINE = 2, 2
 ROW_PROBE,    COL_PROBE    = 3, 0  # colspan = 2
 
+VIEWPORT_UPDATE_DELAY = 200 # ms after the last zoom/pan before the viewport is reported
+DEFAULT_MOUSE_MOVE_RATE = 60 # Mouse moves per second if the screen refresh rate is unknown
+CROSS_SECTION_STATS_CACHE_SIZE = 64 # Number of rows and columns for which statistics are kept
 
 
-def calcPgImagePlot2dDataRange(pgImagePlot2d, percentage, crossPlot):
+
+def calcPgImagePlot2dDataRange(pgImagePlot2d, percentage, crossPlot, approximate=False):
     """ Calculates the range from the inspectors' sliced array. Discards percentage of the minimum
         and percentage of the maximum values of the inspector.slicedArray
 
@@ -64,31 +71,38 @@ def calcPgImagePlot2dDataRange(pgImagePlot2d, percentage, crossPlot):
             horizontal or vertical cross hairs.
             If the cursor is outside the image, there is no valid data under the cross-hair and
             the range will be determined from the sliced array as a fall back.
+        :param approximate: if True, the percentiles of the complete sliced array are estimated
+            if the array is large (see ArrayWithMask.approximateStats).
     """
     check_class(pgImagePlot2d.slicedArray, ArrayWithMask) # sanity check
 
+    if approximate:
+        imageStats = pgImagePlot2d.slicedArray.approximateStats
+    else:
+        imageStats = pgImagePlot2d.slicedArray.stats
+
     if crossPlot is None:
-        array = pgImagePlot2d.slicedArray  # the whole image
+        stats = imageStats  # the whole image
 
     elif crossPlot == 'horizontal':
         if pgImagePlot2d.crossPlotRow is not None:
-            array = pgImagePlot2d.slicedArray.asMaskedArray()[pgImagePlot2d.crossPlotRow, :]
+            stats = pgImagePlot2d.crossSectionStats(row=pgImagePlot2d.crossPlotRow)
         else:
-            array = pgImagePlot2d.slicedArray # fall back on complete sliced array
+            stats = imageStats # fall back on complete sliced array
 
     elif crossPlot == 'vertical':
         if pgImagePlot2d.crossPlotCol is not None:
-            array = pgImagePlot2d.slicedArray.asMaskedArray()[:, pgImagePlot2d.crossPlotCol]
+            stats = pgImagePlot2d.crossSectionStats(col=pgImagePlot2d.crossPlotCol)
         else:
-            array = pgImagePlot2d.slicedArray # fall back on complete sliced array
+            stats = imageStats # fall back on complete sliced array
     else:
         raise ValueError("crossPlot must be: None, 'horizontal' or 'vertical', got: {}"
                          .format(crossPlot))
 
-    return maskedNanPercentile(array, (percentage, 100-percentage) )
+    return stats.discardedRange(percentage)
 
 
-def crossPlotAutoRangeMethods(pgImagePlot2d, crossPlot, intialItems=None):
+def crossPlotAutoRangeMethods(pgImagePlot2d, crossPlot, intialItems=None, approximate=False):
     """ Creates an ordered dict with autorange methods for an PgImagePlot2d inspector.
 
         :param pgImagePlot2d: the range methods will work on (the sliced array) of this inspector.
@@ -96,6 +110,7 @@ def crossPlotAutoRangeMethods(pgImagePlot2d, crossPlot, intialItems=None):
             if "horizontal" or "vertical" the range will be calculated from the data under the
             horizontal or vertical cross hairs
         :param intialItems: will be passed on to the  OrderedDict constructor.
+        :param approximate: if True, approximate percentiles are used for large sliced arrays.
     """
     rangeFunctions = OrderedDict({} if intialItems is None else intialItems)
 
@@ -103,20 +118,20 @@ def crossPlotAutoRangeMethods(pgImagePlot2d, crossPlot, intialItems=None):
     # data at the cross hair.
     if crossPlot:
         rangeFunctions['cross all data'] = partial(calcPgImagePlot2dDataRange, pgImagePlot2d,
-                                                   0.0, crossPlot)
+                                                   0.0, crossPlot, approximate)
         for percentage in [0.1, 0.2, 0.5, 1, 2, 5, 10, 20]:
             label = "cross discard {}%".format(percentage)
             rangeFunctions[label] = partial(calcPgImagePlot2dDataRange, pgImagePlot2d,
-                                            percentage, crossPlot)
+                                            percentage, crossPlot, approximate)
 
     # Always add functions that determine the data from the complete sliced array.
     for percentage in [0.1, 0.2, 0.5, 1, 2, 5, 10, 20]:
         rangeFunctions['image all data'] = partial(calcPgImagePlot2dDataRange, pgImagePlot2d,
-                                                   0.0, None)
+                                                   0.0, None, approximate)
 
         label = "image discard {}%".format(percentage)
         rangeFunctions[label] = partial(calcPgImagePlot2dDataRange, pgImagePlot2d,
-                                        percentage, None)
+                                        percentage, None, approximate)
     return rangeFunctions
 
 
@@ -159,7 +174,8 @@ class PgImagePlot2dCti(MainGroupCti):
 
         #### Color scale ####
 
-        colorAutoRangeFunctions = defaultAutoRangeMethods(self.pgImagePlot2d)
+        # Images can be large, so the color and histogram ranges use approximate percentiles.
+        colorAutoRangeFunctions = defaultAutoRangeMethods(self.pgImagePlot2d, approximate=True)
 
         self.histColorRangeCti = self.insertChild(
             PgHistLutColorRangeCti(pgImagePlot2d.histLutItem, colorAutoRangeFunctions,
@@ -168,12 +184,17 @@ class PgImagePlot2dCti(MainGroupCti):
         histViewBox = pgImagePlot2d.histLutItem.vb
         histViewBox.enableAutoRange(Y_AXIS, False)
         rangeFunctions = defaultAutoRangeMethods(self.pgImagePlot2d,
-            {PgAxisRangeCti.PYQT_RANGE: partial(viewBoxAxisRange, histViewBox, Y_AXIS)})
+            {PgAxisRangeCti.PYQT_RANGE: partial(viewBoxAxisRange, histViewBox, Y_AXIS)},
+            approximate=True)
 
         self.histRangeCti = self.insertChild(
             PgAxisRangeCti(histViewBox, Y_AXIS, nodeName='histogram range',
                            autoRangeFunctions=rangeFunctions))
 
+        self.histSampleSizeCti = self.insertChild(IntCti(
+            'histogram samples', DEFAULT_HISTOGRAM_SAMPLE_SIZE, minValue=0, maxValue=2**31 - 1,
+            stepSize=10000, specialValueText='all values'))
+
         self.insertChild(PgGradientEditorItemCti(self.pgImagePlot2d.histLutItem.gradient))
 
         # Probe and cross-hair plots
@@ -190,14 +211,16 @@ class PgImagePlot2dCti(MainGroupCti):
         self.horCrossPlotCti.insertChild(PgGridCti(pgImagePlot2d.horCrossPlotItem))
         self.horCrossPlotRangeCti = self.horCrossPlotCti.insertChild(PgAxisRangeCti(
             self.pgImagePlot2d.horCrossPlotItem.getViewBox(), Y_AXIS, nodeName="data range",
-            autoRangeFunctions = crossPlotAutoRangeMethods(self.pgImagePlot2d, "horizontal")))
+            autoRangeFunctions = crossPlotAutoRangeMethods(self.pgImagePlot2d, "horizontal",
+                                                          approximate=True)))
 
         self.verCrossPlotCti = self.crossPlotGroupCti.insertChild(BoolCti('vertical', False,
                                                                           expanded=False))
         self.verCrossPlotCti.insertChild(PgGridCti(pgImagePlot2d.verCrossPlotItem))
         self.verCrossPlotRangeCti = self.verCrossPlotCti.insertChild(PgAxisRangeCti(
             self.pgImagePlot2d.verCrossPlotItem.getViewBox(), X_AXIS, nodeName="data range",
-            autoRangeFunctions = crossPlotAutoRangeMethods(self.pgImagePlot2d, "vertical")))
+            autoRangeFunctions = crossPlotAutoRangeMethods(self.pgImagePlot2d, "vertical",
+                                                          approximate=True)))
 
         # Connect signals
         self.pgImagePlot2d.imagePlotItem.sigAxisReset.connect(self.setImagePlotAutoRangeOn)
@@ -264,6 +287,18 @@ class PgImagePlot2d(AbstractInspector):
         # in the collector.
         self.slicedArray = None
 
+        # Statistics of the recent cross sections for which the auto-range was calculated.
+        # Maps ('row', index) or ('col', index) to SliceStats, least recently used first.
+        self._crossSectionStats = OrderedDict()
+
+        # Buffers for the image data as it is displayed (with NaNs for masked and infinite values).
+        self._displayBufferPool = DisplayBufferPool()
+
+        # The slices with which the sliced array was read. Element i of the sliced array
+        # corresponds to index start + i * step in the RTI (see Collector.comboSlices).
+        self._rowSlice = slice(0, 1, 1)
+        self._colSlice = slice(0, 1, 1)
+
         self.titleLabel = pg.LabelItem('title goes here...')
 
         # The image item
@@ -271,7 +306,7 @@ class PgImagePlot2d(AbstractInspector):
         self.viewBox = self.imagePlotItem.getViewBox()
         self.viewBox.disableAutoRange(BOTH_AXES)
 
-        self.imageItem = pg.ImageItem()
+        self.imageItem = PyramidImageItem()
         self.imagePlotItem.addItem(self.imageItem)
 
         self.histLutItem = HistogramLUTItem() # what about GradientLegend?
@@ -305,6 +340,21 @@ class PgImagePlot2d(AbstractInspector):
         self.imagePlotItem.addItem(self.crossLineVertical, ignoreBounds=True)
         self.imagePlotItem.addItem(self.crossLineHorizontal, ignoreBounds=True)
 
+        # The items in the cross plots are created once and then updated when the mouse moves.
+        # The plot data items are replaced when the contents are drawn, to apply the config.
+        self.horCrossPlotDataItem = None
+        self.verCrossPlotDataItem = None
+        self.horCrossLine90 = pg.InfiniteLine(angle=90, movable=False, pen=self.crossPen)
+        self.horCrossLineShadow90 = pg.InfiniteLine(angle=90, movable=False,
+                                                    pen=self.crossShadowPen)
+        self.verCrossLine0 = pg.InfiniteLine(angle=0, movable=False, pen=self.crossPen)
+        self.verCrossLineShadow0 = pg.InfiniteLine(angle=0, movable=False,
+                                                   pen=self.crossShadowPen)
+        self.horCrossPlotItem.addItem(self.horCrossLineShadow90, ignoreBounds=True)
+        self.horCrossPlotItem.addItem(self.horCrossLine90, ignoreBounds=True)
+        self.verCrossPlotItem.addItem(self.verCrossLineShadow0, ignoreBounds=True)
+        self.verCrossPlotItem.addItem(self.verCrossLine0, ignoreBounds=True)
+
         self.probeLabel = pg.LabelItem('', justify='left')
 
         # Layout
@@ -337,16 +387,31 @@ class PgImagePlot2d(AbstractInspector):
         self._config = PgImagePlot2dCti(pgImagePlot2d=self, nodeName='2D image plot')
 
         # Connect signals
-        # Based mouseMoved on crosshair.py from the PyQtGraph examples directory.
-        # I did not use the SignalProxy because I did not see any difference.
-        self.imagePlotItem.scene().sigMouseMoved.connect(self.mouseMoved)
+        # Based mouseMoved on crosshair.py from the PyQtGraph examples directory. The mouse moves
+        # are rate-limited to the refresh rate of the screen, more updates would not be visible.
+        screen = QtGui.QGuiApplication.primaryScreen()
+        mouseMoveRate = screen.refreshRate() if screen is not None else 0
+        if not mouseMoveRate or mouseMoveRate <= 0:
+            mouseMoveRate = DEFAULT_MOUSE_MOVE_RATE
+        self._mouseMoveProxy = pg.SignalProxy(self.imagePlotItem.scene().sigMouseMoved,
+                                              rateLimit=mouseMoveRate,
+                                              slot=self._rateLimitedMouseMoved)
+
+        # Report the visible range to the collector after zooming or panning has finished.
+        self._viewportTimer = QtCore.QTimer(self)
+        self._viewportTimer.setSingleShot(True)
+        self._viewportTimer.setInterval(VIEWPORT_UPDATE_DELAY)
+        self._viewportTimer.timeout.connect(self._reportViewport)
+        self.viewBox.sigRangeChanged.connect(self._viewBoxRangeChanged)
 
 
     def finalize(self):
         """ Is called before destruction. Can be used to clean-up resources.
         """
         logger.debug("Finalizing: {}".format(self))
-        self.imagePlotItem.scene().sigMouseMoved.disconnect(self.mouseMoved)
+        self._viewportTimer.stop()
+        self.viewBox.sigRangeChanged.disconnect(self._viewBoxRangeChanged)
+        self._mouseMoveProxy.disconnect()
         self.imagePlotItem.close()
         self.graphicsLayoutWidget.close()
 
@@ -373,6 +438,9 @@ class PgImagePlot2d(AbstractInspector):
 
         # Don't clear the imagePlotItem, the imageItem is only added in the constructor.
         self.imageItem.clear()
+        self.histLutItem.setHistogramData(None)
+        self._displayBufferPool.clear()
+        self._crossSectionStats.clear()
         self.imagePlotItem.setLabel('left', '')
         self.imagePlotItem.setLabel('bottom', '')
 
@@ -384,13 +452,7 @@ class PgImagePlot2d(AbstractInspector):
         self.crossPlotRow, self.crossPlotCol = None, None
 
         self.probeLabel.setText('')
-        self.crossLineHorizontal.setVisible(False)
-        self.crossLineVertical.setVisible(False)
-        self.crossLineHorShadow.setVisible(False)
-        self.crossLineVerShadow.setVisible(False)
-
-        self.horCrossPlotItem.clear()
-        self.verCrossPlotItem.clear()
+        self._hideCrossHair()
 
 
     def _drawContents(self, reason=None, initiator=None):
@@ -401,6 +463,7 @@ class PgImagePlot2d(AbstractInspector):
         """
         self.crossPlotRow = None # reset because the sliced array shape may change
         self.crossPlotCol = None # idem dito
+        self._resetCrossPlotDataItems()
 
         gridLayout = self.graphicsLayoutWidget.ci.layout # A QGraphicsGridLayout
 
@@ -430,7 +493,16 @@ class PgImagePlot2d(AbstractInspector):
                 self.verPlotAdded = False
                 gridLayout.activate()
 
+        # Report the viewport before getting the sliced array, so that in level of detail mode
+        # the collector reads the data at the resolution of the viewport.
+        keepsViewRange = reason in (UpdateReason.COLLECTOR_SPIN_BOX,
+                                    UpdateReason.COLLECTOR_VIEWPORT, UpdateReason.CONFIG_CHANGED)
+        self.collector.setAxisViewRanges(self._viewRanges(fullRange=not keepsViewRange),
+                                         emitSignal=False)
+
         self.slicedArray = self.collector.getSlicedArray()
+        self._crossSectionStats.clear()
+        self._rowSlice, self._colSlice = self.collector.comboSlices()
 
         if not self._hasValidData():
             self._clearContents()
@@ -442,19 +514,14 @@ class PgImagePlot2d(AbstractInspector):
         # data values are replaced by NaNs. The PyQtGraph image plot shows this as the color at the
         # lowest end of the color scale. Unfortunately we cannot choose a missing-value color, but
         # at least the Nans do not influence for the histogram and color range.
-        # We don't update self.slicedArray here because the data probe should still be able to
-        # print the actual value.
-        imageArray = replaceMaskedValueWithFloat(self.slicedArray.data, self.slicedArray.mask,
-                                                 np.nan, copyOnReplace=True)
-
-        # Replace infinite value with Nans because PyQtGraph fails on them. WNote that the CTIs of
-        # the cross plots (e.g. horCrossPlotRangeCti) are still connected to self.slicedArray, so
-        # if the cross section consists of only infs, they may not able to update the autorange.
-        # A warning is issued in that case.
-        # We don't update self.slicedArray here because the data probe should still be able to
-        # print the actual value.
-        imageArray = replaceMaskedValueWithFloat(imageArray, np.isinf(self.slicedArray.data),
-                                                 np.nan, copyOnReplace=True)
+        # Infinite values are replaced with Nans as well because PyQtGraph fails on them. Note that
+        # the CTIs of the cross plots (e.g. horCrossPlotRangeCti) are still connected to
+        # self.slicedArray, so if the cross section consists of only infs, they may not able to
+        # update the autorange. A warning is issued in that case.
+        # Both replacements are done in a single pass into a buffer that is reused between
+        # redraws. We don't update self.slicedArray here because the data probe should still be
+        # able to print the actual value.
+        imageArray = self._displayBufferPool.displayArray(self.slicedArray)
 
         # Reset the axes ranges (via the config)
         if (reason == UpdateReason.RTI_CHANGED or
@@ -466,11 +533,18 @@ class PgImagePlot2d(AbstractInspector):
             self.config.horCrossPlotRangeCti.autoRangeCti.data = True
             self.config.verCrossPlotRangeCti.autoRangeCti.data = True
 
-        # PyQtGraph uses the following dimension order: T, X, Y, Color.
-        # We need to transpose the slicedArray ourselves because axes = {'x':1, 'y':0}
-        # doesn't seem to do anything.
-        imageArray = imageArray.transpose()
-        self.imageItem.setImage(imageArray, autoLevels=False)
+        # Place the image at the RTI indices, which differ from the array indices when the
+        # collector has read the data with a step. Large images are displayed with a pyramid of
+        # lower resolution images, so set the visible range first.
+        # The image item transposes the array because PyQtGraph uses the following dimension
+        # order: T, X, Y, Color.
+        nRows, nCols = self.slicedArray.shape
+        self._updateImageItemView()
+        self.histLutItem.setHistogramSampleSize(self.config.histSampleSizeCti.configValue)
+        self.histLutItem.setHistogramData(imageArray) # the image item may show only a part
+        self.imageItem.setPyramidImage(imageArray, QtCore.QRectF(
+            self._colSlice.start, self._rowSlice.start,
+            nCols * self._colSlice.step, nRows * self._rowSlice.step))
 
         self.horCrossPlotItem.invertX(self.config.xFlippedCti.configValue)
         self.verCrossPlotItem.invertY(self.config.yFlippedCti.configValue)
@@ -484,132 +558,226 @@ class PgImagePlot2d(AbstractInspector):
         self.config.updateTarget()
 
 
-    @QtSlot(object)
+    def crossSectionStats(self, row=None, col=None):
+        """ Returns the SliceStats of a row or column of the sliced array.
+
+            The statistics of the most recent rows and columns are kept, so that the cross
+            plot range functions don't have to recalculate them when the cursor returns to a
+            row or column.
+        """
+        assert (row is None) != (col is None), "Either row or col must be given"
+        key = ('row', row) if col is None else ('col', col)
+        stats = self._crossSectionStats.get(key)
+        if stats is None:
+            index = (row, slice(None)) if col is None else (slice(None), col)
+            crossSection = ArrayWithMask(self.slicedArray.data[index],
+                                         self.slicedArray.maskAt(index),
+                                         self.slicedArray.fill_value)
+            stats = crossSection.stats
+            self._crossSectionStats[key] = stats
+            while len(self._crossSectionStats) > CROSS_SECTION_STATS_CACHE_SIZE:
+                self._crossSectionStats.popitem(last=False)
+        else:
+            self._crossSectionStats[key] = self._crossSectionStats.pop(key) # most recently used
+        return stats
+
+
+    def _viewRanges(self, fullRange=False):
+        """ Returns the visible range and number of pixels of the Y and X axes.
+            If fullRange is True, the start and stop are None (the complete dimension).
+
+            Axes that are auto-ranged also report the complete dimension. Otherwise, when only a
+            region of interest is read, the auto-range would be restricted to that region.
+
+            See Collector.setAxisViewRanges for the format.
+        """
+        numRowPixels = int(self.viewBox.height()) or None
+        numColPixels = int(self.viewBox.width()) or None
+        if fullRange:
+            return [(None, None, numRowPixels), (None, None, numColPixels)]
+
+        (xMin, xMax), (yMin, yMax) = self.viewBox.viewRange()
+        if self.config.yAxisRangeCti.autoRangeCti.configValue:
+            yMin, yMax = None, None
+        if self.config.xAxisRangeCti.autoRangeCti.configValue:
+            xMin, xMax = None, None
+        return [(yMin, yMax, numRowPixels), (xMin, xMax, numColPixels)]
+
+
+    @QtSlot()
+    def _viewBoxRangeChanged(self):
+        """ Restarts the viewport timer. Is called when the view box is zoomed or panned.
+
+            Also lets the image item display the pyramid level and region that match the view.
+        """
+        self._updateImageItemView()
+        self._viewportTimer.start()
+
+
+    def _updateImageItemView(self):
+        """ Passes the visible range and the size of a screen pixel to the image item.
+        """
+        if self.viewBox.width() > 0 and self.viewBox.height() > 0:
+            pixelSize = self.viewBox.viewPixelSize()
+        else:
+            pixelSize = None # not yet layed out
+        self.imageItem.setViewRect(self.viewBox.viewRect(), pixelSize)
+
+
+    @QtSlot()
+    def _reportViewport(self):
+        """ Reports the visible range to the collector, which may then read the data again.
+        """
+        if self._hasValidData():
+            self.collector.setAxisViewRanges(self._viewRanges())
+
+
+    def _arrayIndexToRtiIndex(self, row, col):
+        """ Converts the row and column in the sliced array to indices in the RTI.
+        """
+        return (self._rowSlice.start + row * self._rowSlice.step,
+                self._colSlice.start + col * self._colSlice.step)
+
+
+    def _resetCrossPlotDataItems(self):
+        """ Replaces the plot data items of the cross plots by new items that use the config.
+        """
+        if self.horCrossPlotDataItem is not None:
+            self.horCrossPlotItem.removeItem(self.horCrossPlotDataItem)
+        if self.verCrossPlotDataItem is not None:
+            self.verCrossPlotItem.removeItem(self.verCrossPlotDataItem)
+
+        self.horCrossPlotDataItem = self.config.crossPenCti.createPlotDataItem()
+        self.verCrossPlotDataItem = self.config.crossPenCti.createPlotDataItem()
+        self.horCrossPlotItem.addItem(self.horCrossPlotDataItem)
+        self.verCrossPlotItem.addItem(self.verCrossPlotDataItem)
+        self._hideCrossHair()
+
+
+    def _hideCrossHair(self):
+        """ Hides the cross hair lines and clears the cross plots.
+        """
+        for line in (self.crossLineHorizontal, self.crossLineVertical,
+                     self.crossLineHorShadow, self.crossLineVerShadow,
+                     self.horCrossLine90, self.horCrossLineShadow90,
+                     self.verCrossLine0, self.verCrossLineShadow0):
+            line.setVisible(False)
+
+        for plotDataItem in (self.horCrossPlotDataItem, self.verCrossPlotDataItem):
+            if plotDataItem is not None:
+                plotDataItem.clear()
+
+
+    @staticmethod
+    def _crossSectionPlotData(data, mask):
+        """ Returns the data of a cross section, with infinite values replaced by NaNs, and an
+            array that is True for points that are connected in the plot.
+        """
+        # First determine which points are connected or separated by masks/nans.
+        connected = np.isfinite(data)
+        if is_an_array(mask):
+            connected = np.logical_and(connected, ~mask)
+        else:
+            connected = np.zeros_like(data) if mask else connected
+
+        # Replace infinite value with nans because PyQtGraph can't handle them
+        data = replaceMaskedValueWithFloat(data, np.isinf(data), np.nan, copyOnReplace=True)
+        return data, connected
+
+
+    def _rateLimitedMouseMoved(self, args):
+        """ Called by the mouse move signal proxy, with the arguments of the last mouse move.
+        """
+        self.mouseMoved(*args)
+
+
     def mouseMoved(self, viewPos):
         """ Updates the probe text with the values under the cursor.
             Draws a vertical line and a symbol at the position of the probe.
+
+            The cross plots are only updated if the row or column under the cursor has changed.
         """
         try:
             check_class(viewPos, QtCore.QPointF)
-            show_data_point = False # shows the data point as a circle in the cross hair plots
-            self.crossPlotRow, self.crossPlotCol = None, None
-
-            self.probeLabel.setText("<span style='color: #808080'>no data at cursor</span>")
-            self.crossLineHorizontal.setVisible(False)
-            self.crossLineVertical.setVisible(False)
-            self.crossLineHorShadow.setVisible(False)
-            self.crossLineVerShadow.setVisible(False)
-
-            self.horCrossPlotItem.clear()
-            self.verCrossPlotItem.clear()
+            row, col = None, None
 
             if (self._hasValidData() and self.slicedArray is not None
                 and self.viewBox.sceneBoundingRect().contains(viewPos)):
 
                 # Calculate the row and column at the cursor. We use math.floor because the pixel
                 # corners of the image lie at integer values (and not the centers of the pixels).
+                # The sliced array may have been read with a step; convert to array indices.
                 scenePos = self.viewBox.mapSceneToView(viewPos)
-                row, col = math.floor(scenePos.y()), math.floor(scenePos.x())
+                row = math.floor((scenePos.y() - self._rowSlice.start) / self._rowSlice.step)
+                col = math.floor((scenePos.x() - self._colSlice.start) / self._colSlice.step)
                 row, col = int(row), int(col) # Needed in Python 2
                 nRows, nCols = self.slicedArray.shape
 
-                if (0 <= row < nRows) and (0 <= col < nCols):
-                    self.viewBox.setCursor(Qt.CrossCursor)
-
-                    self.crossPlotRow, self.crossPlotCol = row, col
-                    index = tuple([row, col])
-                    valueStr = to_string(self.slicedArray[index],
-                                         masked=self.slicedArray.maskAt(index),
-                                         maskFormat='&lt;masked&gt;')
-                    txt = "pos = ({:d}, {:d}), value = {}".format(row, col, valueStr)
-                    self.probeLabel.setText(txt)
-
-                    # Show cross section at the cursor pos in the line plots
-                    if self.config.horCrossPlotCti.configValue:
-                        self.crossLineHorShadow.setVisible(True)
-                        self.crossLineHorizontal.setVisible(True)
-                        self.crossLineHorShadow.setPos(row)
-                        self.crossLineHorizontal.setPos(row)
-
-                        # Line plot of cross section row.
-                        # First determine which points are connected or separated by masks/nans.
-                        rowData = self.slicedArray.data[row, :]
-                        connected = np.isfinite(rowData)
-                        if is_an_array(self.slicedArray.mask):
-                            connected = np.logical_and(connected, ~self.slicedArray.mask[row, :])
-                        else:
-                            connected = (np.zeros_like(rowData)
-                                         if self.slicedArray.mask else connected)
-
-                        # Replace infinite value with nans because PyQtGraph can't handle them
-                        rowData = replaceMaskedValueWithFloat(rowData, np.isinf(rowData),
-                                                              np.nan, copyOnReplace=True)
-
-                        horPlotDataItem = self.config.crossPenCti.createPlotDataItem()
-                        horPlotDataItem.setData(rowData, connect=connected)
-                        self.horCrossPlotItem.addItem(horPlotDataItem)
-
-                        # Vertical line in hor-cross plot
-                        crossLineShadow90 = pg.InfiniteLine(angle=90, movable=False,
-                                                            pen=self.crossShadowPen)
-                        crossLineShadow90.setPos(col)
-                        self.horCrossPlotItem.addItem(crossLineShadow90, ignoreBounds=True)
-                        crossLine90 = pg.InfiniteLine(angle=90, movable=False, pen=self.crossPen)
-                        crossLine90.setPos(col)
-                        self.horCrossPlotItem.addItem(crossLine90, ignoreBounds=True)
-
-                        if show_data_point:
-                            crossPoint90 = pg.PlotDataItem(symbolPen=self.crossPen)
-                            crossPoint90.setSymbolBrush(QtGui.QBrush(self.config.crossPenCti.penColor))
-                            crossPoint90.setSymbolSize(10)
-                            crossPoint90.setData((col,), (rowData[col],))
-                            self.horCrossPlotItem.addItem(crossPoint90, ignoreBounds=True)
-
-                        self.config.horCrossPlotRangeCti.updateTarget() # update auto range
-                        del rowData # defensive programming
-
-                    if self.config.verCrossPlotCti.configValue:
-                        self.crossLineVerShadow.setVisible(True)
-                        self.crossLineVertical.setVisible(True)
-                        self.crossLineVerShadow.setPos(col)
-                        self.crossLineVertical.setPos(col)
-
-                        # Line plot of cross section row.
-                        # First determine which points are connected or separated by masks/nans.
-                        colData = self.slicedArray.data[:, col]
-                        connected = np.isfinite(colData)
-                        if is_an_array(self.slicedArray.mask):
-                            connected = np.logical_and(connected, ~self.slicedArray.mask[:, col])
-                        else:
-                            connected = (np.zeros_like(colData)
-                                         if self.slicedArray.mask else connected)
-
-                        # Replace infinite value with nans because PyQtGraph can't handle them
-                        colData = replaceMaskedValueWithFloat(colData, np.isinf(colData),
-                                                              np.nan, copyOnReplace=True)
-
-                        verPlotDataItem = self.config.crossPenCti.createPlotDataItem()
-                        verPlotDataItem.setData(colData, np.arange(nRows), connect=connected)
-                        self.verCrossPlotItem.addItem(verPlotDataItem)
-
-                        # Horizontal line in ver-cross plot
-                        crossLineShadow0 = pg.InfiniteLine(angle=0, movable=False,
-                                                           pen=self.crossShadowPen)
-                        crossLineShadow0.setPos(row)
-                        self.verCrossPlotItem.addItem(crossLineShadow0, ignoreBounds=True)
-                        crossLine0 = pg.InfiniteLine(angle=0, movable=False, pen=self.crossPen)
-                        crossLine0.setPos(row)
-                        self.verCrossPlotItem.addItem(crossLine0, ignoreBounds=True)
-
-                        if show_data_point:
-                            crossPoint0 = pg.PlotDataItem(symbolPen=self.crossPen)
-                            crossPoint0.setSymbolBrush(QtGui.QBrush(self.config.crossPenCti.penColor))
-                            crossPoint0.setSymbolSize(10)
-                            crossPoint0.setData((colData[row],), (row,))
-                            self.verCrossPlotItem.addItem(crossPoint0, ignoreBounds=True)
-
-                        self.config.verCrossPlotRangeCti.updateTarget() # update auto range
-                        del colData # defensive programming
+                if not ((0 <= row < nRows) and (0 <= col < nCols)):
+                    row, col = None, None
+
+            rowChanged = row != self.crossPlotRow
+            colChanged = col != self.crossPlotCol
+            if not rowChanged and not colChanged:
+                return
+
+            self.crossPlotRow, self.crossPlotCol = row, col
+            if row is None:
+                self.probeLabel.setText("<span style='color: #808080'>no data at cursor</span>")
+                self._hideCrossHair()
+                return
+
+            self.viewBox.setCursor(Qt.CrossCursor)
+            rtiRow, rtiCol = self._arrayIndexToRtiIndex(row, col)
+            index = tuple([row, col])
+            valueStr = to_string(self.slicedArray[index],
+                                 masked=self.slicedArray.maskAt(index),
+                                 maskFormat='&lt;masked&gt;')
+            txt = "pos = ({:d}, {:d}), value = {}".format(rtiRow, rtiCol, valueStr)
+            self.probeLabel.setText(txt)
+
+            # Show cross section at the cursor pos in the line plots
+            if self.config.horCrossPlotCti.configValue:
+                for line in (self.crossLineHorShadow, self.crossLineHorizontal,
+                             self.horCrossLineShadow90, self.horCrossLine90):
+                    line.setVisible(True)
+                self.crossLineHorShadow.setPos(rtiRow)
+                self.crossLineHorizontal.setPos(rtiRow)
+
+                # Vertical line in hor-cross plot
+                self.horCrossLineShadow90.setPos(rtiCol)
+                self.horCrossLine90.setPos(rtiCol)
+
+                if rowChanged:
+                    # Line plot of cross section row.
+                    rowData, connected = self._crossSectionPlotData(
+                        self.slicedArray.data[row, :],
+                        self.slicedArray.maskAt((row, slice(None))))
+                    rtiCols = self._colSlice.start + np.arange(nCols) * self._colSlice.step
+                    self.horCrossPlotDataItem.setData(rtiCols, rowData, connect=connected)
+                    self.config.horCrossPlotRangeCti.updateTarget() # update auto range
+                    del rowData # defensive programming
+
+            if self.config.verCrossPlotCti.configValue:
+                for line in (self.crossLineVerShadow, self.crossLineVertical,
+                             self.verCrossLineShadow0, self.verCrossLine0):
+                    line.setVisible(True)
+                self.crossLineVerShadow.setPos(rtiCol)
+                self.crossLineVertical.setPos(rtiCol)
+
+                # Horizontal line in ver-cross plot
+                self.verCrossLineShadow0.setPos(rtiRow)
+                self.verCrossLine0.setPos(rtiRow)
+
+                if colChanged:
+                    # Line plot of cross section column.
+                    colData, connected = self._crossSectionPlotData(
+                        self.slicedArray.data[:, col],
+                        self.slicedArray.maskAt((slice(None), col)))
+                    rtiRows = self._rowSlice.start + np.arange(nRows) * self._rowSlice.step
+                    self.verCrossPlotDataItem.setData(colData, rtiRows, connect=connected)
+                    self.config.verCrossPlotRangeCti.updateTarget() # update auto range
+                    del colData # defensive programming
 
         except Exception as ex:
             # In contrast to _drawContents, this function is a slot and thus must not throw
@@ -0,0 +1,464 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Multi-resolution (mipmap) pyramid of an image and an image item that displays it.
+"""
+from __future__ import division, print_function
+
+import logging, math, threading
+import numpy as np
+import pyqtgraph as pg
+
+from argos.qt import QtCore, QtSignal, QtSlot
+
+logger = logging.getLogger(__name__)
+
+PYRAMID_MIN_SIZE = 2048 * 2048  # Images with less pixels are displayed without a pyramid.
+PYRAMID_MIN_LEVEL_SIZE = 512    # Levels are added until both dimensions are at most this size.
+PYRAMID_TILE_SIZE = 256         # The visible region is extended to multiples of this size.
+
+
+def numPyramidLevels(shape):
+    """ Returns the number of levels of the pyramid of an image with the given shape (including
+        level 0, the image itself).
+    """
+    numLevels = 1
+    while max(shape) > PYRAMID_MIN_LEVEL_SIZE:
+        shape = tuple((size + 1) // 2 for size in shape)
+        numLevels += 1
+    return numLevels
+
+
+def downsampleImage(image):
+    """ Halves the resolution of a float image by averaging blocks of 2 x 2 pixels.
+
+        NaNs are ignored; a block that contains only NaNs results in a NaN. If a dimension has an
+        odd length, the last row or column is averaged with nothing (i.e. it is copied).
+    """
+    nRows, nCols = image.shape
+    result = np.empty(((nRows + 1) // 2, (nCols + 1) // 2), dtype=image.dtype)
+
+    # Process the image in strips of rows to keep the temporary arrays small.
+    stripRows = max(2, 2 * (1024 * 1024 // max(1, nCols)))
+    for start in range(0, nRows, stripRows):
+        strip = image[start:start + stripRows]
+        if strip.shape[0] % 2:
+            strip = np.concatenate([strip, strip[-1:]]) # only happens for the last strip
+        if nCols % 2:
+            strip = np.concatenate([strip, strip[:, -1:]], axis=1)
+
+        valid = ~np.isnan(strip)
+        sums = np.where(valid, strip, 0).reshape(strip.shape[0] // 2, 2, -1, 2).sum(axis=(1, 3))
+        counts = valid.reshape(strip.shape[0] // 2, 2, -1, 2).sum(axis=(1, 3))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[start // 2:(start + strip.shape[0]) // 2] = sums / counts
+    return result
+
+
+
+class ImagePyramid(QtCore.QObject):
+    """ Mipmap pyramid of an image. Level 0 is the image itself, each next level has half the
+        resolution of the previous one.
+
+        The levels are computed in a background thread. The sigLevelAdded signal is emitted
+        (in the GUI thread) when a level becomes available.
+    """
+    sigLevelAdded = QtSignal(int, int) # generation, level number
+
+    def __init__(self, parent=None):
+        """ Constructor
+        """
+        super(ImagePyramid, self).__init__(parent=parent)
+        self._lock = threading.Lock()
+        self._levels = []
+        self._generation = 0
+
+
+    @property
+    def numLevels(self):
+        """ The number of levels that are currently available.
+        """
+        return len(self._levels)
+
+
+    @property
+    def generation(self):
+        """ Is increased each time the base image is set or cleared.
+        """
+        return self._generation
+
+
+    def level(self, levelNr):
+        """ Returns the image of a level.
+        """
+        return self._levels[levelNr]
+
+
+    def setImage(self, image):
+        """ Sets the base image (level 0) and starts building the other levels.
+
+            The image should not be changed while the levels are built. If it is, setImage or
+            clear should be called again, which causes the previous levels to be discarded.
+        """
+        with self._lock:
+            self._generation += 1
+            self._levels = [image]
+            generation = self._generation
+
+        if max(image.shape) > PYRAMID_MIN_LEVEL_SIZE:
+            thread = threading.Thread(target=self._buildLevels, args=(generation, image),
+                                      name="ImagePyramid")
+            thread.daemon = True
+            thread.start()
+
+
+    def clear(self):
+        """ Discards all levels. Levels that are still being built will be discarded as well.
+        """
+        with self._lock:
+            self._generation += 1
+            self._levels = []
+
+
+    def _buildLevels(self, generation, image):
+        """ Thread function that builds the levels. Stops when the image is replaced.
+        """
+        levelNr = 0
+        try:
+            while max(image.shape) > PYRAMID_MIN_LEVEL_SIZE:
+                image = downsampleImage(image)
+                levelNr += 1
+                with self._lock:
+                    if generation != self._generation:
+                        return
+                    self._levels.append(image)
+                self.sigLevelAdded.emit(generation, levelNr)
+        except Exception as ex:
+            logger.warning("Unable to build level {} of image pyramid: {}".format(levelNr, ex))
+
+
+
+class PyramidImageItem(pg.ImageItem):
+    """ Image item that displays a large image using a mipmap pyramid.
+
+        When zoomed out, a lower resolution level of the pyramid is displayed. When zoomed in,
+        only the region of the image that is visible (plus a margin) is displayed. PyQtGraph
+        therefore only has to apply the lookup table to about as many pixels as there are on the
+        screen. While the levels are built in the background, a subsample of the image with the
+        resolution of the level is shown.
+
+        Small images are displayed completely, as by the regular ImageItem.
+
+        The bounding rectangle is always that of the complete image, so that the auto-range of the
+        view box is not affected by the displayed region.
+    """
+    def __init__(self, *args, **kwargs):
+        """ Constructor. See pg.ImageItem.
+        """
+        super(PyramidImageItem, self).__init__(*args, **kwargs)
+        self._pyramid = ImagePyramid()
+        self._pyramid.sigLevelAdded.connect(self._levelAdded)
+        self._fullRect = None   # Rectangle of the complete image in parent coordinates.
+        self._viewRect = None   # Visible rectangle in parent coordinates.
+        self._pixelSize = None  # Size of a screen pixel in parent coordinates (width, height).
+        self._shownRegion = None  # (levelNr, rowStart, rowStop, colStart, colStop)
+        self._showsPreview = False  # True if the shown level is not yet in the pyramid.
+        self._usePyramid = False
+
+        # Used by the render fast path. The lookup table indices of the image are kept, so that
+        # a new color scale only has to be applied to them and not to the image data itself.
+        self._lutIndices = None
+        self._lutIndicesKey = None
+        self._bgraLut = None
+        self._bgraLutSource = None
+        self._rgbaBuffer = None
+
+
+    @property
+    def pyramid(self):
+        """ The ImagePyramid of the image.
+        """
+        return self._pyramid
+
+
+    @property
+    def shownRegion(self):
+        """ The currently displayed (levelNr, rowStart, rowStop, colStart, colStop) tuple.
+            The rows and columns are indices in the array of that level.
+        """
+        return self._shownRegion
+
+
+    @property
+    def showsPreview(self):
+        """ True if the level that matches the view is not yet built. A subsample of the image
+            with the resolution of that level is shown instead.
+        """
+        return self._showsPreview
+
+
+    def setPyramidImage(self, image, rect):
+        """ Sets the image and places it at rect (in parent coordinates).
+
+            :param image: 2D float array in (row, col) order. NaNs are displayed as the lowest
+                color, infinite values are not allowed.
+            :param rect: QRectF in which the complete image is placed.
+        """
+        self._fullRect = QtCore.QRectF(rect)
+        self._shownRegion = None
+        self._showsPreview = False
+        self._usePyramid = image.size > PYRAMID_MIN_SIZE
+        if self._usePyramid:
+            self._pyramid.setImage(image)
+            self._updateShownRegion(force=True)
+        else:
+            self._pyramid.clear()
+            self.setImage(image.transpose(), autoLevels=False)
+            self.setRect(self._fullRect)
+
+
+    def setViewRect(self, viewRect, pixelSize):
+        """ Sets the visible rectangle and the size of a screen pixel (in parent coordinates).
+
+            Updates the displayed level and region if needed.
+        """
+        self._viewRect = QtCore.QRectF(viewRect)
+        self._pixelSize = pixelSize
+        if self._usePyramid:
+            self._updateShownRegion()
+
+
+    def clear(self):
+        """ Clears the image and discards the pyramid.
+        """
+        self._pyramid.clear()
+        self._fullRect = None
+        self._shownRegion = None
+        self._showsPreview = False
+        self._usePyramid = False
+        super(PyramidImageItem, self).clear()
+
+
+    def setImage(self, image=None, autoLevels=None, **kargs):
+        """ Sets the image. Discards the lookup table indices of the previous image.
+            See pg.ImageItem.setImage.
+
+            PyQtGraph calls setImage without an image when only the lookup table or the levels
+            change, the indices are kept in that case.
+        """
+        if image is not None:
+            self._lutIndices = None
+            self._lutIndicesKey = None
+        super(PyramidImageItem, self).setImage(image=image, autoLevels=autoLevels, **kargs)
+
+
+    def render(self):
+        """ Converts the image to a QImage.
+
+            Floating point images with a lookup table are converted by taking the colors from the
+            lookup table with np.take, directly into a reusable BGRA buffer. NaNs are transparent,
+            like in PyQtGraph. Other images are rendered by PyQtGraph.
+        """
+        image = self.image
+        levels = self.levels
+        if (image is None or image.size == 0 or image.ndim != 2 or image.dtype.kind != 'f'
+                or levels is None or np.ndim(levels) != 1 or self.lut is None
+                or self.autoDownsample or self.axisOrder != 'col-major'):
+            super(PyramidImageItem, self).render()
+            return
+
+        lut = self.lut(image) if callable(self.lut) else self.lut
+        if lut.ndim != 2 or lut.dtype != np.ubyte:
+            super(PyramidImageItem, self).render()
+            return
+
+        bgraLut = self._getBgraLut(lut)
+        indices = self._getLutIndices(image, levels, len(lut))
+
+        if self._rgbaBuffer is None or self._rgbaBuffer.shape[:2] != indices.shape:
+            self._rgbaBuffer = np.empty(indices.shape + (4, ), dtype=np.ubyte)
+        # The indices are always in range; mode='clip' prevents numpy from buffering the output.
+        np.take(bgraLut, indices, axis=0, out=self._rgbaBuffer, mode='clip')
+        self.qimage = pg.functions.makeQImage(self._rgbaBuffer, alpha=True, transpose=False,
+                                              copy=False)
+
+
+    def _getBgraLut(self, lut):
+        """ Returns the lookup table in BGRA order (as used by QImage), with an extra
+            transparent entry for NaNs.
+        """
+        if self._bgraLutSource is not lut:
+            bgraLut = np.zeros((len(lut) + 1, 4), dtype=np.ubyte)
+            bgraLut[:-1, :3] = lut[:, 2::-1]
+            bgraLut[:-1, 3] = lut[:, 3] if lut.shape[1] == 4 else 255
+            self._bgraLut = bgraLut
+            self._bgraLutSource = lut
+        return self._bgraLut
+
+
+    def _getLutIndices(self, image, levels, lutSize):
+        """ Returns the lookup table index of every pixel, in (row, col) order.
+
+            The indices only depend on the image, the levels and the size of the lookup table,
+            so they are reused when only the color scale changes. NaNs get index lutSize.
+        """
+        minLevel, maxLevel = float(levels[0]), float(levels[1])
+        key = (minLevel, maxLevel, lutSize)
+        if self._lutIndices is not None and self._lutIndicesKey == key:
+            return self._lutIndices
+
+        data = image.transpose() # (row, col) order
+        levelDiff = maxLevel - minLevel
+        scale = lutSize / levelDiff if levelDiff != 0 else 1.0 # as in pg.makeARGB
+        scaled = np.subtract(data, minLevel, dtype=np.float32)
+        scaled *= scale
+        isNan = np.isnan(scaled)
+        np.clip(scaled, 0, lutSize - 1, out=scaled)
+        indices = scaled.astype(np.uint16)
+        indices[isNan] = lutSize
+
+        self._lutIndices = indices
+        self._lutIndicesKey = key
+        return indices
+
+
+    def boundingRect(self):
+        """ Returns the bounding rectangle of the complete image (in item coordinates).
+        """
+        if self._usePyramid and self._fullRect is not None and self.image is not None:
+            return self.mapRectFromParent(self._fullRect)
+        return super(PyramidImageItem, self).boundingRect()
+
+
+    @QtSlot(int, int)
+    def _levelAdded(self, generation, _levelNr):
+        """ Called when the pyramid has a new level. Displays it if it is more suitable.
+        """
+        if generation == self._pyramid.generation and self._usePyramid:
+            self._updateShownRegion()
+
+
+    def _levelNrForView(self):
+        """ Returns the number of the level that best matches the screen resolution.
+
+            This is the lowest resolution for which a pixel of the level is not larger than a
+            pixel on the screen. The level may not have been built yet. If the view is not known,
+            the level with the lowest resolution is returned.
+        """
+        baseImage = self._pyramid.level(0)
+        maxLevelNr = numPyramidLevels(baseImage.shape) - 1
+        if self._pixelSize is None:
+            return maxLevelNr
+
+        nRows, nCols = baseImage.shape
+        colsPerPixel = self._pixelSize[0] * nCols / max(abs(self._fullRect.width()), 1e-300)
+        rowsPerPixel = self._pixelSize[1] * nRows / max(abs(self._fullRect.height()), 1e-300)
+        elementsPerPixel = min(abs(colsPerPixel), abs(rowsPerPixel))
+        if elementsPerPixel < 2:
+            return 0
+        levelNr = int(math.floor(math.log(elementsPerPixel, 2)))
+        return min(levelNr, maxLevelNr)
+
+
+    def _visibleRange(self, levelImage, axis):
+        """ Returns the (start, stop) indices along the axis of the level image that are visible,
+            extended with a margin of half the visible range and aligned on PYRAMID_TILE_SIZE.
+        """
+        size = levelImage.shape[axis]
+        if self._viewRect is None:
+            return 0, size
+
+        if axis == 0:
+            fullStart, fullLength = self._fullRect.top(), self._fullRect.height()
+            viewStart, viewStop = self._viewRect.top(), self._viewRect.bottom()
+        else:
+            fullStart, fullLength = self._fullRect.left(), self._fullRect.width()
+            viewStart, viewStop = self._viewRect.left(), self._viewRect.right()
+
+        scale = size / fullLength
+        start, stop = sorted([(viewStart - fullStart) * scale, (viewStop - fullStart) * scale])
+        margin = (stop - start) / 2
+        start = int(math.floor((start - margin) / PYRAMID_TILE_SIZE)) * PYRAMID_TILE_SIZE
+        stop = int(math.ceil((stop + margin) / PYRAMID_TILE_SIZE)) * PYRAMID_TILE_SIZE
+        start = min(max(0, start), size)
+        stop = min(max(start, stop), size)
+        if stop == start: # outside the image; show one tile so that the image isn't empty.
+            start, stop = max(0, min(start, size - 1)), min(size, max(start, 0) + 1)
+        return start, stop
+
+
+    def _updateShownRegion(self, force=False):
+        """ Displays the level and region that match the view (if they have changed).
+
+            The region only changes when the view moves out of the region that is displayed, so
+            that panning doesn't cause a new image to be set continuously.
+        """
+        if self._pyramid.numLevels == 0 or self._fullRect is None:
+            return
+
+        levelNr = self._levelNrForView()
+        showPreview = levelNr >= self._pyramid.numLevels
+        if showPreview:
+            # Subsampling has the same shape as the level but takes no time, so the image
+            # doesn't have to be rendered at full resolution while the levels are built.
+            step = 2 ** levelNr
+            levelImage = self._pyramid.level(0)[::step, ::step]
+        else:
+            levelImage = self._pyramid.level(levelNr)
+        rowStart, rowStop = self._visibleRange(levelImage, 0)
+        colStart, colStop = self._visibleRange(levelImage, 1)
+
+        if (not force and self._shownRegion is not None and self._shownRegion[0] == levelNr
+                and self._showsPreview == showPreview
+                and self._containsView(levelImage, self._shownRegion)):
+            return
+
+        self._shownRegion = (levelNr, rowStart, rowStop, colStart, colStop)
+        self._showsPreview = showPreview
+        region = levelImage[rowStart:rowStop, colStart:colStop]
+        self.setImage(region.transpose(), autoLevels=False)
+
+        nRows, nCols = levelImage.shape
+        cellWidth = self._fullRect.width() / nCols
+        cellHeight = self._fullRect.height() / nRows
+        self.setRect(QtCore.QRectF(self._fullRect.left() + colStart * cellWidth,
+                                   self._fullRect.top() + rowStart * cellHeight,
+                                   (colStop - colStart) * cellWidth,
+                                   (rowStop - rowStart) * cellHeight))
+
+
+    def _containsView(self, levelImage, region):
+        """ Returns True if the visible rectangle lies within the region of the level image.
+        """
+        _levelNr, rowStart, rowStop, colStart, colStop = region
+        nRows, nCols = levelImage.shape
+        if self._viewRect is None:
+            return (rowStart, rowStop, colStart, colStop) == (0, nRows, 0, nCols)
+
+        rowScale = nRows / self._fullRect.height()
+        colScale = nCols / self._fullRect.width()
+
+        viewRows = sorted([(self._viewRect.top() - self._fullRect.top()) * rowScale,
+                           (self._viewRect.bottom() - self._fullRect.top()) * rowScale])
+        viewCols = sorted([(self._viewRect.left() - self._fullRect.left()) * colScale,
+                           (self._viewRect.right() - self._fullRect.left()) * colScale])
+
+        # The parts of the view that lie outside the image don't have to be in the region.
+        viewRows = [min(max(0, viewRows[0]), nRows), min(max(0, viewRows[1]), nRows)]
+        viewCols = [min(max(0, viewCols[0]), nCols), min(max(0, viewCols[1]), nCols)]
+        return (rowStart <= viewRows[0] and viewRows[1] <= rowStop and
+                colStart <= viewCols[0] and viewCols[1] <= colStop)
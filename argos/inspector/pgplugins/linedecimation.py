@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Decimation of long lines by means of a multi-level min/max envelope.
+"""
+from __future__ import division, print_function
+
+import logging, math
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DECIMATION_MIN_SIZE = 100000      # Lines with less points are drawn completely.
+DECIMATION_BIN_FACTOR = 8         # Each envelope level has this many times fewer bins.
+DECIMATION_MIN_LEVEL_SIZE = 1024  # Levels are added until they have at most this many bins.
+DECIMATION_TILE_SIZE = 256        # The decimated range is extended to multiples of this size.
+DECIMATION_CHUNK_SIZE = 2 ** 20   # The first level is calculated in chunks of this many points.
+
+
+def minMaxEnvelope(mins, maxs, binSize, valid=None):
+    """ Returns the minimum and maximum of every bin of binSize elements.
+
+        Bins without valid elements get +inf as minimum and -inf as maximum. The last bin may
+        contain less than binSize elements.
+
+        :param mins: 1D float array with the minima of the previous level (or the data).
+        :param maxs: 1D float array with the maxima of the previous level (or the data).
+        :param valid: optional boolean array. Elements where it is False are ignored.
+    """
+    numBins = (len(mins) + binSize - 1) // binSize
+    binMins = np.empty(numBins, dtype=np.float64)
+    binMaxs = np.empty(numBins, dtype=np.float64)
+
+    chunkBins = max(1, DECIMATION_CHUNK_SIZE // binSize)
+    for binStart in range(0, numBins, chunkBins):
+        binStop = min(binStart + chunkBins, numBins)
+        start, stop = binStart * binSize, min(binStop * binSize, len(mins))
+        padding = (binStop - binStart) * binSize - (stop - start) # only for the last bin
+        chunkMins, chunkMaxs = mins[start:stop], maxs[start:stop]
+        if valid is not None:
+            chunkMins = np.where(valid[start:stop], chunkMins, np.inf)
+            chunkMaxs = np.where(valid[start:stop], chunkMaxs, -np.inf)
+        if padding:
+            chunkMins = np.append(chunkMins, np.full(padding, np.inf))
+            chunkMaxs = np.append(chunkMaxs, np.full(padding, -np.inf))
+
+        # Taking the minimum column by column is faster than reducing along the short axis.
+        chunkMins = chunkMins.reshape(-1, binSize)
+        chunkMaxs = chunkMaxs.reshape(-1, binSize)
+        outMins = binMins[binStart:binStop]
+        outMaxs = binMaxs[binStart:binStop]
+        outMins[:] = chunkMins[:, 0]
+        outMaxs[:] = chunkMaxs[:, 0]
+        for col in range(1, binSize):
+            np.minimum(outMins, chunkMins[:, col], out=outMins)
+            np.maximum(outMaxs, chunkMaxs[:, col], out=outMaxs)
+
+    return binMins, binMaxs
+
+
+
+class LineDecimator(object):
+    """ Decimates a line for displaying it on the screen.
+
+        Keeps a min/max envelope of the data at several levels. Level 0 is the data itself, at
+        level n each bin contains DECIMATION_BIN_FACTOR ** n points. The decimated line contains
+        the minimum and maximum of each bin, so that peaks are preserved.
+
+        Only the visible range (plus a margin) is decimated to the screen resolution; the points
+        outside it are drawn at the coarsest levels possible. The decimated line therefore always
+        spans the complete data, so that the auto-range of the plot is not affected, while the
+        number of points is proportional to the number of pixels instead of the number of samples.
+    """
+    def __init__(self, data, valid):
+        """ Constructor. Calculates the envelope levels.
+
+            :param data: 1D float array. It is plotted against its indices.
+            :param valid: boolean array that is False for points that should not be drawn (e.g.
+                masked or not finite values).
+        """
+        self._data = data
+        self._valid = valid
+        self._shownRange = None # (levelNr, groupSize, start, stop) of the decimated range
+
+        # (mins, maxs, valid) per level, except for level 0. Valid is False for empty bins.
+        self._levels = []
+        if len(data) > DECIMATION_MIN_LEVEL_SIZE:
+            mins, maxs = minMaxEnvelope(data, data, DECIMATION_BIN_FACTOR, valid=valid)
+            self._levels.append((mins, maxs, mins <= maxs))
+            while len(mins) > DECIMATION_MIN_LEVEL_SIZE:
+                mins, maxs = minMaxEnvelope(mins, maxs, DECIMATION_BIN_FACTOR)
+                self._levels.append((mins, maxs, mins <= maxs))
+
+
+    @property
+    def numLevels(self):
+        """ The number of levels, including level 0 (the data).
+        """
+        return 1 + len(self._levels)
+
+
+    @property
+    def shownRange(self):
+        """ The (levelNr, groupSize, start, stop) tuple of the range that was decimated last.
+            Start and stop are indices in the data.
+        """
+        return self._shownRange
+
+
+    def binSize(self, levelNr):
+        """ Returns the number of points in a bin of a level.
+        """
+        return DECIMATION_BIN_FACTOR ** levelNr
+
+
+    def indexRange(self, xMin, xMax):
+        """ Returns the (start, stop) range of data indices of the points with xMin <= x <= xMax.
+            The x-values of the points are their indices.
+        """
+        size = len(self._data)
+        xMin, xMax = sorted([xMin, xMax])
+        start = min(max(0.0, xMin), size)
+        stop = min(max(start, xMax + 1), size)
+        return start, stop
+
+
+    def update(self, xMin, xMax, numPixels, force=False):
+        """ Decimates the line for the visible range of the x-axis.
+
+            Returns an (x, y, connect) tuple that can be passed to PlotDataItem.setData, or None
+            if the previously decimated range still matches the view (unless force is True).
+
+            :param xMin: the x-value (index) at the left side of the view. Not its logarithm when
+                the x-axis is in log mode.
+            :param xMax: the x-value (index) at the right side of the view.
+        """
+        size = len(self._data)
+        viewStart, viewStop = self.indexRange(xMin, xMax)
+        pointsPerPixel = (viewStop - viewStart) / max(1, numPixels)
+
+        levelNr = 0
+        while (levelNr + 1 < self.numLevels and
+               self.binSize(levelNr + 1) <= pointsPerPixel):
+            levelNr += 1
+        groupSize = max(1, int(pointsPerPixel // self.binSize(levelNr)))
+
+        if (not force and self._shownRange is not None and
+                self._shownRange[:2] == (levelNr, groupSize) and
+                self._shownRange[2] <= viewStart and viewStop <= self._shownRange[3]):
+            return None
+
+        # Extend the visible range with a margin, aligned on tiles, so that small pans don't
+        # require a new decimation.
+        tileSize = DECIMATION_TILE_SIZE * groupSize * self.binSize(levelNr)
+        margin = (viewStop - viewStart) / 2
+        start = int(math.floor((viewStart - margin) / tileSize)) * tileSize
+        stop = int(math.ceil((viewStop + margin) / tileSize)) * tileSize
+        start = min(max(0, start), size)
+        stop = min(max(start, stop), size)
+
+        self._shownRange = (levelNr, groupSize, start, stop)
+        return self._decimate(levelNr, groupSize, start, stop)
+
+
+    def _decimate(self, levelNr, groupSize, start, stop):
+        """ Returns the decimated (x, y, connect) of the complete line.
+
+            The range [start, stop) is drawn at the given level, where each groupSize bins are
+            merged into one. Before and after it, the coarsest level that fits is used.
+        """
+        xs, ys, valids = [], [], []
+
+        def addSegment(segLevelNr, segStart, segStop, segGroupSize=1):
+            """ Adds the points of the range [segStart, segStop) (in data indices) at a level.
+            """
+            if segStop <= segStart:
+                return
+            x, y, valid = self._segmentPoints(segLevelNr, segStart, segStop, segGroupSize)
+            xs.append(x)
+            ys.append(y)
+            valids.append(valid)
+
+        topLevelNr = self.numLevels - 1
+        size = len(self._data)
+
+        # Before the range: from coarse to fine. Start is a multiple of the bin size of the level.
+        pos = 0
+        for segLevelNr in range(topLevelNr, levelNr, -1):
+            binSize = self.binSize(segLevelNr)
+            segStop = (start // binSize) * binSize
+            addSegment(segLevelNr, pos, segStop)
+            pos = max(pos, segStop)
+        addSegment(levelNr, pos, start)
+
+        addSegment(levelNr, start, stop, groupSize)
+
+        # After the range: from fine to coarse.
+        pos = stop
+        for segLevelNr in range(levelNr, topLevelNr):
+            nextBinSize = self.binSize(segLevelNr + 1)
+            segStop = min(-(-pos // nextBinSize) * nextBinSize, size)
+            addSegment(segLevelNr, pos, segStop)
+            pos = segStop
+        addSegment(topLevelNr, pos, size)
+
+        if not xs:
+            return np.zeros(0), np.zeros(0), np.zeros(0, dtype=bool)
+
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        valid = np.concatenate(valids)
+        connect = np.zeros(len(valid), dtype=bool)
+        np.logical_and(valid[:-1], valid[1:], out=connect[:-1])
+        return x, y, connect
+
+
+    def _segmentPoints(self, levelNr, start, stop, groupSize):
+        """ Returns the (x, y, valid) points of the range [start, stop) at a level.
+
+            Each group of groupSize bins results in two points: the minimum at the first and the
+            maximum at the last index of the group. This way the decimated line spans exactly the
+            same x-range as the data. At level 0 with a group size of one, the data points
+            themselves are returned.
+        """
+        binSize = self.binSize(levelNr)
+        if levelNr == 0 and groupSize == 1:
+            return (np.arange(start, stop, dtype=np.float64), self._data[start:stop],
+                    self._valid[start:stop])
+
+        if levelNr == 0:
+            segValid = self._valid[start:stop]
+            mins = np.where(segValid, self._data[start:stop], np.inf)
+            maxs = np.where(segValid, self._data[start:stop], -np.inf)
+            binValid = None
+        else:
+            levelMins, levelMaxs, levelValid = self._levels[levelNr - 1]
+            binStart, binStop = start // binSize, -(-stop // binSize)
+            mins, maxs = levelMins[binStart:binStop], levelMaxs[binStart:binStop]
+            binValid = levelValid[binStart:binStop]
+
+        if groupSize > 1:
+            mins, maxs = minMaxEnvelope(mins, maxs, groupSize)
+            binValid = None
+        if binValid is None:
+            binValid = mins <= maxs # False for bins without valid points
+
+        pointsPerGroup = binSize * groupSize
+        groupStarts = start + np.arange(len(mins)) * pointsPerGroup
+        groupStops = np.minimum(groupStarts + pointsPerGroup, stop)
+
+        indices = np.empty(2 * len(mins), dtype=np.intp)
+        indices[0::2] = groupStarts
+        indices[1::2] = groupStops - 1
+        y = np.empty(2 * len(mins), dtype=np.float64)
+        y[0::2] = mins
+        y[1::2] = maxs
+        valid = np.repeat(binValid, 2)
+        y[~valid] = np.nan
+        return indices.astype(np.float64), y, valid
@@ -37,6 +37,7 @@ from argos.inspector.pgplugins.pgctis import (X_AXIS, Y_AXIS, viewBoxAxisRange,
                                               setXYAxesAutoRangeOn, PgAxisLabelCti,
                                               PgAxisLogModeCti, PgAxisRangeCti, PgPlotDataItemCti)
 from argos.inspector.pgplugins.pgplotitem import ArgosPgPlotItem
+from argos.inspector.pgplugins.linedecimation import LineDecimator, DECIMATION_MIN_SIZE
 from argos.utils.cls import (array_has_real_numbers, check_class, fill_values_to_nan,
                                 is_an_array, check_is_an_array, to_string)
 from argos.utils.masks import replaceMaskedValue
@@ -125,6 +126,10 @@ class PgLinePlot1d(AbstractInspector):
         # in the collector.
         self.slicedArray = None
 
+        # Long lines are decimated to the screen resolution (see LineDecimator).
+        self._lineDecimator = None
+        self._plotDataItem = None
+
         self.graphicsLayoutWidget = pg.GraphicsLayoutWidget()
         self.contentsLayout.addWidget(self.graphicsLayoutWidget)
         self.titleLabel = self.graphicsLayoutWidget.addLabel('<plot title goes here>', 0, 0)
@@ -148,6 +153,8 @@ class PgLinePlot1d(AbstractInspector):
         # Based mouseMoved on crosshair.py from the PyQtGraph examples directory.
         # I did not use the SignalProxy because I did not see any difference.
         self.plotItem.scene().sigMouseMoved.connect(self.mouseMoved)
+        self.viewBox.sigRangeChanged.connect(self._viewBoxRangeChanged)
+        self.viewBox.sigResized.connect(self._viewBoxRangeChanged)
 
 
     def finalize(self):
@@ -155,6 +162,8 @@ class PgLinePlot1d(AbstractInspector):
         """
         logger.debug("Finalizing: {}".format(self))
         self.plotItem.scene().sigMouseMoved.disconnect(self.mouseMoved)
+        self.viewBox.sigRangeChanged.disconnect(self._viewBoxRangeChanged)
+        self.viewBox.sigResized.disconnect(self._viewBoxRangeChanged)
         self.plotItem.close()
         self.graphicsLayoutWidget.close()
 
@@ -177,6 +186,8 @@ class PgLinePlot1d(AbstractInspector):
         """ Clears the  the inspector widget when no valid input is available.
         """
         self.titleLabel.setText('')
+        self._lineDecimator = None
+        self._plotDataItem = None
         self.plotItem.clear()
         self.plotItem.setLabel('left', '')
         self.plotItem.setLabel('bottom', '')
@@ -213,14 +224,24 @@ class PgLinePlot1d(AbstractInspector):
 
         self.titleLabel.setText(self.configValue('title').format(**self.collector.rtiInfo))
 
+        # Masked values have been replaced by NaNs if the data is of floating point type, so the
+        # mask is then only needed for other types.
         connected = np.isfinite(self.slicedArray.data)
-        if is_an_array(self.slicedArray.mask):
-            connected = np.logical_and(connected, ~self.slicedArray.mask)
-        else:
-            connected = np.zeros_like(self.slicedArray.data) if self.slicedArray.mask else connected
+        if self.slicedArray.data.dtype.kind != 'f':
+            mask = self.slicedArray.mask
+            if is_an_array(mask):
+                connected = np.logical_and(connected, ~mask)
+            else:
+                connected = np.zeros(self.slicedArray.data.shape, dtype=bool) if mask else connected
 
         plotDataItem = self.config.plotDataItemCti.createPlotDataItem()
-        plotDataItem.setData(self.slicedArray.data, connect=connected)
+        self._plotDataItem = plotDataItem
+        if len(self.slicedArray.data) > DECIMATION_MIN_SIZE:
+            self._lineDecimator = LineDecimator(self.slicedArray.data, connected)
+            self._updateDecimatedLine(force=True)
+        else:
+            self._lineDecimator = None
+            plotDataItem.setData(self.slicedArray.data, connect=connected)
 
         self.plotItem.addItem(plotDataItem)
 
@@ -239,6 +260,29 @@ class PgLinePlot1d(AbstractInspector):
         self.config.updateTarget()
 
 
+    def _viewBoxRangeChanged(self):
+        """ Decimates the line again if the view box was zoomed, panned or resized.
+        """
+        if self._lineDecimator is not None:
+            self._updateDecimatedLine()
+
+
+    def _updateDecimatedLine(self, force=False):
+        """ Updates the plot data item with the line decimated for the visible x-range.
+
+            The line is only decimated again if the view has moved outside the decimated range or
+            if the number of points per pixel has changed.
+        """
+        (xMin, xMax), _yRange = self.viewBox.viewRange()
+        if self.plotItem.getAxis('bottom').logMode:
+            xMin, xMax = 10.0 ** xMin, 10.0 ** xMax # The view range is the log10 of the x-values
+        numPixels = max(1, int(self.viewBox.width()))
+        decimated = self._lineDecimator.update(xMin, xMax, numPixels, force=force)
+        if decimated is not None:
+            x, y, connect = decimated
+            self._plotDataItem.setData(x, y, connect=connect)
+
+
     @QtSlot(object)
     def mouseMoved(self, viewPos):
         """ Updates the probe text with the values under the cursor.
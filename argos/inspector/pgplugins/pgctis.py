@@ -34,10 +34,9 @@ from argos.config.intcti import IntCti
 from argos.config.floatcti import SnFloatCti, FloatCti
 from argos.config.qtctis import PenCti, ColorCti, createPenStyleCti, createPenWidthCti
 from argos.config.untypedcti import UntypedCti
-from argos.inspector.pgplugins.pghistlutitem import HistogramLUTItem
+from argos.inspector.pgplugins.pghistlutitem import HistogramLUTItem, precomputeLookupTables
 from argos.qt import QtGui, QtWidgets
 from argos.utils.cls import check_class
-from argos.utils.masks import maskedNanPercentile
 
 from pyqtgraph.graphicsItems.GradientEditorItem import Gradients as GRADIENTS
 
@@ -126,29 +125,38 @@ def viewBoxAxisRange(viewBox, axisNumber):
         raise AssertionError("No children bbox. Plot range not updated.")
 
 
-def inspectorDataRange(inspector, percentage):
+def inspectorDataRange(inspector, percentage, approximate=False):
     """ Calculates the range from the inspectors' sliced array. Discards percentage of the minimum
         and percentage of the maximum values of the inspector.slicedArray
 
         Meant to be used with functools.partial for filling the autorange methods combobox.
         The first parameter is an inspector, it's not an array, because we would then have to
         regenerate the range function every time sliced array of an inspector changes.
+
+        The statistics of the sliced array are calculated once and are then shared by all range
+        functions (see ArrayWithMask.stats). If approximate is True, the percentiles of large
+        arrays are estimated from a histogram (see ArrayWithMask.approximateStats).
     """
     logger.debug("Discarding {}% from id: {}".format(percentage, id(inspector.slicedArray)))
-    return maskedNanPercentile(inspector.slicedArray, (percentage, 100-percentage) )
+    if approximate:
+        stats = inspector.slicedArray.approximateStats
+    else:
+        stats = inspector.slicedArray.stats
+    return stats.discardedRange(percentage)
 
 
-def defaultAutoRangeMethods(inspector, intialItems=None):
+def defaultAutoRangeMethods(inspector, intialItems=None, approximate=False):
     """ Creates an ordered dict with default autorange methods for an inspector.
 
         :param inspector: the range methods will work on (the sliced array) of this inspector.
         :param intialItems: will be passed on to the  OrderedDict constructor.
+        :param approximate: if True, approximate percentiles are used for large sliced arrays.
     """
     rangeFunctions = OrderedDict({} if intialItems is None else intialItems)
-    rangeFunctions['use all data'] = partial(inspectorDataRange, inspector, 0.0)
+    rangeFunctions['use all data'] = partial(inspectorDataRange, inspector, 0.0, approximate)
     for percentage in [0.1, 0.2, 0.5, 1, 2, 5, 10, 20]:
         label = "discard {}%".format(percentage)
-        rangeFunctions[label] = partial(inspectorDataRange, inspector, percentage)
+        rangeFunctions[label] = partial(inspectorDataRange, inspector, percentage, approximate)
     return rangeFunctions
 
 
@@ -504,6 +512,7 @@ class PgGradientEditorItemCti(ChoiceCti):
                                                       configValues=list(GRADIENTS.keys()))
         check_class(gradientEditorItem, pg.GradientEditorItem)
         self.gradientEditorItem = gradientEditorItem
+        precomputeLookupTables(list(GRADIENTS.keys()))
 
 
     def _updateTargetFromNode(self):
@@ -1,7 +1,7 @@
 """ Reimplementation of the PyQtGraph HistogramLUTItem.
 
-    Currently only a histogram range in the imageChanged method is added. This prevents errors when
-    the image contains NaNs. Later the mouse and scrolling behaviour may be altered.
+    The histogram is calculated from a (subsampled) copy of the data, ignoring NaNs, and is
+    cached until the data changes. Later the mouse and scrolling behaviour may be altered.
 """
 
 
@@ -17,10 +17,121 @@ from pyqtgraph.Point import Point
 from pyqtgraph import functions as fn
 from pyqtgraph import debug as debug
 
-import weakref
+import math, weakref
+
+from collections import OrderedDict
 
 __all__ = ['HistogramLUTItem']
 
+DEFAULT_HISTOGRAM_SAMPLE_SIZE = 250000 # Maximum number of values used for the histogram.
+HISTOGRAM_NUM_BINS = 500
+
+
+MAX_CACHED_LOOKUP_TABLES = 32 # Maximum number of lookup tables of non-preset gradients.
+
+# Lookup tables of the color gradients. Both map (gradient key, n, alpha) to the lookup table.
+# The tables of the presets are calculated once and kept. Those of other gradients, e.g. edited
+# by the user, are kept in a least recently used cache.
+_PRESET_LOOKUP_TABLES = {}
+_LOOKUP_TABLE_CACHE = OrderedDict()
+_PRECOMPUTED_PRESETS = set()
+
+
+def gradientKey(gradientEditorItem):
+    """ Returns a hashable key that identifies the color gradient of a GradientEditorItem.
+    """
+    state = gradientEditorItem.saveState()
+    return (state['mode'], tuple(sorted((float(pos), tuple(color))
+                                        for pos, color in state['ticks'])))
+
+
+def _makeLookupTable(gradientEditorItem, n, alpha=None):
+    """ Calculates a (read-only) lookup table of the gradient of a GradientEditorItem.
+    """
+    lut = gradientEditorItem.getLookupTable(n, alpha=alpha)
+    lut.flags.writeable = False
+    return lut
+
+
+def cachedLookupTable(gradientEditorItem, n, alpha=None):
+    """ Returns the lookup table of the gradient of a GradientEditorItem.
+
+        The tables are cached by gradient, n and alpha, so that switching between color scales
+        doesn't recalculate them. The returned array should not be modified.
+    """
+    key = (gradientKey(gradientEditorItem), n, alpha)
+    lut = _PRESET_LOOKUP_TABLES.get(key)
+    if lut is not None:
+        return lut
+
+    lut = _LOOKUP_TABLE_CACHE.pop(key, None)
+    if lut is None:
+        lut = _makeLookupTable(gradientEditorItem, n, alpha=alpha)
+    _LOOKUP_TABLE_CACHE[key] = lut # (Re)inserted as the most recently used
+    while len(_LOOKUP_TABLE_CACHE) > MAX_CACHED_LOOKUP_TABLES:
+        _LOOKUP_TABLE_CACHE.popitem(last=False)
+    return lut
+
+
+def precomputeLookupTables(presetNames, sizes=(256, 512)):
+    """ Calculates the lookup tables of the preset gradients and keeps them.
+    """
+    presetNames = [name for name in presetNames if (name, sizes) not in _PRECOMPUTED_PRESETS]
+    if not presetNames:
+        return
+
+    gradientEditorItem = GradientEditorItem()
+    for presetName in presetNames:
+        gradientEditorItem.loadPreset(presetName)
+        for n in sizes:
+            key = (gradientKey(gradientEditorItem), n, None)
+            if key not in _PRESET_LOOKUP_TABLES:
+                _PRESET_LOOKUP_TABLES[key] = _makeLookupTable(gradientEditorItem, n)
+        _PRECOMPUTED_PRESETS.add((presetName, sizes))
+
+
+def stratifiedSample(array, maxSize):
+    """ Returns a regularly spaced subsample of the array with at most (about) maxSize elements.
+
+        Every dimension is sampled with the same step, taking the element in the center of each
+        stratum. The result is a view on the array. If maxSize is 0 or None, the array itself is
+        returned.
+    """
+    if not maxSize or array.size <= maxSize or array.ndim == 0:
+        return array
+
+    step = int(math.ceil((array.size / maxSize) ** (1.0 / array.ndim)))
+    index = tuple(slice(min(step // 2, dimSize - 1), None, step) for dimSize in array.shape)
+    return array[index]
+
+
+def calculateHistogram(data, maxSampleSize=None):
+    """ Returns the (x, y) arrays of the histogram of the finite values in the data.
+
+        The data is subsampled with stratifiedSample first. Returns (None, None) if there are no
+        finite values. The format is the same as that of pg.ImageItem.getHistogram.
+    """
+    if data is None or data.size == 0:
+        return None, None
+
+    sample = stratifiedSample(data, maxSampleSize)
+    sample = sample[np.isfinite(sample)]
+    if sample.size == 0:
+        return None, None
+
+    mn, mx = np.min(sample), np.max(sample)
+    if sample.dtype.kind in "ui":
+        # For integer data, we select the bins carefully to avoid aliasing (as PyQtGraph does)
+        step = max(1.0, np.ceil((float(mx) - float(mn)) / HISTOGRAM_NUM_BINS))
+        bins = np.arange(mn, float(mx) + 1.01 * step, step)
+    else:
+        if mx == mn:
+            mx = mn + 1 # degenerate image, linspace would give empty bins
+        bins = np.linspace(mn, mx, HISTOGRAM_NUM_BINS)
+
+    counts, edges = np.histogram(sample, bins=bins)
+    return edges[:-1], counts
+
 
 class HistogramLUTItem(GraphicsWidget):
     """
@@ -45,6 +156,15 @@ class HistogramLUTItem(GraphicsWidget):
         self.lut = None
         self.imageItem = lambda: None  # fake a dead weakref
 
+        # The histogram is calculated once per image (or histogram data) and then cached. The
+        # generation is increased when the data changes. The id of the data can't be used to
+        # detect this, since the data may be a buffer that is refilled for the next image.
+        self._histogramData = None
+        self._histogramSampleSize = DEFAULT_HISTOGRAM_SAMPLE_SIZE
+        self._histogram = None
+        self._histogramGeneration = 0
+        self._cachedHistogramGeneration = None
+
         self.layout = QtWidgets.QGraphicsGridLayout()
         self.setLayout(self.layout)
         self.layout.setContentsMargins(1,1,1,1)
@@ -143,7 +263,8 @@ class HistogramLUTItem(GraphicsWidget):
         by this HistogramLUTItem.
         """
         self.imageItem = weakref.ref(img)
-        img.sigImageChanged.connect(self.imageChanged)
+        self._histogramGeneration += 1
+        img.sigImageChanged.connect(self._imageItemImageChanged)
         img.setLookupTable(self.getLookupTable)  ## send function pointer, not the result
         #self.gradientChanged()
         self.regionChanged()
@@ -175,9 +296,19 @@ class HistogramLUTItem(GraphicsWidget):
             else:
                 n = 512
         if self.lut is None:
-            self.lut = self.gradient.getLookupTable(n, alpha=alpha)
+            self.lut = cachedLookupTable(self.gradient, n, alpha=alpha)
         return self.lut
 
+    def _imageItemImageChanged(self):
+        """ Called when the image item gets a new image.
+
+            The cached histogram is only discarded if it's calculated from the image itself,
+            not when the image item shows another part of the histogram data.
+        """
+        if self._histogramData is None:
+            self._histogramGeneration += 1
+        self.imageChanged()
+
     def regionChanged(self):
         #if self.imageItem is not None:
             #self.imageItem.setLevels(self.region.getRegion())
@@ -190,15 +321,40 @@ class HistogramLUTItem(GraphicsWidget):
         self.sigLevelsChanged.emit(self)
         self.update()
 
-    def imageChanged(self, autoLevel=False, autoRange=False):
-        profiler = debug.Profiler()
-        img = self.imageItem().image
-        if img is None:
-            histRange = None
+    def setHistogramData(self, data):
+        """ Sets the data from which the histogram is calculated.
+
+            Use this when the image item shows only part of the data (or a lower resolution
+            version). If data is None, the image of the image item is used. The cached histogram
+            is discarded, even if the same array (e.g. a reused buffer) is passed again.
+        """
+        self._histogramData = data
+        self._histogramGeneration += 1
+
+    def setHistogramSampleSize(self, sampleSize):
+        """ Sets the maximum number of values from which the histogram is calculated.
+            If the sample size is 0, all values are used.
+        """
+        if sampleSize != self._histogramSampleSize:
+            self._histogramSampleSize = sampleSize
+            self._histogramGeneration += 1
+
+    def _cachedHistogram(self):
+        """ Returns the (x, y) arrays of the histogram. Calculates it if it is not cached.
+        """
+        if self._histogramData is not None:
+            data = self._histogramData
         else:
-            histRange = (np.nanmin(img), np.nanmax(img))
+            data = self.imageItem().image
+
+        if self._cachedHistogramGeneration != self._histogramGeneration:
+            self._histogram = calculateHistogram(data, self._histogramSampleSize)
+            self._cachedHistogramGeneration = self._histogramGeneration
+        return self._histogram
 
-        h = self.imageItem().getHistogram(range=histRange)
+    def imageChanged(self, autoLevel=False, autoRange=False):
+        profiler = debug.Profiler()
+        h = self._cachedHistogram()
         profiler('get histogram')
         if h[0] is None:
             return
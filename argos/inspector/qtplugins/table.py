@@ -18,23 +18,31 @@
 """ Contains TableInspector and TableInspectorModel
 """
 import logging
+import math
 import numbers
+import time
 
 import numpy as np
 
+from collections import OrderedDict
+
 from argos.external import six
 from argos.collect.collector import FAKE_DIM_NAME
+from argos.collect.slicecache import REGION_TILE_SIZE
 from argos.config.boolcti import BoolCti
 from argos.config.choicecti import ChoiceCti
 from argos.config.groupcti import GroupCti, MainGroupCti
 from argos.config.intcti import IntCti
 from argos.config.qtctis import FontCti, ColorCti
 from argos.info import DEBUGGING
-from argos.inspector.abstract import AbstractInspector
+from argos.inspector.abstract import AbstractInspector, UpdateReason
+from argos.inspector.qtplugins.tableexport import (exportTable, EXPORT_FILE_FILTERS, CSV_FORMAT,
+                                                   NPY_FORMAT, CsvTableWriter, NpyTableWriter,
+                                                   Hdf5TableWriter)
 from argos.qt import Qt, QtCore, QtGui, QtWidgets
 from argos.widgets.constants import MONO_FONT, FONT_SIZE
 from argos.utils.cls import check_class, check_is_a_string
-from argos.utils.cls import to_string, is_an_array
+from argos.utils.cls import to_string, is_an_array, URL_PYTHON_ENCODINGS_DOC
 from argos.utils.misc import is_quoted
 
 logger = logging.getLogger(__name__)
@@ -45,16 +53,75 @@ OPTIMIZE_RESIZE_AT_SIZE = 1000  # If the table has more elements, only the curre
 
 ALIGN_SMART = -1  # Use right alignment for numbers and left alignment for everything else.
 
+# The table model reads the sliced array in blocks when their cells are displayed. The blocks are
+# aligned on the tiles of the slice cache, so that each block is read as one tile.
+TABLE_BLOCK_SIZE = REGION_TILE_SIZE  # Number of rows and columns of a block
+TABLE_MAX_BLOCKS = 32                # The least recently used blocks are discarded above this
+TABLE_READ_AHEAD_BLOCKS = 2          # Number of blocks prefetched in the scroll direction
+
+# The cells are converted to strings per tile of a block. The strings are kept for the most
+# recently displayed tiles.
+FORMAT_TILE_SIZE = 32                # Number of rows and columns of a tile (divides the block)
+MAX_FORMATTED_TILES = 512            # The least recently used tiles are discarded above this
+
+# The column widths of large tables are estimated from the strings of a sample of rows.
+AUTO_SIZE_SAMPLE_ROWS = 32           # Number of rows from which the widths are estimated
+AUTO_SIZE_BATCH_SIZE = 64            # Number of columns that are estimated at once
+AUTO_SIZE_TIME_BUDGET = 0.1          # Seconds. Remaining columns get the largest width found.
+
 def resizeAllSections(header, sectionSize):
     """ Sets all sections (columns or rows) of a header to the same section size.
 
         :param header: a QHeaderView
         :param sectionSize: the new size of the header section in pixels
     """
-    for idx in range(header.length()):
+    for idx in range(header.count()):
         header.resizeSection(idx, sectionSize)
 
 
+_FONT_METRICS_CACHE = {}
+
+def cachedFontMetrics(font):
+    """ Returns the QFontMetricsF of a font. The metrics are created only once per font.
+    """
+    key = font.key()
+    fontMetrics = _FONT_METRICS_CACHE.get(key)
+    if fontMetrics is None:
+        fontMetrics = QtGui.QFontMetricsF(font)
+        _FONT_METRICS_CACHE[key] = fontMetrics
+    return fontMetrics
+
+
+def textWidth(fontMetrics, text):
+    """ Returns the width in pixels of a text (the horizontal advance).
+
+        QFontMetricsF.horizontalAdvance is available since Qt 5.11. Before, width was used.
+    """
+    if hasattr(fontMetrics, 'horizontalAdvance'):
+        return fontMetrics.horizontalAdvance(text)
+    else:
+        return fontMetrics.width(text)
+
+
+def estimateTextWidths(strings, fontMetrics, isMonospace):
+    """ Returns, per column, the width in pixels of the widest string in a 2D object array.
+
+        The lengths of the strings are computed for the whole array at once. For monospace
+        fonts the width follows directly from the length. For other fonts only the longest
+        string of each column is measured. Cells that are None are ignored.
+    """
+    if strings.size == 0:
+        return np.zeros(strings.shape[1], dtype=int)
+
+    strings = np.where(np.equal(strings, None), '', strings)
+    lengths = np.frompyfunc(len, 1, 1)(strings).astype(int)
+    if isMonospace:
+        return np.ceil(lengths.max(axis=0) * textWidth(fontMetrics, '0')).astype(int)
+
+    longest = strings[lengths.argmax(axis=0), np.arange(strings.shape[1])]
+    return np.ceil([textWidth(fontMetrics, text) for text in longest]).astype(int)
+
+
 def makeReplacementField(formatSpec, altFormatSpec='', testValue=None):
     """ Prepends a colon and wraps the formatSpec in curly braces to yield a replacement field.
 
@@ -98,6 +165,150 @@ def makeReplacementField(formatSpec, altFormatSpec='', testValue=None):
     return fmt
 
 
+def allMaskedCells(mask, shape):
+    """ Returns a boolean array of the shape that is True for cells that are completely masked.
+
+        The mask can be a boolean, a boolean array or a structured mask. Cells of structured
+        arrays are masked if all their fields are masked; sub-array cells if all their elements
+        are masked.
+    """
+    if not is_an_array(mask):
+        return np.full(shape, bool(mask))
+
+    if mask.dtype.names:
+        result = np.ones(shape, dtype=bool)
+        for fieldName in mask.dtype.names:
+            result &= allMaskedCells(mask[fieldName], shape)
+        return result
+
+    if mask.ndim > len(shape):
+        return np.all(mask, axis=tuple(range(len(shape), mask.ndim)))
+    return mask
+
+
+def formatCells(values, masked, encoding='utf-8', strFormat='{}', intFormat='{}',
+                numFormat='{}', otherFormat='{}', maskFormat=''):
+    """ Converts all cells of a 2D array to strings. Gives the same result as to_string.
+
+        The replacement field is selected once for the whole array from its dtype. Integers,
+        64-bit floats and strings are converted to Python objects first, which is much faster to
+        format. Other types are formatted as numpy scalars (e.g. float32 values then keep their
+        shortest representation with '!r').
+
+        :param values: 2D array. Can have a sub-array dtype (the array then has more dimensions).
+        :param masked: 2D boolean array that is True for cells that are completely masked.
+        :return: 2D object array with the strings.
+    """
+    shape = masked.shape
+    dtype = values.dtype
+    if values.ndim > len(shape) or dtype.kind == 'O':
+        # Sub-array and object cells are formatted one by one.
+        strings = np.empty(shape, dtype=object)
+        for idx in np.ndindex(*shape):
+            strings[idx] = to_string(values[idx], masked=masked[idx], decode_bytes=encoding,
+                                     maskFormat=maskFormat, strFormat=strFormat,
+                                     intFormat=intFormat, numFormat=numFormat,
+                                     otherFormat=otherFormat)
+        return strings
+
+    if dtype.kind == 'S':
+        fmt = strFormat
+        try:
+            items = [item.decode(encoding, 'replace') for item in values.ravel().tolist()]
+        except LookupError as ex:
+            # Add URL to exception message, as in to_string.
+            raise LookupError("{}\n\nFor a list of encodings in Python see: {}"
+                              .format(ex, URL_PYTHON_ENCODINGS_DOC))
+    elif dtype.kind == 'U':
+        fmt = strFormat
+        items = values.ravel().tolist()
+    elif dtype.kind in 'iu':
+        fmt = intFormat
+        items = values.ravel().tolist()
+    elif dtype.kind in 'fc':
+        fmt = numFormat
+        if dtype == np.float64 or dtype == np.complex128:
+            items = values.ravel().tolist()
+        else:
+            items = list(values.flat)
+    else:
+        fmt = otherFormat # booleans, dates, structured cells, etc.
+        items = list(values.flat)
+
+    def formatItem(itemFormat, item):
+        """ Formats one item, returns an error message as result if the format is invalid.
+        """
+        try:
+            return itemFormat.format(item)
+        except Exception:
+            return "Invalid format {!r} for: {!r}".format(itemFormat, item)
+
+    try:
+        formatter = fmt.format
+        strings = [formatter(item) for item in items]
+    except Exception:
+        strings = [formatItem(fmt, item) for item in items]
+
+    if maskFormat != '{}':
+        for pos in np.flatnonzero(masked):
+            strings[pos] = formatItem(maskFormat, items[pos])
+
+    result = np.empty(len(strings), dtype=object)
+    result[:] = strings
+    return result.reshape(shape)
+
+
+
+class FormattedCells(object):
+    """ The strings, the masks and the alignment of the cells of a tile (for one field).
+    """
+    def __init__(self, strings, masked, isNumber):
+        """ Constructor
+
+            :param strings: 2D object array with the cell strings.
+            :param masked: 2D boolean array that is True for cells that are completely masked.
+            :param isNumber: 2D boolean array that is True for cells that contain a number.
+        """
+        self.strings = strings
+        self.masked = masked
+        self.isNumber = isNumber
+
+
+
+class TableBlock(object):
+    """ A block of the sliced array, with separate 2D views on the fields of structured arrays.
+
+        The view on a field and the cells that are completely masked in it are created once,
+        when the field is first needed. Afterwards the cells of the field can be accessed with
+        plain 2D indexing, without looking up the field in every cell.
+    """
+    def __init__(self, arrayWithMask):
+        """ Constructor
+
+            :param arrayWithMask: the block as an ArrayWithMask.
+        """
+        self.data = arrayWithMask.data
+        self.mask = arrayWithMask.mask
+        self._fields = {}  # maps field names (None for complete cells) to (values, masked)
+
+
+    def field(self, fieldName):
+        """ Returns a (values, masked) tuple for a field of the block.
+
+            The values are a view on the field, the masked array is True for cells that are
+            completely masked. The fieldName can be None to get the complete cells.
+        """
+        result = self._fields.get(fieldName)
+        if result is None:
+            values = self.data if fieldName is None else self.data[fieldName]
+            mask = self.mask # Compact masks are expanded here, for the block only.
+            if fieldName is not None and is_an_array(mask):
+                mask = mask[fieldName]
+            result = (values, allMaskedCells(mask, values.shape[:2]))
+            self._fields[fieldName] = result
+        return result
+
+
 
 class TableInspectorCti(MainGroupCti):
     """ Configuration tree item for a TableInspector
@@ -222,6 +433,18 @@ class TableInspector(AbstractInspector):
         self.tableView.setModel(self.model)
         self.tableView.setSelectionMode(QtWidgets.QTableView.ContiguousSelection)
 
+        self.exportSliceAction = QtWidgets.QAction("Export Slice...", self)
+        self.exportSliceAction.setToolTip("Export the complete slice to a CSV, NPY or HDF-5 file")
+        self.exportSliceAction.triggered.connect(lambda: self.exportToFile(selectionOnly=False))
+        self.tableView.addAction(self.exportSliceAction)
+
+        self.exportSelectionAction = QtWidgets.QAction("Export Selection...", self)
+        self.exportSelectionAction.setToolTip("Export the selected cells to a CSV, NPY or "
+                                              "HDF-5 file")
+        self.exportSelectionAction.triggered.connect(lambda: self.exportToFile(selectionOnly=True))
+        self.tableView.addAction(self.exportSelectionAction)
+        self.tableView.setContextMenuPolicy(Qt.ActionsContextMenu)
+
         horHeader = self.tableView.horizontalHeader()
         verHeader = self.tableView.verticalHeader()
         horHeader.setCascadingSectionResizes(False)
@@ -246,6 +469,156 @@ class TableInspector(AbstractInspector):
         return tuple(['Y', 'X'])
 
 
+    @classmethod
+    def readsBlocks(cls):
+        """ The table model reads the blocks of the sliced array that are displayed.
+            See the parent class documentation for a more detailed explanation.
+        """
+        return True
+
+
+    def _autoSizeColumns(self, firstRow, firstCol):
+        """ Sets the column widths from the strings of a sample of AUTO_SIZE_SAMPLE_ROWS rows.
+
+            The rows are taken from the block that starts at firstRow, so that only the blocks
+            of one block row are read. The columns are estimated in batches, starting at
+            firstCol, until the AUTO_SIZE_TIME_BUDGET is used. The remaining columns get the
+            largest width that was found.
+        """
+        nRows, nCols = self.model.rowCount(), self.model.columnCount()
+        if nRows == 0 or nCols == 0:
+            return
+
+        startTime = time.time()
+        horHeader = self.tableView.horizontalHeader()
+        font = self.model.getFont() or self.tableView.font()
+        fontMetrics = cachedFontMetrics(font)
+        isMonospace = QtGui.QFontInfo(font).fixedPitch()
+        headerMetrics = cachedFontMetrics(horHeader.font())
+
+        # The cell margin is taken from the size hint of the item delegate for one cell.
+        index = self.model.index(firstRow, firstCol)
+        option = QtWidgets.QStyleOptionViewItem()
+        option.initFrom(self.tableView)
+        option.font = font
+        cellText = self.model.data(index, Qt.DisplayRole) or ''
+        cellMargin = (self.tableView.itemDelegate().sizeHint(option, index).width() -
+                      int(math.ceil(textWidth(fontMetrics, cellText))) +
+                      int(self.tableView.showGrid()))
+        headerMargin = 2 * horHeader.style().pixelMetric(QtWidgets.QStyle.PM_HeaderMargin)
+
+        rowStop = min(nRows, firstRow + TABLE_BLOCK_SIZE)
+        rows = np.unique(np.linspace(firstRow, rowStop - 1, AUTO_SIZE_SAMPLE_ROWS).astype(int))
+        cols = list(range(firstCol, nCols)) + list(range(firstCol))
+
+        widths = {}
+        for batchStart in range(0, nCols, AUTO_SIZE_BATCH_SIZE):
+            batch = cols[batchStart:batchStart + AUTO_SIZE_BATCH_SIZE]
+            cellWidths = estimateTextWidths(self.model.cellStrings(rows, batch),
+                                            fontMetrics, isMonospace)
+            for col, cellWidth in zip(batch, cellWidths):
+                header = self.model.headerData(col, Qt.Horizontal, Qt.DisplayRole)
+                widths[col] = max(cellWidth + cellMargin,
+                                  int(math.ceil(textWidth(headerMetrics, header))) +
+                                  headerMargin,
+                                  horHeader.minimumSectionSize())
+
+            if time.time() - startTime > AUTO_SIZE_TIME_BUDGET:
+                logger.debug("Column widths estimated for {} of {} columns"
+                             .format(len(widths), nCols))
+                break
+
+        defaultWidth = max(widths.values())
+        for col in range(nCols):
+            horHeader.resizeSection(col, widths.get(col, defaultWidth))
+
+
+    def exportRanges(self, selectionOnly=False):
+        """ Returns the row and column slices of the sliced array that are exported.
+
+            :param selectionOnly: if True, only the selected cells are exported. If the fields
+                are in separate cells, all fields of the selected cells are exported.
+                Returns None if there is no selection.
+        """
+        nRows, nCols = self.collector.comboDimensionSizes()
+        if not selectionOnly:
+            return slice(0, nRows), slice(0, nCols)
+
+        selection = self.tableView.selectionModel().selection()
+        if len(selection) == 0:
+            return None
+
+        selRange = selection[0] # Only one range, because of the ContiguousSelection mode
+        return (self.model.arraySlice(selRange.top(), selRange.bottom() + 1, Qt.Vertical),
+                self.model.arraySlice(selRange.left(), selRange.right() + 1, Qt.Horizontal))
+
+
+    def exportToFile(self, selectionOnly=False):
+        """ Lets the user select a file and exports the slice, or the selected cells, to it.
+
+            The data is read from the RTI in strips of rows, without using the slice cache, so
+            that large slices can be exported with little memory. A progress dialog allows the
+            user to cancel the export.
+        """
+        if not self.collector.rtiIsSliceable or self.model.rowCount() == 0:
+            logger.warning("Nothing to export")
+            return
+
+        exportRanges = self.exportRanges(selectionOnly=selectionOnly)
+        if exportRanges is None:
+            logger.warning("No cells selected to export")
+            return
+        rowSlice, colSlice = exportRanges
+
+        dialog = QtWidgets.QFileDialog(self, caption="Export")
+        dialog.setAcceptMode(QtWidgets.QFileDialog.AcceptSave)
+        dialog.setNameFilters(list(EXPORT_FILE_FILTERS.values()))
+        if dialog.exec_() != QtWidgets.QFileDialog.Accepted:
+            return
+        fileName = dialog.selectedFiles()[0]
+        nameFilter = dialog.selectedNameFilter()
+        fileFormat = [key for key, value in EXPORT_FILE_FILTERS.items() if value == nameFilter][0]
+
+        if fileFormat == CSV_FORMAT:
+            writer = CsvTableWriter(fileName, encoding=self.config.encodingCti.configValue)
+        elif fileFormat == NPY_FORMAT:
+            writer = NpyTableWriter(fileName)
+        else:
+            datasetName, ok = QtWidgets.QInputDialog.getText(
+                self, "Export", "Name of the new dataset:", text=self.collector.rti.nodeName)
+            if not ok or not datasetName:
+                return
+            writer = Hdf5TableWriter(fileName, datasetName)
+
+        numRows = rowSlice.stop - rowSlice.start
+        numCols = colSlice.stop - colSlice.start
+        progressDialog = QtWidgets.QProgressDialog("Exporting to: {}".format(fileName),
+                                                   "Cancel", 0, numRows, self)
+        progressDialog.setWindowModality(Qt.WindowModal)
+        progressDialog.setMinimumDuration(500)
+
+        def progress(rowsDone):
+            """ Updates the progress dialog. Returns False if the user pressed cancel.
+            """
+            progressDialog.setValue(rowsDone) # Processes events because the dialog is modal.
+            return not progressDialog.wasCanceled()
+
+        collector = self.collector
+        def readStrip(rowStart, rowStop):
+            """ Reads rows of the exported part of the slice.
+            """
+            stripSlice = slice(rowSlice.start + rowStart, rowSlice.start + rowStop)
+            return collector.getSlicedArray(comboSlices=[stripSlice, colSlice], useCache=False)
+
+        try:
+            exportTable(readStrip, numRows, numCols, writer, progress=progress)
+        except Exception as ex:
+            logger.exception(ex)
+            QtWidgets.QMessageBox.warning(self, "Export failed", str(ex))
+        finally:
+            progressDialog.close()
+
+
     def getFont(self):
         """ Returns the font of the table model. Can be a QFont or None if no font is set.
         """
@@ -271,6 +644,9 @@ class TableInspector(AbstractInspector):
         """
         logger.debug("TableInspector._drawContents: {}".format(self))
 
+        if reason == UpdateReason.COLLECTOR_VIEWPORT and self.model.rowCount() > 0:
+            return # The model reads the blocks it needs, the region of interest is irrelevant.
+
         oldTableIndex = self.tableView.currentIndex()
         if oldTableIndex.isValid():
             selectionWasValid = True # Defensive programming, keep old value just in case
@@ -281,9 +657,17 @@ class TableInspector(AbstractInspector):
             oldRow = 0
             oldCol = 0
 
-        self.model.updateState(self.collector.getSlicedArray(),
+        if self.collector.rtiIsSliceable:
+            collector = self.collector
+            readBlock = lambda blockSlices: collector.getSlicedArray(comboSlices=blockSlices)
+            shape = collector.comboDimensionSizes()
+        else:
+            readBlock, shape = None, None
+
+        self.model.updateState(readBlock,
                                self.collector.rtiInfo,
-                               self.configValue('separate fields'))
+                               self.configValue('separate fields'),
+                               shape=shape, prefetchBlocks=self.collector.prefetchBlocks)
 
         self.model.encoding = self.config.encodingCti.configValue
         self.model.horAlignment = self.config.horAlignCti.configValue
@@ -342,14 +726,12 @@ class TableInspector(AbstractInspector):
                 logger.debug("setting horizontal resize mode to ResizeToContents")
                 horHeader.setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
             else:
-                # ResizeToContents can be very slow because it gets all rows.
-                # Work around: resize only first row and columns and apply this to all rows/cols
-                # TODO: perhaps use SizeHintRole?
-                logger.warning("Performance work around: for tables with more than 1000 cells " +
-                               "only the current column is resized and the others use that size.")
+                # ResizeToContents can be very slow because it gets all rows. The widths are
+                # therefore estimated from a sample of the rows, within a time budget.
+                logger.debug("Estimating column widths from a sample of the rows")
                 horHeader.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
-                self.tableView.resizeColumnToContents(oldCol)
-                resizeAllSections(horHeader, self.tableView.columnWidth(oldCol))
+                self._autoSizeColumns(max(0, self.tableView.rowAt(0)),
+                                      max(0, self.tableView.columnAt(0)))
         else:
             logger.debug("Setting horizontal resize mode to Interactive and reset header")
             horHeader.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
@@ -370,6 +752,15 @@ class TableInspector(AbstractInspector):
 class TableInspectorModel(QtCore.QAbstractTableModel):
     """ Qt table model that gives access to the sliced array,
         To be used in the TableInspector.
+
+        The sliced array is never read completely. Blocks of TABLE_BLOCK_SIZE rows and columns
+        are read when their cells are displayed. The least recently used blocks are discarded.
+        When a new block is needed, the next blocks in the same direction are prefetched.
+
+        The cells are converted to strings per tile of FORMAT_TILE_SIZE rows and columns, when
+        the first cell of the tile is displayed. The strings of the most recently displayed tiles
+        are kept until the slice or the format specifiers change. If the fields of a structured
+        array are separated, the views on the fields are made once per block.
     """
     def __init__(self, parent = None):
         """ Constructor
@@ -382,7 +773,15 @@ class TableInspectorModel(QtCore.QAbstractTableModel):
         self._nRows = 0
         self._nCols = 0
         self._fieldNames = []
-        self._slicedArray = None # can be a masked array or a regular numpy array
+        self._tableShape = (0, 0)    # (rows, columns) of the table, including separate fields
+        self._readBlock = None       # function that reads a block of the sliced array
+        self._prefetchBlocks = None  # function that prefetches blocks in the background
+        self._blocks = OrderedDict() # maps (blockRow, blockCol) to TableBlock (LRU order)
+        self._lastBlockKey = None    # The block that was read last, to determine the direction
+        self._formattedTiles = OrderedDict() # maps (row, col, fieldName) of tiles to
+                                             # FormattedCells (LRU order)
+        self._formatKey = None       # The format specifiers of the formatted tiles
+        self._lastFormattedCell = None # ((row, col), result) of the last _formattedCell call
         self._rtiInfo = {}
 
         self._separateFields = True  # User config option
@@ -401,24 +800,49 @@ class TableInspectorModel(QtCore.QAbstractTableModel):
         self.verAlignment = None
 
 
-    def updateState(self, slicedArray, rtiInfo, separateFields):
-        """ Sets the slicedArray and rtiInfo and other members. This will reset the model.
+    @property
+    def fieldNames(self):
+        """ The field names of the sliced array. Empty if the array is not of structured type.
+        """
+        return self._fieldNames
+
+
+    @property
+    def separateFieldOrientation(self):
+        """ The orientation in which the fields have their own cells. None if not separated.
+        """
+        return self._separateFieldOrientation
+
+
+    def updateState(self, readBlock, rtiInfo, separateFields, shape=None, prefetchBlocks=None):
+        """ Sets the block reader and rtiInfo and other members. This will reset the model.
 
             Will be called from the tableInspector._drawContents.
+
+            :param readBlock: function that returns a block of the sliced array as ArrayWithMask.
+                It gets a list with a row and column slice as parameter. None if there is no data.
+            :param shape: the (rows, columns) of the complete sliced array.
+            :param prefetchBlocks: optional function that reads a list of blocks (each given as a
+                list of slices) in the background.
         """
         self.beginResetModel()
         try:
-            # The sliced array can be a masked array or a (regular) numpy array.
-            # The table works fine with masked arrays, no need to replace the masked values.
-            self._slicedArray = slicedArray
-            if slicedArray is None:
+            self._readBlock = readBlock
+            self._prefetchBlocks = prefetchBlocks
+            self._blocks.clear()
+            self._formattedTiles.clear()
+            self._lastFormattedCell = None
+            self._lastBlockKey = None
+
+            if readBlock is None:
                 self._nRows = 0
                 self._nCols = 0
                 self._fieldNames = []
             else:
-                self._nRows, self._nCols = self._slicedArray.shape
-                if self._slicedArray.data.dtype.names:
-                    self._fieldNames = self._slicedArray.data.dtype.names
+                self._nRows, self._nCols = shape
+                # The first block determines the data type. It is also displayed first.
+                if self._nRows > 0 and self._nCols > 0 and self._block(0, 0).data.dtype.names:
+                    self._fieldNames = self._block(0, 0).data.dtype.names
                 else:
                     self._fieldNames = []
 
@@ -442,68 +866,173 @@ class TableInspectorModel(QtCore.QAbstractTableModel):
                 self._separateFieldOrientation = None
                 self._numbersInHeader = True
 
+            self._tableShape = (self.rowCount(), self.columnCount())
+
         finally:
             self.endResetModel()
 
 
-    def _cellValue(self, index):
-        """ Returns the data value of the cell at the index (without any string conversion)
+    def _blockSlices(self, blockRow, blockCol):
+        """ Returns the row and column slices of a block in the sliced array.
         """
-        row = index.row()
-        col = index.column()
-        if (row < 0 or row >= self.rowCount() or col < 0 or col >= self.columnCount()):
-            return None
+        rowStart = blockRow * TABLE_BLOCK_SIZE
+        colStart = blockCol * TABLE_BLOCK_SIZE
+        return [slice(rowStart, min(rowStart + TABLE_BLOCK_SIZE, self._nRows)),
+                slice(colStart, min(colStart + TABLE_BLOCK_SIZE, self._nCols))]
 
-        # The check above should have returned None if the sliced array is None
-        assert self._slicedArray is not None, "Sanity check failed."
 
-        nFields = len(self._fieldNames)
+    def _block(self, blockRow, blockCol):
+        """ Returns the TableBlock. Reads the block if it is not in the model's cache.
+        """
+        key = (blockRow, blockCol)
+        block = self._blocks.get(key)
+        if block is not None:
+            self._blocks[key] = self._blocks.pop(key) # most recently used
+            return block
 
-        data = self._slicedArray.data
-        if self._separateFieldOrientation == Qt.Horizontal:
-            dataValue = data[row, col // nFields][self._fieldNames[col % nFields]]
-        elif self._separateFieldOrientation == Qt.Vertical:
-            dataValue = data[row // nFields, col][self._fieldNames[row % nFields]]
-        else:
-            dataValue = data[row, col]
+        block = TableBlock(self._readBlock(self._blockSlices(blockRow, blockCol)))
+        self._blocks[key] = block
+        while len(self._blocks) > TABLE_MAX_BLOCKS:
+            self._blocks.popitem(last=False)
 
-        return dataValue
+        self._readAhead(key)
+        return block
 
 
-    def _cellMask(self, index):
-        """ Returns the data mask of the cell at the index (without any string conversion)
+    def _readAhead(self, key):
+        """ Prefetches the next blocks in the direction from the previously read block to key.
+        """
+        lastKey = self._lastBlockKey
+        self._lastBlockKey = key
+        if lastKey is None or self._prefetchBlocks is None:
+            return
+
+        rowDir = int(np.sign(key[0] - lastKey[0]))
+        colDir = int(np.sign(key[1] - lastKey[1]))
+        numBlockRows = -(-self._nRows // TABLE_BLOCK_SIZE)
+        numBlockCols = -(-self._nCols // TABLE_BLOCK_SIZE)
+
+        blocks = []
+        for step in range(1, TABLE_READ_AHEAD_BLOCKS + 1):
+            blockRow, blockCol = key[0] + step * rowDir, key[1] + step * colDir
+            if (0 <= blockRow < numBlockRows and 0 <= blockCol < numBlockCols
+                    and (blockRow, blockCol) not in self._blocks):
+                blocks.append(self._blockSlices(blockRow, blockCol))
+
+        if blocks:
+            self._prefetchBlocks(blocks)
+
+
+    def _cellLocation(self, index):
+        """ Returns the (blockRow, blockCol, row, col, fieldName) of the cell at the index.
+
+            The row and column are relative to the start of the block. The fieldName is None if
+            the fields are not separated. Returns None if the cell lies outside the table.
         """
         row = index.row()
         col = index.column()
-        if (row < 0 or row >= self.rowCount() or col < 0 or col >= self.columnCount()):
+        nRows, nCols = self._tableShape
+        if (row < 0 or row >= nRows or col < 0 or col >= nCols):
             return None
 
-        # The check above should have returned None if the sliced array is None
-        assert self._slicedArray is not None, "Sanity check failed."
+        # The check above should have returned None if there is no data
+        assert self._readBlock is not None, "Sanity check failed."
 
         nFields = len(self._fieldNames)
-        mask = self._slicedArray.mask
-        if is_an_array(mask):
-            if self._separateFieldOrientation == Qt.Horizontal:
-                maskValue = mask[row, col // nFields][self._fieldNames[col % nFields]]
-            elif self._separateFieldOrientation == Qt.Vertical:
-                maskValue = mask[row // nFields, col][self._fieldNames[row % nFields]]
-            else:
-                maskValue = mask[row, col]
+        fieldName = None
+        if self._separateFieldOrientation == Qt.Vertical:
+            row, fieldNr = divmod(row, nFields)
+            fieldName = self._fieldNames[fieldNr]
+        elif self._separateFieldOrientation == Qt.Horizontal:
+            col, fieldNr = divmod(col, nFields)
+            fieldName = self._fieldNames[fieldNr]
+
+        blockRow, row = divmod(row, TABLE_BLOCK_SIZE)
+        blockCol, col = divmod(col, TABLE_BLOCK_SIZE)
+        return blockRow, blockCol, row, col, fieldName
+
+
+    def _formattedCell(self, index):
+        """ Returns the (FormattedCells, row, col) of the cell at the index.
+
+            The row and column are relative to the start of the tile. The tile is formatted if
+            this hasn't been done yet. Returns None if the cell lies outside the table.
+
+            The view asks the data of several roles of a cell in succession, so the result for
+            the last cell is remembered.
+        """
+        formatKey = (self.encoding, self.strFormat, self.intFormat, self.numFormat,
+                     self.otherFormat, self.maskFormat)
+        if formatKey != self._formatKey:
+            self._formattedTiles.clear()
+            self._lastFormattedCell = None
+            self._formatKey = formatKey
+
+        cellKey = (index.row(), index.column())
+        if self._lastFormattedCell is not None and self._lastFormattedCell[0] == cellKey:
+            return self._lastFormattedCell[1]
+
+        location = self._cellLocation(index)
+        if location is None:
+            return None
+
+        blockRow, blockCol, row, col, fieldName = location
+        tileRow, row = divmod(row, FORMAT_TILE_SIZE)
+        tileCol, col = divmod(col, FORMAT_TILE_SIZE)
+        key = (blockRow * TABLE_BLOCK_SIZE + tileRow * FORMAT_TILE_SIZE,
+               blockCol * TABLE_BLOCK_SIZE + tileCol * FORMAT_TILE_SIZE, fieldName)
+
+        formatted = self._formattedTiles.get(key)
+        if formatted is None:
+            formatted = self._formatTile(self._block(blockRow, blockCol), tileRow, tileCol,
+                                         fieldName)
+            self._formattedTiles[key] = formatted
+            while len(self._formattedTiles) > MAX_FORMATTED_TILES:
+                self._formattedTiles.popitem(last=False)
         else:
-            maskValue = mask
+            self._formattedTiles[key] = self._formattedTiles.pop(key) # most recently used
+
+        self._lastFormattedCell = (cellKey, (formatted, row, col))
+        return formatted, row, col
 
-        # Here maskValue can still be a list in case of structured arrays. It can even still be
-        # a numpy array in case of a structured array with sub arrays as fields
-        if is_an_array(maskValue):
-            allMasked = np.all(maskValue)
+
+    def _formatTile(self, block, tileRow, tileCol, fieldName):
+        """ Converts all cells of a tile of the block (or of one field) to strings.
+        """
+        tileIndex = (slice(tileRow * FORMAT_TILE_SIZE, (tileRow + 1) * FORMAT_TILE_SIZE),
+                     slice(tileCol * FORMAT_TILE_SIZE, (tileCol + 1) * FORMAT_TILE_SIZE))
+        fieldValues, fieldMasked = block.field(fieldName)
+        values = fieldValues[tileIndex]
+        masked = fieldMasked[tileIndex]
+
+        strings = formatCells(values, masked, encoding=self.encoding,
+                              strFormat=self.strFormat, intFormat=self.intFormat,
+                              numFormat=self.numFormat, otherFormat=self.otherFormat,
+                              maskFormat=self.maskFormat)
+
+        if values.dtype.kind == 'O':
+            isNumber = np.vectorize(lambda value: isinstance(value, numbers.Number),
+                                    otypes=[bool])(values)
         else:
-            try:
-                allMasked = all(maskValue)
-            except TypeError as ex:
-                allMasked = bool(maskValue)
+            isNumber = np.full(masked.shape, values.dtype.kind in 'iufc' and
+                               values.ndim == masked.ndim)
+        return FormattedCells(strings, masked, isNumber)
 
-        return allMasked
+
+    def cellStrings(self, rows, cols):
+        """ Returns a 2D object array with the strings that are displayed in the cells.
+
+            :param rows: sequence of row numbers.
+            :param cols: sequence of column numbers.
+        """
+        result = np.empty((len(rows), len(cols)), dtype=object)
+        for i, row in enumerate(rows):
+            for j, col in enumerate(cols):
+                cell = self._formattedCell(self.index(row, col))
+                if cell is not None:
+                    formatted, tileRow, tileCol = cell
+                    result[i, j] = formatted.strings[tileRow, tileCol]
+        return result
 
 
     def data(self, index, role = Qt.DisplayRole):
@@ -511,25 +1040,27 @@ class TableInspectorModel(QtCore.QAbstractTableModel):
         """
         try:
             if role == Qt.DisplayRole:
-                return to_string(self._cellValue(index), masked=self._cellMask(index),
-                                 decode_bytes=self.encoding, maskFormat=self.maskFormat,
-                                 strFormat=self.strFormat, intFormat=self.intFormat,
-                                 numFormat=self.numFormat, otherFormat=self.otherFormat)
+                cell = self._formattedCell(index)
+                if cell is None:
+                    return None
+                formatted, row, col = cell
+                return formatted.strings[row, col]
 
             elif role == Qt.FontRole:
                 #assert self._font, "Font undefined"
                 return self._font
 
             elif role == Qt.TextColorRole:
-                masked = self._cellMask(index)
-                if not is_an_array(masked) and masked:
+                cell = self._formattedCell(index)
+                if cell is not None and cell[0].masked[cell[1], cell[2]]:
                     return self.missingColor
                 else:
                     return self.dataColor
 
             elif role == Qt.TextAlignmentRole:
                 if self.horAlignment == ALIGN_SMART:
-                    cellContainsNumber = isinstance(self._cellValue(index), numbers.Number)
+                    cell = self._formattedCell(index)
+                    cellContainsNumber = cell is not None and cell[0].isNumber[cell[1], cell[2]]
                     horAlign = Qt.AlignRight if cellContainsNumber else Qt.AlignLeft
                     return horAlign | self.verAlignment
                 else:
@@ -569,6 +1100,19 @@ class TableInspectorModel(QtCore.QAbstractTableModel):
             return None
 
 
+    def arraySlice(self, start, stop, orientation):
+        """ Converts a range of table rows (or columns) to a slice of the sliced array.
+
+            If the fields are separated in the orientation, each cell of the sliced array
+            occupies several rows (or columns) of the table.
+        """
+        if self._separateFieldOrientation == orientation:
+            nFields = len(self._fieldNames)
+            return slice(start // nFields, -(-stop // nFields))
+        else:
+            return slice(start, stop)
+
+
     def rowCount(self, parent=None):
         """ The number of rows of the sliced array.
             The 'parent' parameter can be a QModelIndex. It is ignored since the number of
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+# This file is part of Argos.
+#
+# Argos is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Argos is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Argos. If not, see <http://www.gnu.org/licenses/>.
+
+""" Exports (a part of) the sliced array of the table inspector to a file.
+
+    The array is read and written in strips of rows, so that exporting a large variable only
+    needs the memory of one strip.
+"""
+from __future__ import division, print_function
+
+import csv
+import io
+import logging
+import os
+
+import numpy as np
+
+from collections import OrderedDict
+
+from argos.external import six
+from argos.utils.cls import is_an_array
+from argos.utils.masks import replaceMaskedValue
+
+logger = logging.getLogger(__name__)
+
+EXPORT_STRIP_BYTES = 16 * 1024 * 1024 # Max number of bytes of the data read at once
+
+CSV_FORMAT = 'CSV'
+NPY_FORMAT = 'NPY'
+HDF5_FORMAT = 'HDF5'
+
+# Maps the export formats to the file name filters of the file dialog.
+EXPORT_FILE_FILTERS = OrderedDict([
+    (CSV_FORMAT, "CSV files (*.csv)"),
+    (NPY_FORMAT, "NumPy files (*.npy)"),
+    (HDF5_FORMAT, "HDF-5 files (*.h5 *.hdf5)")])
+
+
+def exportStrips(numRows, numCols, itemSize, maxBytes=EXPORT_STRIP_BYTES):
+    """ Returns a list of (rowStart, rowStop) tuples of the strips in which a table is exported.
+
+        Each strip contains at least one row.
+    """
+    rowsPerStrip = max(1, maxBytes // max(1, numCols * itemSize))
+    return [(rowStart, min(rowStart + rowsPerStrip, numRows))
+            for rowStart in range(0, numRows, rowsPerStrip)]
+
+
+def exportTable(readStrip, numRows, numCols, writer, progress=None,
+                maxBytes=EXPORT_STRIP_BYTES):
+    """ Reads a table in strips of rows and writes the strips with the writer.
+
+        :param readStrip: function that gets a rowStart and rowStop and returns these rows of
+            the table as ArrayWithMask.
+        :param writer: a CsvTableWriter, NpyTableWriter or Hdf5TableWriter.
+        :param progress: optional function that gets the number of rows that are written so
+            far. If it returns False the export is cancelled.
+        :return: True if the complete table was exported, False if the export was cancelled. In
+            the latter case the writer removes the file (or dataset) that was partly written.
+    """
+    if numRows == 0 or numCols == 0:
+        raise ValueError("Nothing to export: the table is empty.")
+
+    firstRow = readStrip(0, 1)
+    writer.open(firstRow.dtype, (numRows, numCols), firstRow.fill_value)
+    try:
+        for rowStart, rowStop in exportStrips(numRows, numCols, firstRow.dtype.itemsize,
+                                              maxBytes=maxBytes):
+            if progress is not None and progress(rowStart) is False:
+                logger.info("Export cancelled at row {} of {}".format(rowStart, numRows))
+                writer.abort()
+                return False
+            writer.writeStrip(rowStart, readStrip(rowStart, rowStop))
+    except:
+        writer.abort()
+        raise
+
+    writer.close()
+    if progress is not None:
+        progress(numRows)
+    return True
+
+
+def filledStripData(strip):
+    """ Returns the data of a strip (ArrayWithMask) where the masked values are replaced by
+        the fill value. The data is returned as is if there is no fill value or if the array is
+        of structured type.
+    """
+    if strip.fill_value is None or strip.dtype.names:
+        return strip.data
+    return replaceMaskedValue(strip.data, strip.mask, strip.fill_value, copyOnReplace=True)
+
+
+
+class CsvTableWriter(object):
+    """ Writes a table to a comma separated values file.
+
+        Masked cells are written as empty strings. The fields of structured arrays are written
+        in separate columns; a header line then contains the field names.
+    """
+    def __init__(self, fileName, encoding='utf-8'):
+        """ Constructor
+
+            :param fileName: name of the CSV file.
+            :param encoding: encoding that is used to decode byte strings.
+        """
+        self.fileName = fileName
+        self.encoding = encoding
+        self._file = None
+        self._csvWriter = None
+        self._fieldNames = None
+
+
+    def open(self, dtype, shape, fillValue):
+        """ Creates the file and writes the header (if any).
+        """
+        self._fieldNames = dtype.names
+        if six.PY2:
+            # The csv module of Python 2 writes byte strings, see _writeRows.
+            self._file = io.open(self.fileName, 'wb')
+        else:
+            self._file = io.open(self.fileName, 'w', newline='', encoding='utf-8')
+        self._csvWriter = csv.writer(self._file)
+        if self._fieldNames:
+            self._writeRows([[u"{} : {}".format(col, fieldName)
+                              for col in range(shape[1])
+                              for fieldName in self._fieldNames]])
+
+
+    def _writeRows(self, rows):
+        """ Writes a list of rows. Each row is a list of cells.
+
+            In Python 2 the text cells are encoded as UTF-8 first.
+        """
+        if six.PY2:
+            rows = [[cell.encode('utf-8') if isinstance(cell, six.text_type) else cell
+                     for cell in row] for row in rows]
+        self._csvWriter.writerows(rows)
+
+
+    def _columnValues(self, values, mask):
+        """ Returns a 2D object array with the values of one field, masked cells are ''.
+        """
+        if values.dtype.kind == 'S':
+            values = np.char.decode(values, self.encoding, 'replace')
+
+        cells = np.empty(values.shape[:2], dtype=object)
+        if values.ndim > 2:
+            cells[...] = [[str(item) for item in row] for row in values.tolist()]
+        else:
+            cells[...] = values.tolist()
+
+        if is_an_array(mask):
+            masked = np.all(mask, axis=tuple(range(2, mask.ndim))) if mask.ndim > 2 else mask
+            cells[masked] = ''
+        elif mask:
+            cells[...] = ''
+        return cells
+
+
+    def writeStrip(self, rowStart, strip):
+        """ Writes a strip of rows (ArrayWithMask) to the file.
+        """
+        data, mask = strip.data, strip.mask
+        if self._fieldNames:
+            nFields = len(self._fieldNames)
+            cells = np.empty((data.shape[0], data.shape[1] * nFields), dtype=object)
+            for fieldNr, fieldName in enumerate(self._fieldNames):
+                fieldMask = mask[fieldName] if is_an_array(mask) else mask
+                cells[:, fieldNr::nFields] = self._columnValues(data[fieldName], fieldMask)
+        else:
+            cells = self._columnValues(data, mask)
+        self._writeRows(cells.tolist())
+
+
+    def close(self):
+        """ Closes the file.
+        """
+        self._file.close()
+
+
+    def abort(self):
+        """ Closes and removes the partly written file.
+        """
+        self._file.close()
+        os.remove(self.fileName)
+
+
+
+class NpyTableWriter(object):
+    """ Writes a table to a NumPy .npy file.
+
+        The file is created with its final size and filled via a memory map. Masked values are
+        replaced by the fill value (if there is one), since .npy files can't store a mask.
+    """
+    def __init__(self, fileName):
+        """ Constructor
+
+            :param fileName: name of the .npy file.
+        """
+        self.fileName = fileName
+        self._memmap = None
+
+
+    def open(self, dtype, shape, fillValue):
+        """ Creates the file.
+        """
+        self._memmap = np.lib.format.open_memmap(self.fileName, mode='w+', dtype=dtype,
+                                                 shape=shape)
+
+
+    def writeStrip(self, rowStart, strip):
+        """ Writes a strip of rows (ArrayWithMask) to the file.
+        """
+        self._memmap[rowStart:rowStart + strip.shape[0]] = filledStripData(strip)
+        self._memmap.flush() # Written pages can then be discarded from memory.
+
+
+    def close(self):
+        """ Closes the file.
+        """
+        self._memmap.flush()
+        self._memmap = None
+
+
+    def abort(self):
+        """ Closes and removes the partly written file.
+        """
+        self._memmap = None
+        os.remove(self.fileName)
+
+
+
+class Hdf5TableWriter(object):
+    """ Writes a table to a new dataset in a (new or existing) HDF-5 file.
+
+        Masked values are replaced by the fill value (if there is one), which is then stored in
+        the _FillValue attribute of the dataset.
+    """
+    def __init__(self, fileName, datasetName):
+        """ Constructor
+
+            :param fileName: name of the HDF-5 file. Is created if it doesn't exist.
+            :param datasetName: path of the new dataset in the file. Must not exist yet.
+        """
+        self.fileName = fileName
+        self.datasetName = datasetName
+        self._file = None
+        self._dataset = None
+        self._createdFile = False
+
+
+    def open(self, dtype, shape, fillValue):
+        """ Opens the file and creates the dataset.
+        """
+        import h5py
+        self._createdFile = not os.path.exists(self.fileName)
+        self._file = h5py.File(self.fileName, 'a')
+        try:
+            if self.datasetName in self._file:
+                raise ValueError("Dataset {!r} already exists in: {}"
+                                 .format(self.datasetName, self.fileName))
+            self._dataset = self._file.create_dataset(self.datasetName, shape=shape,
+                                                      dtype=dtype, chunks=True)
+            if fillValue is not None and not dtype.names:
+                self._dataset.attrs['_FillValue'] = np.array(fillValue, dtype=dtype)
+        except:
+            self._file.close()
+            if self._createdFile:
+                os.remove(self.fileName)
+            raise
+
+
+    def writeStrip(self, rowStart, strip):
+        """ Writes a strip of rows (ArrayWithMask) to the dataset.
+        """
+        self._dataset[rowStart:rowStart + strip.shape[0]] = filledStripData(strip)
+
+
+    def close(self):
+        """ Closes the file.
+        """
+        self._file.close()
+
+
+    def abort(self):
+        """ Removes the partly written dataset and closes the file.
+
+            The file itself is removed if it was created by this writer.
+        """
+        if self._createdFile:
+            self._file.close()
+            os.remove(self.fileName)
+        else:
+            del self._file[self.datasetName]
+            self._file.close()
@@ -40,7 +40,8 @@ def browse(fileNames=None,
            profile=DEFAULT_PROFILE,
            resetProfile=False,      # TODO: should probably be moved to the main program
            resetAllProfiles=False,  # TODO: should probably be moved to the main program
-           resetRegistry=False):    # TODO: should probably be moved to the main program
+           resetRegistry=False,     # TODO: should probably be moved to the main program
+           sliceCacheSize=None):
     """ Opens the main window(s) for the persistent settings of the given profile,
         and executes the application.
 
@@ -51,18 +52,23 @@ def browse(fileNames=None,
         :param resetProfile: if True, the profile will be reset to it standard settings.
         :param resetAllProfiles: if True, all profiles will be reset to it standard settings.
         :param resetRegistry: if True, the registry will be reset to it standard settings.
+        :param sliceCacheSize: memory budget of the slice cache in MB. Use the default if None.
         :return:
     """
     # Imported here so this module can be imported without Qt being installed.
     from argos.qt import QtWidgets, QtCore
     from argos.application import ArgosApplication
     from argos.repo.testdata import createArgosTestData
+    from argos.collect.slicecache import SliceCache
 
     try:
         QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_UseHighDpiPixmaps)
     except Exception as ex:
         logger.debug("AA_UseHighDpiPixmaps not available in PyQt4: {}".format(ex))
 
+    if sliceCacheSize is not None:
+        SliceCache.singleton().maxBytes = int(sliceCacheSize * 1024 * 1024)
+
     # Create
     argosApp = ArgosApplication()
 
@@ -153,6 +159,10 @@ def main():
     parser.add_argument('--reset-registry', dest='reset_registry', action = 'store_true',
         help="If set, the registry will be reset to contain only the default plugins.")
 
+    parser.add_argument('--slice-cache-size', dest='slice_cache_size', type=float, default=None,
+        help="Memory budget (in MB) of the cache for slices that are read from files. "
+             "Use 0 to disable the cache. Default: 256")
+
     parser.add_argument('--version', action = 'store_true',
         help="Prints the program version.")
 
@@ -193,7 +203,8 @@ def main():
            profile=args.profile,
            resetProfile=args.reset_profile,
            resetAllProfiles=args.reset_all_profiles,
-           resetRegistry=args.reset_registry)
+           resetRegistry=args.reset_registry,
+           sliceCacheSize=args.slice_cache_size)
     logger.info('Done {}'.format(PROJECT_NAME))
 
 if __name__ == "__main__":
@@ -26,6 +26,7 @@ class BaseTreeItem(object):
         self._parentItem = None
         self._model = None
         self._childItems = [] # the fetched children
+        self._childNumber = None # row in the parent's children, see childNumber
         self._nodePath = self._constructNodePath()
 
     def finalize(self):
@@ -218,11 +219,31 @@ class BaseTreeItem(object):
 
     def childNumber(self):
         """ Gets the index (nr) of this node in its parent's list of children.
+
+            The row number is stored in the item when it is inserted, so this is O(1) in time.
+            If the stored number turns out to be invalid (e.g. because the list of children was
+            changed directly), the children of the parent are numbered again.
+        """
+        parentItem = self.parentItem
+        if parentItem is None:
+            return 0
+
+        siblings = parentItem.childItems
+        row = self._childNumber
+        if row is None or row >= len(siblings) or siblings[row] is not self:
+            parentItem._numberChildren()
+            row = self._childNumber
+            if row is None or row >= len(siblings) or siblings[row] is not self:
+                raise ValueError("{} is not a child of its parent {}".format(self, parentItem))
+        return row
+
+
+    def _numberChildren(self, start=0):
+        """ Stores the row number in the children, from position start onwards.
         """
-        # This is O(n) in time. # TODO: store row number in the items?
-        if self.parentItem is not None:
-            return self.parentItem.childItems.index(self)
-        return 0
+        childItems = self.childItems
+        for row in range(start, len(childItems)):
+            childItems[row]._childNumber = row
 
 
     def insertChild(self, childItem, position=None):
@@ -247,9 +268,50 @@ class BaseTreeItem(object):
         childItem.parentItem = self
         childItem.model = self.model
         self.childItems.insert(position, childItem)
+        self._numberChildren(start=max(0, position)) # Only the new child if it was appended.
         return childItem
 
 
+    def insertChildren(self, childItems, position=None):
+        """ Inserts a list of child items to the current item at once.
+            The childItems must not yet have a parent (it will be set by this function).
+
+            Does the same as calling insertChild for each child, but the node path prefix is
+            constructed once and the children are numbered once. Descendants that override
+            insertChild have it called for each child instead.
+
+            IMPORTANT: this does not let the model know that items have been added.
+            Use BaseTreeModel.insertItems instead.
+
+            param childItems: list of BaseTreeItems that will be added
+            param position: integer position before which the items will be added.
+                If position is None (default) the items will be appended at the end.
+
+            Returns childItems so that calls may be chained.
+        """
+        if position is None:
+            position = self.nChildren()
+
+        if type(self).insertChild is not BaseTreeItem.insertChild:
+            for offset, childItem in enumerate(childItems):
+                self.insertChild(childItem, position + offset)
+            return childItems
+
+        model = self.model
+        pathPrefix = self.nodePath + '/'
+        for childItem in childItems:
+            assert childItem.parentItem is None, \
+                "childItem already has a parent: {}".format(childItem)
+            assert childItem._model is None, "childItem already has a model: {}".format(childItem)
+            childItem._parentItem = self
+            childItem._model = model
+            childItem._recursiveSetNodePath(pathPrefix + childItem.nodeName)
+
+        self.childItems[position:position] = childItems
+        self._numberChildren(start=position)
+        return childItems
+
+
     def removeChild(self, position):
         """ Removes the child at the position 'position'
             Calls the child item finalize to close its resources before removing it.
@@ -258,7 +320,9 @@ class BaseTreeItem(object):
             "position should be 0 < {} <= {}".format(position, len(self.childItems))
 
         self.childItems[position].finalize()
-        self.childItems.pop(position)
+        childItem = self.childItems.pop(position)
+        childItem._childNumber = None
+        self._numberChildren(start=position)
 
 
     def removeAllChildren(self):
@@ -267,6 +331,7 @@ class BaseTreeItem(object):
         """
         for childItem in self.childItems:
             childItem.finalize()
+            childItem._childNumber = None
         self._childItems = []
 
 
@@ -343,6 +343,36 @@ class BaseTreeModel(QtCore.QAbstractItemModel):
         return childIndex
 
 
+    def insertItems(self, childItems, position=None, parentIndex=None):
+        """ Inserts a list of childItems before row 'position' under the parent index.
+
+            If position is None the children will be appended after the last child of the
+            parent. The model emits a single rowsInserted notification for all children, which
+            is much faster than inserting them one by one when there are many.
+        """
+        if parentIndex is None:
+            parentIndex=QtCore.QModelIndex()
+
+        parentItem = self.getItem(parentIndex, altItem=self.invisibleRootItem)
+
+        nChildren = parentItem.nChildren()
+        if position is None:
+            position = nChildren
+
+        assert 0 <= position <= nChildren, \
+            "position should be 0 < {} <= {}".format(position, nChildren)
+
+        childItems = list(childItems)
+        if not childItems:
+            return
+
+        self.beginInsertRows(parentIndex, position, position + len(childItems) - 1)
+        try:
+            parentItem.insertChildren(childItems, position)
+        finally:
+            self.endInsertRows()
+
+
     def removeAllChildrenAtIndex(self, parentIndex):
         """ Removes all children of the item at the parentIndex.
             The children's finalize method is called before removing them to give them a
@@ -20,6 +20,9 @@
 """
 import logging
 import os
+import threading
+
+from collections import namedtuple
 
 from argos.external import six
 from argos.info import DEBUGGING
@@ -29,6 +32,25 @@ from argos.utils.cls import check_class, is_a_sequence
 
 logger = logging.getLogger(__name__)
 
+# Serializes the access to the underlying resources (e.g. file handles) of the RTIs. Slices are
+# read in worker threads while the GUI thread opens items and reads their attributes, and not
+# all underlying libraries (e.g. netCDF4) are thread safe.
+RTI_READ_LOCK = threading.RLock()
+
+
+class RtiMetadata(namedtuple('RtiMetadata', ['isSliceable', 'arrayShape', 'nDims',
+                                             'dimensionNames', 'elementTypeName', 'unit',
+                                             'missingDataValue'])):
+    """ The properties of an RTI that are shown in the repository tree and used by the collector.
+
+        For RTIs of HDF-5 or NetCDF files, getting these properties reads the attributes of the
+        variable from the file. The metadata record is therefore made once per RTI and kept
+        until the RTI is opened or closed again. The arrayShape, nDims and dimensionNames are
+        None if the RTI is not sliceable.
+    """
+    __slots__ = ()
+
+
 
 class BaseRti(AbstractLazyLoadTreeItem):
     """ TreeItem for use in a RepositoryTreeModel. (RTI = Repository TreeItem)
@@ -49,6 +71,7 @@ class BaseRti(AbstractLazyLoadTreeItem):
 
         self._isOpen = False
         self._exception = None # Any exception that may occur when opening this item.
+        self._metadata = None  # RtiMetadata, made when first needed.
 
         check_class(fileName, six.string_types, allow_none=True)
         if fileName:
@@ -95,15 +118,18 @@ class BaseRti(AbstractLazyLoadTreeItem):
             function instead of this one.
         """
         self.clearException()
+        self.invalidateMetadata()
         try:
             if self._isOpen:
                 logger.warn("Resources already open. Closing them first before opening.")
-                self._closeResources()
+                with RTI_READ_LOCK:
+                    self._closeResources()
                 self._isOpen = False
 
             assert not self._isOpen, "Sanity check failed: _isOpen should be false"
             logger.debug("Opening {}".format(self))
-            self._openResources()
+            with RTI_READ_LOCK:
+                self._openResources()
             self._isOpen = True
 
             if self.model:
@@ -133,10 +159,12 @@ class BaseRti(AbstractLazyLoadTreeItem):
             should typically override the latter instead of this one.
         """
         self.clearException()
+        self.invalidateMetadata()
         try:
             if self._isOpen:
                 logger.debug("Closing {}".format(self))
-                self._closeResources()
+                with RTI_READ_LOCK:
+                    self._closeResources()
                 self._isOpen = False
             else:
                 logger.debug("Resources already closed (ignored): {}".format(self))
@@ -174,6 +202,66 @@ class BaseRti(AbstractLazyLoadTreeItem):
         else:
             return True
 
+    @property
+    def metadata(self):
+        """ The RtiMetadata record with the shape, element type, unit, etc. of this item.
+
+            Is made when first needed and kept until the item is opened or closed again, so
+            that painting the repository tree doesn't read the attributes again. Properties that
+            raise an exception get a default value. If the dimensions can't be determined, the
+            item is considered not sliceable.
+        """
+        if self._metadata is None:
+            with RTI_READ_LOCK: # The worker threads may be reading from the same file.
+                self._metadata = self._makeMetadata()
+        return self._metadata
+
+
+    def _makeMetadata(self):
+        """ Gets the properties of this item and returns them as an RtiMetadata record.
+        """
+        isSliceable = self._metadataField('isSliceable', False)
+        arrayShape = nDims = dimensionNames = None
+        if isSliceable:
+            try:
+                arrayShape = tuple(self.arrayShape)
+                nDims = self.nDims
+                dimensionNames = tuple(self.dimensionNames)
+            except Exception as ex:
+                logger.warning("Unable to get the dimensions of {}: {}".format(self, ex))
+                isSliceable = False
+                arrayShape = nDims = dimensionNames = None
+
+        return RtiMetadata(
+            isSliceable=isSliceable,
+            arrayShape=arrayShape,
+            nDims=nDims,
+            dimensionNames=dimensionNames,
+            elementTypeName=self._metadataField('elementTypeName', ''),
+            unit=self._metadataField('unit', ''),
+            missingDataValue=self._metadataField('missingDataValue', None))
+
+
+    def _metadataField(self, propertyName, default):
+        """ Returns the value of a property for the metadata record.
+
+            If getting the property raises an exception, it is logged and the default is returned,
+            so that a failing property (e.g. an invalid unit attribute) doesn't make the other
+            properties unavailable.
+        """
+        try:
+            return getattr(self, propertyName)
+        except Exception as ex:
+            logger.warning("Unable to get the {} of {}: {}".format(propertyName, self, ex))
+            return default
+
+
+    def invalidateMetadata(self):
+        """ Discards the metadata record. It will be made again when it's needed.
+        """
+        self._metadata = None
+
+
     @property
     def exception(self):
         """ The exception if an error has occurred during reading
@@ -210,7 +298,8 @@ class BaseRti(AbstractLazyLoadTreeItem):
 
             childItems = []
             try:
-                childItems = self._fetchAllChildren()
+                with RTI_READ_LOCK:
+                    childItems = self._fetchAllChildren()
                 assert is_a_sequence(childItems), "ChildItems must be a sequence"
 
             except Exception as ex:
@@ -20,6 +20,7 @@
 import logging
 
 from argos.qt import QtWidgets
+from argos.repo.baserti import RTI_READ_LOCK
 from argos.repo.detailpanes import DetailTablePane
 from argos.utils.cls import to_string, type_name
 from argos.widgets.constants import COL_ELEM_TYPE_WIDTH
@@ -59,7 +60,8 @@ class AttributesPane(DetailTablePane):
             verticalHeader = table.verticalHeader()
             verticalHeader.setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
 
-            attributes = currentRti.attributes if currentRti is not None else {}
+            with RTI_READ_LOCK: # Slices of the same file may be read in a worker thread.
+                attributes = currentRti.attributes if currentRti is not None else {}
             table.setRowCount(len(attributes))
 
             for row, (attrName, attrValue) in enumerate(sorted(attributes.items())):
@@ -20,6 +20,7 @@
 import logging
 
 from argos.qt import Qt, QtWidgets, QtCore
+from argos.repo.baserti import RTI_READ_LOCK
 from argos.repo.detailpanes import DetailTablePane
 
 logger = logging.getLogger(__name__)
@@ -67,10 +68,11 @@ class DimensionsPane(DetailTablePane):
             if currentRti is None or not currentRti.isSliceable:
                 return
 
-            nDims = currentRti.nDims
-            dimNames = currentRti.dimensionNames
-            dimGroups = currentRti.dimensionGroupPaths
-            dimSizes = currentRti.arrayShape
+            with RTI_READ_LOCK: # Slices of the same file may be read in a worker thread.
+                nDims = currentRti.nDims
+                dimNames = currentRti.dimensionNames
+                dimGroups = currentRti.dimensionGroupPaths
+                dimSizes = currentRti.arrayShape
 
             # Sanity check
             assert len(dimNames) == nDims, "dimNames size {} != {}".format(len(dimNames), nDims)
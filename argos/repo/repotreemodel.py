@@ -59,8 +59,8 @@ class RepoTreeModel(BaseTreeModel):
             elif column == self.COL_NODE_PATH:
                 return treeItem.nodePath
             elif column == self.COL_SHAPE:
-                if treeItem.isSliceable:
-                    return " x ".join(str(elem) for elem in treeItem.arrayShape)
+                if treeItem.metadata.isSliceable:
+                    return " x ".join(str(elem) for elem in treeItem.metadata.arrayShape)
                 else:
                     return ""
             elif column == self.COL_IS_OPEN:
@@ -71,13 +71,14 @@ class RepoTreeModel(BaseTreeModel):
                 else:
                     return ""
             elif column == self.COL_ELEM_TYPE:
-                return treeItem.elementTypeName
+                return treeItem.metadata.elementTypeName
             elif column == self.COL_FILE_NAME:
                 return treeItem.fileName if hasattr(treeItem, 'fileName') else ''
             elif column == self.COL_UNIT:
-                return treeItem.unit
+                return treeItem.metadata.unit
             elif column == self.COL_MISSING_DATA:
-                return to_string(treeItem.missingDataValue, noneFormat='') # empty str for Nones
+                # empty str for Nones
+                return to_string(treeItem.metadata.missingDataValue, noneFormat='')
             elif column == self.COL_RTI_TYPE:
                 return type_name(treeItem)
             elif column == self.COL_EXCEPTION:
@@ -93,18 +94,19 @@ class RepoTreeModel(BaseTreeModel):
             elif column == self.COL_NODE_PATH:
                 return treeItem.nodePath
             elif column == self.COL_SHAPE:
-                if treeItem.isSliceable:
-                    return " x ".join(str(elem) for elem in treeItem.arrayShape)
+                if treeItem.metadata.isSliceable:
+                    return " x ".join(str(elem) for elem in treeItem.metadata.arrayShape)
                 else:
                     return ""
             elif column == self.COL_UNIT:
-                return treeItem.unit
+                return treeItem.metadata.unit
             elif column == self.COL_MISSING_DATA:
-                return to_string(treeItem.missingDataValue, noneFormat='') # empty str for Nones
+                # empty str for Nones
+                return to_string(treeItem.metadata.missingDataValue, noneFormat='')
             elif column == self.COL_RTI_TYPE:
                 return type_name(treeItem)
             elif column == self.COL_ELEM_TYPE:
-                return treeItem.elementTypeName
+                return treeItem.metadata.elementTypeName
             elif column == self.COL_FILE_NAME:
                 return treeItem.fileName if hasattr(treeItem, 'fileName') else ''
             else:
@@ -133,9 +135,7 @@ class RepoTreeModel(BaseTreeModel):
         if not parentItem.canFetchChildren():
             return
 
-        # TODO: implement InsertItems to optimize?
-        for childItem in parentItem.fetchChildren():
-            self.insertItem(childItem, parentIndex=parentIndex)
+        self.insertItems(parentItem.fetchChildren(), parentIndex=parentIndex)
 
         # Check that Rti implementation correctly sets canFetchChildren
         assert not parentItem.canFetchChildren(), \
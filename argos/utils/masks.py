@@ -35,25 +35,278 @@ class ConsistencyError(Exception):
     pass
 
 
+def _basicIndexRanges(index, shape):
+    """ Converts a basic index (integers and slices) to a list with per dimension either an
+        integer or an array with the selected indices.
+
+        Returns None if the index is not a basic index (e.g. a boolean or integer array).
+    """
+    if not isinstance(index, tuple):
+        index = (index, )
+    if len(index) > len(shape):
+        return None
+
+    ranges = []
+    for elem, dimSize in zip(index + (slice(None), ) * (len(shape) - len(index)), shape):
+        if isinstance(elem, slice):
+            ranges.append(np.arange(*elem.indices(dimSize)))
+        elif isinstance(elem, (int, np.integer)):
+            if not -dimSize <= elem < dimSize:
+                raise IndexError("Index {} out of bounds for size {}".format(elem, dimSize))
+            ranges.append(int(elem) % dimSize)
+        else:
+            return None
+    return ranges
+
+
+
+class PackedMask(object):
+    """ Boolean mask that is stored bit-packed, using one bit per element instead of one byte.
+
+        The mask can be transposed without unpacking it. Elements can be retrieved with basic
+        indexing (integers and slices), which only unpacks the selected elements.
+    """
+    def __init__(self, packedBits, shape, axes=None):
+        """ Constructor. Use PackedMask.fromArray to create a packed mask from a boolean array.
+
+            :param packedBits: the result of np.packbits on the flattened (C-order) mask.
+            :param shape: the shape of the mask before it was transposed.
+            :param axes: permutation of the axes (as in np.transpose), None for no permutation.
+        """
+        self._packedBits = packedBits
+        self._orgShape = tuple(shape)
+        self._axes = tuple(range(len(shape))) if axes is None else tuple(axes)
+
+
+    @classmethod
+    def fromArray(cls, mask):
+        """ Creates a packed mask from a boolean array.
+        """
+        return cls(np.packbits(np.ravel(mask)), np.shape(mask))
+
+
+    @property
+    def shape(self):
+        """ The shape of the (transposed) mask.
+        """
+        return tuple(self._orgShape[axis] for axis in self._axes)
+
+
+    @property
+    def nbytes(self):
+        """ The number of bytes of the packed bits.
+        """
+        return self._packedBits.nbytes
+
+
+    def any(self):
+        """ Returns True if any element is masked.
+        """
+        return bool(np.any(self._packedBits))
+
+
+    def transpose(self, *axes):
+        """ Returns the transposed mask. Accepts the same axes arguments as np.transpose.
+        """
+        if len(axes) == 1 and axes[0] is not None and not isinstance(axes[0], int):
+            axes = tuple(axes[0])
+        if not axes or axes == (None, ):
+            axes = tuple(reversed(range(len(self._axes))))
+        return PackedMask(self._packedBits, self._orgShape,
+                          axes=[self._axes[axis] for axis in axes])
+
+
+    def expandDims(self, axis):
+        """ Returns the mask with a new dimension of length 1 inserted at the axis position.
+            As np.expand_dims. The packed bits are not copied.
+        """
+        axes = list(self._axes)
+        axes.insert(axis, len(self._orgShape))
+        return PackedMask(self._packedBits, self._orgShape + (1, ), axes=axes)
+
+
+    def expand(self):
+        """ Returns the mask as a boolean array.
+        """
+        size = int(np.prod(self._orgShape))
+        mask = np.unpackbits(self._packedBits, count=size).astype(bool)
+        return np.transpose(mask.reshape(self._orgShape), self._axes)
+
+
+    def __getitem__(self, index):
+        """ Returns the mask elements of the index. Only unpacks the selected elements if the
+            index is a basic index.
+        """
+        if (isinstance(index, slice) and index.step in (None, 1) and self._orgShape
+                and self._axes == tuple(range(len(self._axes)))):
+            # Fast path for a block of rows of a mask that is not transposed. The block is
+            # contiguous in the packed bits.
+            start, stop, _ = index.indices(self._orgShape[0])
+            stop = max(start, stop)
+            rowSize = int(np.prod(self._orgShape[1:]))
+            flatStart, flatStop = start * rowSize, stop * rowSize
+            bits = np.unpackbits(self._packedBits[flatStart >> 3:(flatStop + 7) >> 3])
+            offset = flatStart & 7
+            return (bits[offset:offset + flatStop - flatStart].astype(bool)
+                    .reshape((stop - start, ) + self._orgShape[1:]))
+
+        ranges = _basicIndexRanges(index, self.shape)
+        if ranges is None:
+            return self.expand()[index]
+
+        # Convert the (transposed) indices to flat indices in the packed mask.
+        grids = np.meshgrid(*[np.atleast_1d(r) for r in ranges], indexing='ij', sparse=True)
+        orgIndices = [None] * len(self._axes)
+        for grid, axis in zip(grids, self._axes):
+            orgIndices[axis] = grid
+        flatIndices = np.ravel_multi_index(orgIndices, self._orgShape) if orgIndices else \
+            np.zeros((), dtype=np.intp)
+
+        bits = (self._packedBits[flatIndices >> 3] >> (7 - (flatIndices & 7))) & 1
+        resultShape = tuple(len(r) for r in ranges if not isinstance(r, int))
+        return bits.astype(bool).reshape(resultShape)
+
+
+
+class MissingValueMask(object):
+    """ Mask that is derived from the data: elements that are equal to the missing value are
+        masked. The mask itself is not stored, it is computed when needed.
+
+        Only for arrays that are not of structured type.
+    """
+    def __init__(self, data, missingValue):
+        """ Constructor
+
+            :param data: the (not structured) data array.
+            :param missingValue: the value that indicates missing data.
+        """
+        check_is_an_array(data)
+        assert not array_is_structured(data), "Structured arrays are not supported"
+        self._data = data
+        self._missingValue = missingValue
+
+
+    @property
+    def missingValue(self):
+        """ The value that indicates missing data.
+        """
+        return self._missingValue
+
+
+    @property
+    def shape(self):
+        """ The shape of the mask (equals the shape of the data).
+        """
+        return self._data.shape
+
+
+    @property
+    def nbytes(self):
+        """ The mask is not stored, it takes no memory.
+        """
+        return 0
+
+
+    def any(self):
+        """ Returns True if any element is masked.
+        """
+        return bool(np.any(self._data == self._missingValue))
+
+
+    def transpose(self, *axes):
+        """ Returns the transposed mask. Accepts the same axes arguments as np.transpose.
+        """
+        return MissingValueMask(np.transpose(self._data, *axes), self._missingValue)
+
+
+    def expandDims(self, axis):
+        """ Returns the mask with a new dimension of length 1 inserted at the axis position.
+        """
+        return MissingValueMask(np.expand_dims(self._data, axis), self._missingValue)
+
+
+    def expand(self):
+        """ Returns the mask as a boolean array.
+        """
+        return np.asarray(self._data == self._missingValue)
+
+
+    def __getitem__(self, index):
+        """ Returns the mask elements of the index.
+        """
+        return np.asarray(self._data[index] == self._missingValue)
+
+
+COMPACT_MASK_TYPES = (PackedMask, MissingValueMask)
+
+COMPARE_BLOCK_SIZE = 1024 * 1024 # Number of elements that are compared at once.
+
+
+def compactMask(mask, data=None, missingValue=None):
+    """ Returns a compact representation of a mask.
+
+        Returns a boolean if all elements of the mask are equal. Otherwise, if the mask is equal
+        to data == missingValue, a MissingValueMask is returned. Otherwise a PackedMask.
+        Masks that are not arrays (e.g. booleans or compact masks) are returned as is.
+    """
+    if not is_an_array(mask) or mask.dtype != np.bool_:
+        return bool(mask) if isinstance(mask, np.bool_) else mask
+
+    numMasked = np.count_nonzero(mask)
+    if numMasked == 0:
+        return False
+    elif numMasked == mask.size:
+        return True
+
+    if (missingValue is not None and data is not None and not array_is_structured(data)
+            and data.shape == mask.shape and _isMissingValueMask(mask, data, missingValue)):
+        return MissingValueMask(data, missingValue)
+
+    return PackedMask.fromArray(mask)
+
+
+def _isMissingValueMask(mask, data, missingValue):
+    """ Returns True if the mask equals data == missingValue.
+
+        The data is compared in a single pass, block by block, so that no temporary arrays of the
+        size of the data are made. Stops at the first block that differs.
+    """
+    rowSize = max(1, int(np.prod(data.shape[1:])))
+    rowsPerBlock = max(1, COMPARE_BLOCK_SIZE // rowSize)
+    for start in range(0, data.shape[0], rowsPerBlock):
+        block = slice(start, start + rowsPerBlock)
+        if not np.array_equal(np.asarray(data[block] == missingValue), mask[block]):
+            return False
+    return True
+
+
+
 class ArrayWithMask(object):
     """ Class for storing an arrays together with a mask.
 
         Used instead of the Numpy MaskedArray class, which has too many issues.
+
+        The mask can be a boolean array, a single boolean for the complete array, or a compact
+        mask (PackedMask or MissingValueMask). Compact masks are only expanded to a boolean
+        array when the mask property or maskIndex is used. Use maskAt to get the mask of some
+        elements without expanding the complete mask.
     """
     def __init__(self, data, mask, fill_value):
         """ Constructor
 
             :param data:
-            :param mask: array with mask or single boolean for the complete mask
+            :param mask: array with mask, single boolean for the complete mask, or compact mask.
             :param fill_value:
         """
         check_is_an_array(data)
-        check_class(mask, (np.ndarray, bool, np.bool_))
+        check_class(mask, (np.ndarray, bool, np.bool_) + COMPACT_MASK_TYPES)
 
         # Init fields
         self._data = None
         self._mask = None
         self._fill_value= None
+        self._stats = None
+        self._approximateStats = None
 
         # Use setters
         self.data = data
@@ -72,22 +325,90 @@ class ArrayWithMask(object):
         """ The array values. Must be a numpy array."""
         check_is_an_array(values)
         self._data = values
+        self._stats = None
+        self._approximateStats = None
 
 
     @property
     def mask(self):
-        """ The mask values. Will be an array or a boolean scalar."""
+        """ The mask values. Will be an array or a boolean scalar.
+
+            Compact masks are expanded to a new array each time. Use maskAt if only some elements
+            are needed.
+        """
+        if isinstance(self._mask, COMPACT_MASK_TYPES):
+            return self._mask.expand()
         return self._mask
 
 
     @mask.setter
     def mask(self, mask):
-        """ The mask values. Must be an array or a boolean scalar."""
-        check_class(mask, (np.ndarray, bool, np.bool_))
+        """ The mask values. Must be an array, a boolean scalar or a compact mask."""
+        check_class(mask, (np.ndarray, bool, np.bool_) + COMPACT_MASK_TYPES)
         if isinstance(mask, (bool, np.bool_)):
             self._mask = bool(mask)
         else:
             self._mask = mask
+        self._stats = None
+        self._approximateStats = None
+
+
+    @property
+    def storedMask(self):
+        """ The mask as it is stored: a boolean, a boolean array or a compact mask.
+
+            Compact masks support basic indexing, so they can be used to process the mask in
+            blocks without expanding it completely.
+        """
+        return self._mask
+
+
+    @property
+    def hasCompactMask(self):
+        """ True if the mask is stored as a boolean scalar or compact mask (not as an array).
+        """
+        return not is_an_array(self._mask)
+
+
+    def compactMask(self, missingValue=None):
+        """ Replaces the mask array by a compact mask. See the compactMask function.
+        """
+        self._mask = compactMask(self._mask, self.data, missingValue)
+
+
+    def anyMasked(self):
+        """ Returns True if any element is masked.
+        """
+        if isinstance(self._mask, bool):
+            return self._mask
+        return bool(self._mask.any())
+
+
+    @property
+    def stats(self):
+        """ The SliceStats of the valid (i.e. non-masked and non-NaN) values.
+
+            Calculated when first used and then kept until the data or mask is replaced.
+        """
+        if self._stats is None:
+            self._stats = SliceStats(self)
+        return self._stats
+
+
+    @property
+    def approximateStats(self):
+        """ Approximate statistics of the valid values (see ApproximateSliceStats).
+
+            Only arrays with more than APPROXIMATE_STATS_MIN_SIZE elements get approximate
+            statistics. For smaller arrays, or when the exact statistics have already been
+            calculated, the exact statistics are returned.
+        """
+        if self._stats is not None or self.data.size <= APPROXIMATE_STATS_MIN_SIZE:
+            return self.stats
+
+        if self._approximateStats is None:
+            self._approximateStats = ApproximateSliceStats(self)
+        return self._approximateStats
 
 
     @property
@@ -105,9 +426,9 @@ class ArrayWithMask(object):
     def checkIsConsistent(self):
         """ Raises a ConsistencyError if the mask has an incorrect shape.
         """
-        if is_an_array(self.mask) and self.mask.shape != self.data.shape:
+        if not isinstance(self._mask, bool) and self._mask.shape != self.data.shape:
             raise ConsistencyError("Shape mismatch mask={}, data={}"
-                                   .format(self.mask.shape != self.data.shape))
+                                   .format(self._mask.shape, self.data.shape))
 
 
     @classmethod
@@ -142,19 +463,20 @@ class ArrayWithMask(object):
             It the mask is a boolean it is returned since this boolean representes the mask for
             all array elements.
         """
-        if isinstance(self.mask, bool):
-            return self.mask
+        if isinstance(self._mask, bool):
+            return self._mask
         else:
-            return self.mask[index]
+            return self._mask[index]
 
 
     def maskIndex(self):
         """ Returns a boolean index with True if the value is masked.
 
             Always has the same shape as the maksedArray.data, event if the mask is a single boolan.
+            In that case a read-only view of a single boolean is returned, which takes no memory.
         """
-        if isinstance(self.mask, bool):
-            return np.full(self.data.shape, self.mask, dtype=np.bool)
+        if isinstance(self._mask, bool):
+            return np.broadcast_to(np.bool_(self._mask), self.data.shape)
         else:
             return self.mask
 
@@ -181,6 +503,36 @@ class ArrayWithMask(object):
         return self.data[index]
 
 
+    def copy(self):
+        """ Returns a copy of the data and mask. Compact masks are kept compact.
+        """
+        data = np.copy(self.data)
+        if is_an_array(self._mask):
+            mask = np.copy(self._mask)
+        elif isinstance(self._mask, MissingValueMask):
+            mask = MissingValueMask(data, self._mask.missingValue) # Derived from the copy
+        else:
+            mask = self._mask # Booleans and packed masks are not modified in place.
+        return ArrayWithMask(data, mask, self.fill_value)
+
+
+    def expandDims(self, axis):
+        """ Returns the array with a new dimension of length 1 inserted at the axis position.
+            As np.expand_dims, the result is a view.
+        """
+        data = np.expand_dims(self.data, axis)
+        if is_an_array(self._mask):
+            mask = np.expand_dims(self._mask, axis)
+        elif isinstance(self._mask, COMPACT_MASK_TYPES):
+            mask = self._mask.expandDims(axis)
+        else:
+            mask = self._mask
+        expanded = ArrayWithMask(data, mask, self.fill_value)
+        expanded._stats = self._stats
+        expanded._approximateStats = self._approximateStats
+        return expanded
+
+
     def transpose(self, *args, **kwargs):
         """ Transposes the array and mask separately
 
@@ -188,19 +540,68 @@ class ArrayWithMask(object):
             :return: copy/view with transposed
         """
         tdata = np.transpose(self.data, *args, **kwargs)
-        tmask = np.transpose(self.mask, *args, **kwargs) if is_an_array(self.mask) else self.mask
-        return ArrayWithMask(tdata, tmask, self.fill_value)
+        if is_an_array(self._mask):
+            tmask = np.transpose(self._mask, *args, **kwargs)
+        elif isinstance(self._mask, COMPACT_MASK_TYPES):
+            tmask = self._mask.transpose(*args, **kwargs)
+        else:
+            tmask = self._mask
+        transposed = ArrayWithMask(tdata, tmask, self.fill_value)
+        # The statistics don't depend on the order of the values.
+        transposed._stats = self._stats
+        transposed._approximateStats = self._approximateStats
+        return transposed
+
+
+    @property
+    def isReadOnly(self):
+        """ True if the data is marked as read-only (i.e. it is not writeable).
+        """
+        return not self.data.flags.writeable
+
+
+    def setReadOnly(self):
+        """ Marks the data and mask as read-only.
+
+            Used when the data is shared, e.g. with the slice cache. Methods that modify the data
+            will then make a copy first (copy-on-write).
+        """
+        self.data.flags.writeable = False
+        if is_an_array(self._mask):
+            self._mask.flags.writeable = False
+
+
+    def _makeDataWriteable(self):
+        """ Replaces the data by a (writeable) copy if the data is read-only.
+        """
+        if not self.data.flags.writeable:
+            self.data = np.copy(self.data)
+
+
+    def _freezeDerivedMask(self, mask):
+        """ Replaces a mask that is derived from the data by a packed mask.
+
+            Must be called when the data is modified, otherwise the mask would change as well.
+        """
+        if isinstance(self._mask, MissingValueMask):
+            self._mask = PackedMask.fromArray(mask)
 
 
     def replaceMaskedValue(self, replacementValue):
         """ Replaces values where the mask is True with the replacement value.
+
+            If the data is read-only, it is copied first.
         """
-        if self.mask is False:
+        if self._mask is False:
             pass
-        elif self.mask is True:
+        elif self._mask is True:
+            self._makeDataWriteable()
             self.data[:] = replacementValue
-        else:
-            self.data[self.mask] = replacementValue
+        elif self.anyMasked():
+            mask = self.mask
+            self._makeDataWriteable()
+            self.data[mask] = replacementValue
+            self._freezeDerivedMask(mask)
 
 
     def replaceMaskedValueWithNan(self):
@@ -208,6 +609,7 @@ class ArrayWithMask(object):
 
             Will change the data type to float if the data is an integer.
             If the data is not a float (or int) the function does nothing.
+            If the data is read-only, it is copied first.
         """
         kind = self.data.dtype.kind
         if kind == 'i' or kind == 'u': # signed/unsigned int
@@ -216,12 +618,16 @@ class ArrayWithMask(object):
         if self.data.dtype.kind != 'f':
             return # only replace for floats
 
-        if self.mask is False:
+        if self._mask is False:
             pass
-        elif self.mask is True:
+        elif self._mask is True:
+            self._makeDataWriteable()
             self.data[:] = np.NaN
-        else:
-            self.data[self.mask] = np.NaN
+        elif self.anyMasked():
+            mask = self.mask
+            self._makeDataWriteable()
+            self.data[mask] = np.NaN
+            self._freezeDerivedMask(mask)
 
 
 #############
@@ -232,7 +638,9 @@ def replaceMaskedValue(data, mask, replacementValue, copyOnReplace=True):
     """ Replaces values where the mask is True with the replacement value.
 
         :copyOnReplace makeCopy: If True (the default) it makes a copy if data is replaced.
+            Read-only data is always copied before it is replaced.
     """
+    copyOnReplace = copyOnReplace or not data.flags.writeable
     if mask is False:
         result = data
     elif mask is True:
@@ -240,7 +648,10 @@ def replaceMaskedValue(data, mask, replacementValue, copyOnReplace=True):
         result[:] = replacementValue
     else:
         #logger.debug("############ count_nonzero: {}".format(np.count_nonzero(mask)))
-        if copyOnReplace and np.any(mask):
+        if not np.any(mask):
+            return data
+
+        if copyOnReplace:
             #logger.debug("Making copy")
             result = np.copy(data)
         else:
@@ -271,26 +682,400 @@ def replaceMaskedValueWithFloat(data, mask, replacementValue, copyOnReplace=True
 
 
 
-def maskedNanPercentile(maskedArray, percentiles, *args, **kwargs):
-    """ Calculates np.nanpercentile on the non-masked values
+DISPLAY_BLOCK_SIZE = 256 * 1024  # Number of elements that are processed at once.
+
+STATS_BLOCK_SIZE = 1024 * 1024  # Number of elements per block for the approximate statistics.
+APPROXIMATE_STATS_MIN_SIZE = 4 * 1024 * 1024  # Smaller arrays always get exact statistics.
+APPROXIMATE_STATS_RELATIVE_ERROR = 1e-4  # Default error bound of the approximate percentiles.
+
+
+def displayBufferDtype(dtype):
+    """ Returns the dtype of the display buffer of data with the given dtype.
+
+        Double precision data keeps its precision, all other data is converted to float32.
     """
+    return np.float64 if dtype == np.float64 else np.float32
 
-    #https://docs.scipy.org/doc/numpy/reference/maskedarray.generic.html#accessing-the-data
-    awm = ArrayWithMask.createFromMaskedArray(maskedArray)
 
-    maskIdx = awm.maskIndex()
-    validData = awm.data[~maskIdx]
+def fillDisplayBuffer(data, mask, out):
+    """ Copies the data into a floating point buffer, replacing masked and infinite values by NaN.
 
-    if len(validData) >= 1:
-        result = np.nanpercentile(validData, percentiles, *args, **kwargs)
-    else:
-        # If np.nanpercentile on an empty list only returns a single Nan. We correct this here.
-        result = len(percentiles) * [np.nan]
+        The buffer is filled in a single pass over blocks of rows, so that the temporary arrays
+        stay small and no full-size intermediate copies are made.
+
+        :param data: real-valued numpy array.
+        :param mask: boolean, boolean array or compact mask (see ArrayWithMask)
+        :param out: float array with the same shape as the data. Is returned.
+    """
+    assert out.shape == data.shape, "Shape mismatch: {} != {}".format(out.shape, data.shape)
+    if mask is True:
+        out[...] = np.nan
+        return out
+
+    if data.ndim == 0:
+        out[...] = np.nan if (mask is not False and mask[()]) or np.isinf(data) else data
+        return out
+
+    rowSize = max(1, int(np.prod(data.shape[1:])))
+    blockRows = max(1, DISPLAY_BLOCK_SIZE // rowSize)
+    invalid = np.empty((min(blockRows, data.shape[0]), ) + data.shape[1:], dtype=np.bool_)
+
+    for start in range(0, data.shape[0], blockRows):
+        stop = min(start + blockRows, data.shape[0])
+        outBlock = out[start:stop]
+        invalidBlock = invalid[:stop - start]
 
-    assert len(result) == len(percentiles), \
-        "shape mismatch: {} != {}".format(len(result), len(percentiles))
+        np.copyto(outBlock, data[start:stop], casting='unsafe')
+        np.isinf(outBlock, out=invalidBlock)
+        if mask is not False:
+            invalidBlock |= mask[start:stop]
+        np.copyto(outBlock, np.nan, where=invalidBlock)
 
-    return result # as expected
+    return out
+
+
+
+class DisplayBufferPool(object):
+    """ Keeps display buffers so that redrawing slices of the same shape allocates no memory.
+
+        At most maxBuffers buffers are kept. The least recently used buffer is discarded first.
+
+        The buffer that was returned last is not returned again by the next call, since it may
+        still be in use, e.g. by the thread that builds the image pyramid of the previous slice.
+        Slices of the same shape therefore alternate between two buffers.
+    """
+    def __init__(self, maxBuffers=2):
+        """ Constructor
+        """
+        assert maxBuffers >= 2, "At least two buffers are needed to alternate between them."
+        self._maxBuffers = maxBuffers
+        self._buffers = [] # list of arrays, the most recently used last
+
+
+    def getBuffer(self, shape, dtype):
+        """ Returns a buffer of the shape and dtype. Its contents are undefined.
+        """
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        for buffer in self._buffers[:-1]: # Skip the buffer that was returned last
+            if buffer.shape == shape and buffer.dtype == dtype:
+                self._buffers.remove(buffer)
+                self._buffers.append(buffer)
+                return buffer
+
+        buffer = np.empty(shape, dtype=dtype)
+        self._buffers.append(buffer)
+        del self._buffers[:-self._maxBuffers]
+        return buffer
+
+
+    def clear(self):
+        """ Discards all buffers.
+        """
+        self._buffers = []
+
+
+    def displayArray(self, awm):
+        """ Returns the data of the ArrayWithMask as float array, with NaNs where the data is
+            masked or infinite. The array is a buffer from the pool.
+        """
+        buffer = self.getBuffer(awm.shape, displayBufferDtype(awm.dtype))
+        return fillDisplayBuffer(awm.data, awm.storedMask, buffer)
+
+
+
+class SliceStats(object):
+    """ Statistics of the valid (i.e. non-masked and non-NaN) values of an array.
+
+        The valid values are copied once, block by block, so that a compact mask doesn't have to
+        be expanded completely. Percentiles are found with np.partition, which only puts the
+        values that are needed in their sorted position. These values are kept, so the ranges
+        that discard a percentage of the minimum and maximum values can be looked up again
+        without processing the array.
+    """
+    def __init__(self, awm):
+        """ Constructor
+
+            :param awm: ArrayWithMask with real numbers.
+        """
+        validBlocks = []
+        if awm.storedMask is not True:
+            for block, masked in self._blocks(awm):
+                excluded = masked
+                if block.dtype.kind == 'f':
+                    isNan = np.isnan(block)
+                    excluded = isNan if masked is None else (isNan | masked)
+                validBlocks.append(block.ravel() if excluded is None else block[~excluded])
+
+        # Concatenate always makes a copy, so the data is not reordered by the partitioning.
+        self._validData = np.concatenate(validBlocks) if validBlocks else np.zeros(0)
+        self._min = float(np.min(self._validData)) if self.count else np.nan
+        self._max = float(np.max(self._validData)) if self.count else np.nan
+        self._orderStatistics = {} # Maps the index in the sorted values to the value
+
+
+    @staticmethod
+    def _blocks(awm):
+        """ Generates (block, masked) tuples per block of rows.
+
+            Masked is a boolean array with the mask of the block, or None if nothing is masked.
+        """
+        data = awm.data
+        mask = awm.storedMask
+        if data.ndim == 0:
+            data = data.reshape(1)
+            mask = mask if isinstance(mask, bool) else np.reshape(awm.mask, 1)
+
+        rowSize = max(1, int(np.prod(data.shape[1:])))
+        blockRows = max(1, STATS_BLOCK_SIZE // rowSize)
+
+        for start in range(0, data.shape[0], blockRows):
+            block = data[start:start + blockRows]
+            if block.dtype.kind == 'b':
+                block = block.astype(np.float32)
+            masked = None if mask is False else np.asarray(mask[start:start + blockRows])
+            yield block, masked
+
+
+    @property
+    def count(self):
+        """ The number of valid values.
+        """
+        return len(self._validData)
+
+
+    @property
+    def min(self):
+        """ The minimum of the valid values. NaN if there are no valid values.
+        """
+        return self._min
+
+
+    @property
+    def max(self):
+        """ The maximum of the valid values. NaN if there are no valid values.
+        """
+        return self._max
+
+
+    def percentile(self, percentage):
+        """ Returns the percentile of the valid values. NaN if there are no valid values.
+
+            Uses linear interpolation, so the result is the same as that of np.nanpercentile.
+        """
+        return self.percentiles([percentage])[0]
+
+
+    def percentiles(self, percentages):
+        """ Returns the list of percentiles of the valid values. See percentile.
+
+            The values that are not yet known are found with a single np.partition call.
+        """
+        count = self.count
+        if count == 0:
+            return [np.nan] * len(percentages)
+
+        positions = [(count - 1) * percentage / 100.0 for percentage in percentages]
+        indices = set()
+        for position in positions:
+            lowIdx = int(np.floor(position))
+            indices.update([lowIdx, min(lowIdx + 1, count - 1)])
+
+        newIndices = sorted(indices.difference(self._orderStatistics))
+        if newIndices:
+            self._validData.partition(newIndices)
+            for idx in newIndices:
+                self._orderStatistics[idx] = float(self._validData[idx])
+
+        result = []
+        for position in positions:
+            lowIdx = int(np.floor(position))
+            low = self._orderStatistics[lowIdx]
+            if position == lowIdx:
+                result.append(low)
+            else:
+                high = self._orderStatistics[lowIdx + 1]
+                result.append(low + (high - low) * (position - lowIdx))
+        return result
+
+
+    def discardedRange(self, percentage):
+        """ Returns the (min, max) range after discarding percentage of the minimum values and
+            percentage of the maximum values.
+        """
+        if percentage == 0:
+            return self.min, self.max  # no interpolation needed
+        return tuple(self.percentiles([percentage, 100 - percentage]))
+
+
+
+class ApproximateSliceStats(SliceStats):
+    """ Approximate statistics of the valid (i.e. non-masked and non-NaN) values of an array.
+
+        Instead of sorting the values, a histogram of the finite values is made while
+        streaming over the array in blocks of STATS_BLOCK_SIZE elements. No copy of the complete
+        array is made. The count, minimum and maximum are exact. The error of a percentile is
+        at most relativeError * (max - min) of the finite values.
+    """
+    def __init__(self, awm, relativeError=APPROXIMATE_STATS_RELATIVE_ERROR):
+        """ Constructor
+
+            :param awm: ArrayWithMask with real numbers. Must have at least one dimension.
+            :param relativeError: maximum error of the percentiles, relative to the data range.
+        """
+        assert awm.data.ndim >= 1, "Array must have at least one dimension"
+        assert 0 < relativeError < 1, "relativeError out of range: {}".format(relativeError)
+        self._numBins = int(np.ceil(1.0 / relativeError))
+        self._numNegInf = 0
+        self._numPosInf = 0
+        self._numFinite = 0
+        self._finiteMin = np.inf
+        self._finiteMax = -np.inf
+        self._counts = np.zeros(self._numBins, dtype=np.int64)
+
+        if awm.storedMask is not True:
+            # The range of the finite values must be known to create the histogram bins.
+            for block, masked in self._blocks(awm):
+                self._addRange(block, masked)
+            for block, masked in self._blocks(awm):
+                self._addToHistogram(block, masked)
+
+        self._cumCounts = np.cumsum(self._counts)
+
+
+    @staticmethod
+    def _excluded(block, masked):
+        """ Returns a boolean array that is True where the block is masked, NaN or infinite.
+
+            Returns None if no values are excluded. The valid values are not compacted into a new
+            array because that is relatively slow.
+        """
+        if block.dtype.kind == 'f':
+            excluded = ~np.isfinite(block)
+            if masked is not None:
+                excluded |= masked
+            return excluded
+        else:
+            return masked
+
+
+    def _addRange(self, block, masked):
+        """ Counts the valid values of a block and updates the range of its finite values.
+        """
+        excluded = self._excluded(block, masked)
+        numFinite = block.size if excluded is None else block.size - np.count_nonzero(excluded)
+
+        if block.dtype.kind == 'f':
+            isInf = np.isinf(block)
+            if masked is not None:
+                isInf &= ~masked
+            numInf = int(np.count_nonzero(isInf))
+            if numInf:
+                numPosInf = int(np.count_nonzero(isInf & (block > 0)))
+                self._numPosInf += numPosInf
+                self._numNegInf += numInf - numPosInf
+
+        if numFinite:
+            where = True if excluded is None else ~excluded
+            self._numFinite += int(numFinite)
+            self._finiteMin = min(self._finiteMin,
+                                  float(np.min(block, where=where, initial=np.inf)))
+            self._finiteMax = max(self._finiteMax,
+                                  float(np.max(block, where=where, initial=-np.inf)))
+
+
+    def _addToHistogram(self, block, masked):
+        """ Adds the finite values of a block to the histogram.
+
+            The excluded values are counted in an extra bin, which is discarded.
+        """
+        excluded = self._excluded(block, masked)
+        if self._finiteMax <= self._finiteMin:
+            # All finite values are the same (or there are none).
+            self._counts[0] += block.size if excluded is None else \
+                block.size - np.count_nonzero(excluded)
+            return
+
+        scale = self._numBins / (self._finiteMax - self._finiteMin)
+        with np.errstate(invalid='ignore', over='ignore'):
+            binNrs = ((block - self._finiteMin) * scale).astype(np.intp).ravel()
+        np.minimum(binNrs, self._numBins - 1, out=binNrs)
+        if excluded is not None:
+            binNrs[excluded.ravel()] = self._numBins
+        self._counts += np.bincount(binNrs, minlength=self._numBins + 1)[:self._numBins]
+
+
+    @property
+    def relativeError(self):
+        """ The maximum error of the percentiles, relative to the range of the finite values.
+        """
+        return 1.0 / self._numBins
+
+
+    @property
+    def count(self):
+        """ The number of valid values.
+        """
+        return self._numNegInf + self._numFinite + self._numPosInf
+
+
+    @property
+    def min(self):
+        """ The minimum of the valid values. NaN if there are no valid values.
+        """
+        if self._numNegInf:
+            return -np.inf
+        elif self._numFinite:
+            return self._finiteMin
+        elif self._numPosInf:
+            return np.inf
+        else:
+            return np.nan
+
+
+    @property
+    def max(self):
+        """ The maximum of the valid values. NaN if there are no valid values.
+        """
+        if self._numPosInf:
+            return np.inf
+        elif self._numFinite:
+            return self._finiteMax
+        elif self._numNegInf:
+            return -np.inf
+        else:
+            return np.nan
+
+
+    def percentile(self, percentage):
+        """ Returns the approximate percentile of the valid values. NaN if there are no values.
+
+            The value is interpolated linearly within the histogram bin that contains it.
+        """
+        count = self.count
+        if count == 0:
+            return np.nan
+
+        # Position in the sorted values, relative to the first finite value.
+        position = (count - 1) * percentage / 100.0 - self._numNegInf
+        if position < 0:
+            return -np.inf
+        elif position > self._numFinite - 1:
+            return np.inf
+
+        binNr = int(np.searchsorted(self._cumCounts, position, side='right'))
+        binNr = min(binNr, self._numBins - 1)
+        numBefore = self._cumCounts[binNr - 1] if binNr > 0 else 0
+        fraction = (position - numBefore + 0.5) / max(1, self._counts[binNr])
+        binWidth = (self._finiteMax - self._finiteMin) / self._numBins
+        value = self._finiteMin + (binNr + fraction) * binWidth
+        return min(max(value, self._finiteMin), self._finiteMax)
+
+
+    def percentiles(self, percentages):
+        """ Returns the list of approximate percentiles of the valid values. See percentile.
+        """
+        return [self.percentile(percentage) for percentage in percentages]
 
 
 
@@ -333,8 +1118,6 @@ def fillValuesToNan(masked_array):
         return masked_array
 
 
-#TODO: does recordMask help here?
-# https://docs.scipy.org/doc/numpy/reference/maskedarray.baseclass.html#numpy.ma.MaskedArray.recordmask
 def maskedEqual(array, missingValue):
     """ Mask an array where equal to a given (missing)value.
 
@@ -342,26 +1125,44 @@ def maskedEqual(array, missingValue):
         https://mail.scipy.org/pipermail/numpy-discussion/2011-July/057669.html
 
         If the data is a structured array the mask is applied for every field (i.e. forming a
-        logical-and). Otherwise ma.masked_equal is called.
+        logical-and). Otherwise the mask is computed with a single vectorized comparison.
+
+        If no element equals the missing value (e.g. when missingValue is None) the result has
+        no mask (ma.nomask), so that no memory is spent on a mask with only False values.
     """
-    if array_is_structured(array):
-        # Enforce the array to be masked
-        if not isinstance(array, ma.MaskedArray):
-            array = ma.MaskedArray(array)
+    data = ma.getdata(array)
+    orgMask = ma.getmask(array)
 
+    if missingValue is None:
+        mask = ma.nomask
+    elif array_is_structured(data):
         # Set the mask separately per field
-        for nr, field in enumerate(array.dtype.names):
+        mask = np.zeros(data.shape, dtype=ma.make_mask_descr(data.dtype))
+        anyMasked = False
+        for nr, field in enumerate(data.dtype.names):
             if hasattr(missingValue, '__len__'):
                 fieldMissingValue = missingValue[nr]
             else:
                 fieldMissingValue = missingValue
 
-            array[field] = ma.masked_equal(array[field], fieldMissingValue)
+            fieldMask = data[field] == fieldMissingValue
+            mask[field] = fieldMask
+            anyMasked = anyMasked or bool(np.any(fieldMask))
 
-        check_class(array, ma.MaskedArray) # post-condition check
-        return array
+        if not anyMasked:
+            mask = ma.nomask
     else:
-        # masked_equal works with missing is None
-        result = ma.masked_equal(array, missingValue, copy=False)
-        check_class(result, ma.MaskedArray) # post-condition check
-        return result
+        mask = np.asarray(data == missingValue)
+        if mask.shape != data.shape or not np.any(mask):
+            mask = ma.nomask # also when the comparison is not element-wise (incompatible types)
+
+    if orgMask is not ma.nomask:
+        mask = ma.mask_or(orgMask, mask)
+
+    if missingValue is None or array_is_structured(data):
+        result = ma.MaskedArray(data, mask=mask)
+    else:
+        result = ma.MaskedArray(data, mask=mask, fill_value=missingValue)
+
+    check_class(result, ma.MaskedArray) # post-condition check
+    return result
@@ -110,6 +110,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Disconnect signals
         self.collector.sigContentsChanged.disconnect(self.collectorContentsChanged)
+        self.collector.sigSliceLoading.disconnect(self.collectorSliceLoading)
         self._configTreeModel.sigItemChanged.disconnect(self.configContentsChanged)
         self.sigInspectorChanged.disconnect(self.inspectorSelectionPane.updateFromInspectorRegItem)
         self.customContextMenuRequested.disconnect(self.showContextMenu)
@@ -134,6 +135,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Must be after setInspector since that already draws the inspector
         self.collector.sigContentsChanged.connect(self.collectorContentsChanged)
+        self.collector.sigSliceLoading.connect(self.collectorSliceLoading)
         self._configTreeModel.sigItemChanged.connect(self.configContentsChanged)
 
 
@@ -545,7 +547,8 @@ class MainWindow(QtWidgets.QMainWindow):
                     self.inspector.config.setValuesFromDict(nonDefaults)
                     self._configTreeModel.insertItem(self.inspector.config, oldConfigPosition)
                     self.configWidget.configTreeView.expandBranch()
-                    self.collector.clearAndSetComboBoxes(self.inspector.axesNames())
+                    self.collector.clearAndSetComboBoxes(
+                        self.inspector.axesNames(), blockReading=self.inspector.readsBlocks())
                     centralLayout.addWidget(self.inspector)
             finally:
                 self.collector.blockSignals(oldBlockState)
@@ -593,6 +596,14 @@ class MainWindow(QtWidgets.QMainWindow):
         self.drawInspectorContents(reason=reason)
 
 
+    @QtSlot(bool)
+    def collectorSliceLoading(self, isLoading):
+        """ Slot that shows the loading indicator while the collector reads a slice.
+        """
+        if self.inspector:
+            self.inspector.setLoading(isLoading)
+
+
     @QtSlot(AbstractCti)
     def configContentsChanged(self, configTreeItem):
         """ Slot is called when an item has been changed by setData of the ConfigTreeModel.
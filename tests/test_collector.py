@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the slices that the collector reads in level of detail and region of interest mode
+
+"""
+
+import gc
+import unittest
+import numpy as np
+
+from argos.collect.collector import Collector, levelOfDetailStep
+from argos.collect.slicecache import SliceCache
+from argos.qt import QtWidgets
+from argos.repo.memoryrtis import ArrayRti
+
+
+class RecordingRti(ArrayRti):
+    """ Array RTI that records with which indices it is read.
+    """
+    def __init__(self, *args, **kwargs):
+        super(RecordingRti, self).__init__(*args, **kwargs)
+        self.reads = []
+
+    def __getitem__(self, index):
+        self.reads.append(index)
+        return super(RecordingRti, self).__getitem__(index)
+
+
+
+class TestLevelOfDetail(unittest.TestCase):
+
+    def test_step(self):
+        # Full resolution if the elements fit or if the number of pixels is unknown
+        self.assertEqual(levelOfDetailStep(100, 200), 1)
+        self.assertEqual(levelOfDetailStep(100, 100), 1)
+        self.assertEqual(levelOfDetailStep(100, None), 1)
+        self.assertEqual(levelOfDetailStep(100, 0), 1)
+
+        # The step is rounded down to a power of two. The ratio is not truncated to an integer.
+        self.assertEqual(levelOfDetailStep(199, 100), 1)
+        self.assertEqual(levelOfDetailStep(200, 100), 2)
+        self.assertEqual(levelOfDetailStep(399, 100), 2)
+        self.assertEqual(levelOfDetailStep(400, 100), 4)
+        self.assertEqual(levelOfDetailStep(10000, 3), 2048)
+        self.assertEqual(levelOfDetailStep(7, 4), 1)
+
+
+
+class TestViewportReads(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+    def setUp(self):
+        SliceCache.singleton().clear()
+        self.array = np.arange(2000 * 1500, dtype=np.float32).reshape(2000, 1500)
+        # The RTI gets an existing file name, so that its slices are cached.
+        self.rti = RecordingRti(self.array, nodeName='image', fileName=__file__)
+        self.collector = Collector(windowNumber=1)
+        # With block reading, the collector doesn't read the slices in the background, so the
+        # test only sees the reads of getSlicedArray.
+        self.collector.clearAndSetComboBoxes(['Y', 'X'], blockReading=True)
+        self.collector.setRti(self.rti)
+
+
+    def tearDown(self):
+        SliceCache.singleton().clear()
+        self.collector = None
+        # Destroy the widgets while the application still exists.
+        gc.collect()
+
+
+    def test_level_of_detail_reads(self):
+        collector = self.collector
+        collector.levelOfDetailAction.setChecked(True)
+
+        # Zoomed out, the dimensions are read with a step that fits the number of pixels.
+        collector.setAxisViewRanges([(None, None, 500), (None, None, 300)], emitSignal=False)
+        slicedArray = collector.getSlicedArray()
+        self.assertEqual(self.rti.reads[-1], (slice(None, None, 4), slice(None, None, 4)))
+        np.testing.assert_array_equal(slicedArray.data, self.array[::4, ::4])
+        self.assertEqual(collector.comboSlices(), [slice(0, 2000, 4), slice(0, 1500, 4)])
+
+        # Zoomed in, the dimensions are read at full resolution again.
+        collector.setAxisViewRanges([(100, 400, 500), (100, 300, 300)], emitSignal=False)
+        slicedArray = collector.getSlicedArray()
+        self.assertEqual(self.rti.reads[-1], (slice(None), slice(None)))
+        self.assertEqual(slicedArray.shape, self.array.shape)
+
+
+    def test_region_of_interest_reads(self):
+        collector = self.collector
+        collector.regionOfInterestAction.setChecked(True)
+
+        # The visible range is extended with a margin of half its length and aligned on tiles.
+        self.assertTrue(collector.setAxisViewRanges([(600, 800, 500), (300, 400, 300)],
+                                                    emitSignal=False))
+        self.rti.reads = []
+        slicedArray = collector.getSlicedArray()
+        self.assertEqual(collector.comboSlices(), [slice(256, 1024, 1), slice(0, 512, 1)])
+        np.testing.assert_array_equal(slicedArray.data, self.array[256:1024, 0:512])
+        self.assertEqual(sorted((rows.start, cols.start) for rows, cols in self.rti.reads),
+                         [(256, 0), (256, 256), (512, 0), (512, 256), (768, 0), (768, 256)])
+
+        # Panning within the region doesn't change it.
+        self.assertFalse(collector.setAxisViewRanges([(650, 850, 500), (320, 420, 300)],
+                                                     emitSignal=False))
+        self.assertEqual(collector.comboSlices(), [slice(256, 1024, 1), slice(0, 512, 1)])
+
+        # Panning out of the region only reads the newly exposed tiles.
+        self.assertTrue(collector.setAxisViewRanges([(950, 1150, 500), (300, 400, 300)],
+                                                    emitSignal=False))
+        self.rti.reads = []
+        slicedArray = collector.getSlicedArray()
+        self.assertEqual(collector.comboSlices(), [slice(768, 1280, 1), slice(0, 512, 1)])
+        np.testing.assert_array_equal(slicedArray.data, self.array[768:1280, 0:512])
+        self.assertEqual(sorted((rows.start, cols.start) for rows, cols in self.rti.reads),
+                         [(1024, 0), (1024, 256)])
+
+        # A new step resets the region, which is then aligned on tiles of the new step.
+        collector.levelOfDetailAction.setChecked(True)
+        collector.setAxisViewRanges([(950, 1150, 50), (300, 400, 300)], emitSignal=False)
+        self.assertEqual(collector.comboSlices(), [slice(0, 2000, 4), slice(0, 512, 1)])
+        collector.setAxisViewRanges([(1100, 1300, 50), (300, 400, 300)], emitSignal=False)
+        self.assertEqual(collector.comboSlices(), [slice(0, 2000, 4), slice(0, 512, 1)])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
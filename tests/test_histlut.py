@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the histogram and the lookup tables of the color scale of the image plot
+
+"""
+
+import gc
+import unittest
+import numpy as np
+import pyqtgraph as pg
+
+import argos.inspector.pgplugins.pghistlutitem as pghistlutitem
+from argos.inspector.pgplugins.imagepyramid import PyramidImageItem
+from argos.inspector.pgplugins.pghistlutitem import (HistogramLUTItem, calculateHistogram,
+                                                     cachedLookupTable, precomputeLookupTables,
+                                                     stratifiedSample, _LOOKUP_TABLE_CACHE,
+                                                     _PRESET_LOOKUP_TABLES)
+from argos.qt import QtWidgets
+
+
+class TestHistogram(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+    def tearDown(self):
+        # Destroy the graphics items while the application still exists.
+        gc.collect()
+
+
+    def test_stratified_sample(self):
+        array = np.arange(1000 * 800).reshape(1000, 800)
+        sample = stratifiedSample(array, 10000)
+        self.assertLessEqual(sample.size, 10000)
+        self.assertGreater(sample.size, 10000 // 4)
+        self.assertTrue(np.shares_memory(sample, array))
+        self.assertIs(stratifiedSample(array, 0), array)
+        self.assertIs(stratifiedSample(array, array.size), array)
+
+
+    def test_calculate_histogram(self):
+        data = np.array([[0.0, 1.0, np.nan], [2.0, np.inf, 4.0]])
+        x, y = calculateHistogram(data)
+        self.assertEqual(y.sum(), 4) # the non-finite values are ignored
+        self.assertEqual(x[0], 0.0)
+        self.assertEqual(calculateHistogram(np.full((3, 3), np.nan)), (None, None))
+
+        # Integer data gets integer bins
+        x, y = calculateHistogram(np.arange(10))
+        np.testing.assert_array_equal(x, np.arange(10))
+        np.testing.assert_array_equal(y, np.ones(10))
+
+
+    def test_cached_per_image(self):
+        imageItem = pg.ImageItem()
+        histLutItem = HistogramLUTItem()
+        histLutItem.setImageItem(imageItem)
+
+        # A buffer that is refilled for the next image gives a new histogram.
+        buffer = np.zeros((50, 50))
+        imageItem.setImage(buffer)
+        histogram = histLutItem._cachedHistogram()
+        self.assertIs(histLutItem._cachedHistogram(), histogram)
+        buffer[...] = np.arange(2500).reshape(50, 50)
+        imageItem.setImage(buffer)
+        self.assertGreater(histLutItem._cachedHistogram()[0][-1], 2000)
+
+        # With separate histogram data, the image item may show another part of it.
+        histLutItem.setHistogramData(buffer)
+        histogram = histLutItem._cachedHistogram()
+        imageItem.setImage(buffer[::2, ::2])
+        self.assertIs(histLutItem._cachedHistogram(), histogram)
+
+        histLutItem.setHistogramSampleSize(100)
+        self.assertIsNot(histLutItem._cachedHistogram(), histogram)
+
+
+
+class TestLookupTables(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+    def tearDown(self):
+        # Destroy the graphics items while the application still exists.
+        gc.collect()
+
+
+    def test_cached_lookup_table(self):
+        gradient = pg.GradientEditorItem()
+        gradient.loadPreset('thermal')
+        lut = cachedLookupTable(gradient, 256)
+        self.assertIs(cachedLookupTable(gradient, 256), lut)
+        self.assertFalse(lut.flags.writeable)
+        np.testing.assert_array_equal(lut, gradient.getLookupTable(256))
+        self.assertIsNot(cachedLookupTable(gradient, 512), lut)
+
+        gradient.loadPreset('flame')
+        self.assertFalse(np.array_equal(cachedLookupTable(gradient, 256), lut))
+
+        precomputeLookupTables(['grey'], sizes=(64, ))
+        self.assertTrue(any(key[1] == 64 for key in _PRESET_LOOKUP_TABLES))
+
+
+    def test_lookup_table_cache_is_bounded(self):
+        orgMaxTables = pghistlutitem.MAX_CACHED_LOOKUP_TABLES
+        pghistlutitem.MAX_CACHED_LOOKUP_TABLES = 3
+        try:
+            precomputeLookupTables(['thermal'], sizes=(256, ))
+            gradient = pg.GradientEditorItem()
+            gradient.loadPreset('thermal')
+            presetLut = cachedLookupTable(gradient, 256)
+
+            # Edited gradients are cached, but only the most recently used ones are kept.
+            for n in range(10, 20):
+                cachedLookupTable(gradient, n)
+                self.assertLessEqual(len(_LOOKUP_TABLE_CACHE), 3)
+            self.assertIs(cachedLookupTable(gradient, 256), presetLut)
+        finally:
+            pghistlutitem.MAX_CACHED_LOOKUP_TABLES = orgMaxTables
+
+
+    def test_render_same_as_pyqtgraph(self):
+        gradient = pg.GradientEditorItem()
+        gradient.loadPreset('thermal')
+        lut = gradient.getLookupTable(512)
+
+        image = np.linspace(-1.0, 11.0, 40 * 30).reshape(40, 30)
+        image[3, 4] = np.nan
+        levels = [0.0, 10.0]
+
+        imageItem = PyramidImageItem()
+        imageItem.setImage(image, levels=levels, lut=lut)
+        imageItem.render()
+        self.assertIsNotNone(imageItem._lutIndices) # the np.take path was used
+        bgra = pg.imageToArray(imageItem.qimage, copy=True, transpose=False)
+
+        # makeARGB also returns the colors in BGRA order.
+        expected, _alpha = pg.functions.makeARGB(image.transpose(), lut=lut, levels=levels)
+        finite = np.isfinite(image.transpose())
+        np.testing.assert_array_equal(bgra[finite], expected[finite])
+        self.assertEqual(bgra[4, 3, 3], 0) # NaNs are transparent
+
+
+
+if __name__ == '__main__':
+    unittest.main()
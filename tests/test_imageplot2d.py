@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the cross section statistics cache of the image plot inspector
+
+"""
+
+import unittest
+import numpy as np
+
+from argos.inspector.pgplugins.imageplot2d import PgImagePlot2d, CROSS_SECTION_STATS_CACHE_SIZE
+from argos.utils.masks import ArrayWithMask
+from collections import OrderedDict
+
+
+class CrossSectionHolder(object):
+    """ Has the attributes that PgImagePlot2d.crossSectionStats uses.
+    """
+    crossSectionStats = PgImagePlot2d.__dict__['crossSectionStats']
+
+    def __init__(self, array):
+        self.slicedArray = ArrayWithMask(array, False, None)
+        self._crossSectionStats = OrderedDict()
+
+
+class TestCrossSectionStats(unittest.TestCase):
+
+    def test_lru(self):
+        size = CROSS_SECTION_STATS_CACHE_SIZE
+        holder = CrossSectionHolder(np.arange(2 * size * 4, dtype=float).reshape(2 * size, 4))
+
+        firstStats = holder.crossSectionStats(row=0)
+        self.assertIs(holder.crossSectionStats(row=0), firstStats)
+        self.assertIsNot(holder.crossSectionStats(col=0), firstStats)
+
+        for row in range(1, size - 1):
+            holder.crossSectionStats(row=row)
+        self.assertEqual(len(holder._crossSectionStats), size)
+
+        # A hit makes row 0 the most recently used, so that column 0 is evicted instead.
+        self.assertIs(holder.crossSectionStats(row=0), firstStats)
+        holder.crossSectionStats(row=size)
+        self.assertEqual(len(holder._crossSectionStats), size)
+        self.assertIn(('row', 0), holder._crossSectionStats)
+        self.assertNotIn(('col', 0), holder._crossSectionStats)
+        self.assertIs(holder.crossSectionStats(row=0), firstStats)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the multi-resolution image pyramid of the image plot
+
+"""
+
+import gc
+import time
+import unittest
+import numpy as np
+
+import argos.inspector.pgplugins.imagepyramid as imagepyramid
+from argos.inspector.pgplugins.imagepyramid import (ImagePyramid, PyramidImageItem,
+                                                    downsampleImage, numPyramidLevels)
+from argos.qt import QtCore, QtWidgets
+
+TIMEOUT = 5.0 # seconds
+
+
+def waitUntil(condition):
+    """ Waits until condition() is True. Returns False if it takes longer than TIMEOUT.
+    """
+    endTime = time.time() + TIMEOUT
+    while not condition():
+        if time.time() > endTime:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class UnbuiltPyramid(ImagePyramid):
+    """ Pyramid of which the levels are never built, as if building takes very long.
+    """
+    def _buildLevels(self, generation, image):
+        pass
+
+
+class TestImagePyramid(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+    def setUp(self):
+        self.orgSizes = (imagepyramid.PYRAMID_MIN_SIZE, imagepyramid.PYRAMID_MIN_LEVEL_SIZE,
+                         imagepyramid.PYRAMID_TILE_SIZE)
+        imagepyramid.PYRAMID_MIN_SIZE = 64 * 64
+        imagepyramid.PYRAMID_MIN_LEVEL_SIZE = 32
+        imagepyramid.PYRAMID_TILE_SIZE = 16
+
+        # Levels of 256 x 128, 128 x 64, 64 x 32 and 32 x 16 pixels.
+        self.image = np.arange(256 * 128, dtype=np.float64).reshape(256, 128)
+
+
+    def tearDown(self):
+        (imagepyramid.PYRAMID_MIN_SIZE, imagepyramid.PYRAMID_MIN_LEVEL_SIZE,
+         imagepyramid.PYRAMID_TILE_SIZE) = self.orgSizes
+        # Destroy the graphics items while the application still exists.
+        gc.collect()
+
+
+    def test_downsample(self):
+        image = np.arange(15, dtype=np.float64).reshape(3, 5)
+        image[0, 0] = np.nan
+        expected = np.array([[(1 + 5 + 6) / 3, (2 + 3 + 7 + 8) / 4, (4 + 9) / 2],
+                             [(10 + 11) / 2, (12 + 13) / 2, 14]])
+        np.testing.assert_array_equal(downsampleImage(image), expected)
+
+        self.assertTrue(np.isnan(downsampleImage(np.full((2, 2), np.nan))[0, 0]))
+        self.assertEqual(numPyramidLevels(self.image.shape), 4)
+
+
+    def test_superseded_build_is_dropped(self):
+        pyramid = ImagePyramid()
+        pyramid.setImage(self.image)
+        firstGeneration = pyramid.generation
+
+        otherImage = -self.image
+        pyramid.setImage(otherImage)
+        self.assertTrue(waitUntil(lambda: pyramid.numLevels == 4))
+
+        # A build of the previous image doesn't add its levels.
+        pyramid._buildLevels(firstGeneration, self.image)
+        self.assertEqual(pyramid.numLevels, 4)
+        np.testing.assert_array_equal(pyramid.level(1), downsampleImage(otherImage))
+
+        pyramid.clear()
+        self.assertEqual(pyramid.numLevels, 0)
+
+
+    def test_level_and_region_for_view(self):
+        imageItem = PyramidImageItem()
+        fullRect = QtCore.QRectF(0, 0, 128, 256)
+
+        # Zoomed out: four image pixels per screen pixel.
+        imageItem.setViewRect(fullRect, (4, 4))
+        imageItem.setPyramidImage(self.image, fullRect)
+        self.assertEqual(imageItem.shownRegion[0], 2)
+        self.assertEqual(imageItem.image.shape, (32, 64))
+
+        self.assertTrue(waitUntil(lambda: imageItem.pyramid.numLevels == 4))
+        self.app.processEvents()
+        self.assertFalse(imageItem.showsPreview)
+        self.assertEqual(imageItem.shownRegion, (2, 0, 64, 0, 32))
+        np.testing.assert_array_equal(imageItem.image, imageItem.pyramid.level(2).transpose())
+
+        # Zoomed in, only the visible region plus a margin is shown, aligned on the tiles.
+        imageItem.setViewRect(QtCore.QRectF(10, 10, 20, 20), (0.5, 0.5))
+        self.assertEqual(imageItem.shownRegion, (0, 0, 48, 0, 48))
+        np.testing.assert_array_equal(imageItem.image, self.image[0:48, 0:48].transpose())
+
+        # Panning within the region keeps it, panning out of it shows another region.
+        shownImage = imageItem.image
+        imageItem.setViewRect(QtCore.QRectF(15, 20, 20, 20), (0.5, 0.5))
+        self.assertIs(imageItem.image, shownImage)
+        imageItem.setViewRect(QtCore.QRectF(80, 200, 20, 20), (0.5, 0.5))
+        self.assertEqual(imageItem.shownRegion, (0, 176, 240, 64, 112))
+
+
+    def test_preview_while_building(self):
+        imageItem = PyramidImageItem()
+        fullRect = QtCore.QRectF(0, 0, 128, 256)
+        imageItem.setViewRect(fullRect, (8, 8))
+        imageItem._pyramid = UnbuiltPyramid()
+
+        imageItem.setPyramidImage(self.image, fullRect)
+        self.assertTrue(imageItem.showsPreview)
+        self.assertEqual(imageItem.shownRegion, (3, 0, 32, 0, 16))
+        np.testing.assert_array_equal(imageItem.image, self.image[::8, ::8].transpose())
+
+
+
+if __name__ == '__main__':
+    unittest.main()
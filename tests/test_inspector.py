@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the loading page of the inspectors
+
+"""
+
+import time
+import unittest
+
+from argos.inspector.abstract import AbstractInspector, LOADING_INDICATOR_DELAY
+from argos.qt import QtWidgets
+
+
+class TestLoadingPage(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+    def setUp(self):
+        self.inspector = AbstractInspector(collector=None)
+
+
+    def processEvents(self, duration):
+        """ Processes events during duration seconds.
+        """
+        endTime = time.time() + duration
+        while time.time() < endTime:
+            self.app.processEvents()
+            time.sleep(0.005)
+
+
+    def test_short_load_is_not_shown(self):
+        self.inspector.setLoading(True)
+        self.assertEqual(self.inspector.currentIndex(), AbstractInspector.CONTENTS_PAGE_IDX)
+        self.inspector.setLoading(False)
+
+        self.processEvents(2 * LOADING_INDICATOR_DELAY / 1000.0)
+        self.assertEqual(self.inspector.currentIndex(), AbstractInspector.CONTENTS_PAGE_IDX)
+
+
+    def test_long_load_is_shown_after_delay(self):
+        self.inspector.setCurrentIndex(AbstractInspector.ERROR_PAGE_IDX)
+        self.inspector.setLoading(True)
+        self.processEvents(0.7 * LOADING_INDICATOR_DELAY / 1000.0)
+        self.assertEqual(self.inspector.currentIndex(), AbstractInspector.ERROR_PAGE_IDX)
+
+        # Loading again doesn't restart the delay.
+        self.inspector.setLoading(True)
+        self.processEvents(0.5 * LOADING_INDICATOR_DELAY / 1000.0)
+        self.assertEqual(self.inspector.currentIndex(), AbstractInspector.LOADING_PAGE_IDX)
+
+        # The page that was shown before loading is restored.
+        self.inspector.setLoading(False)
+        self.assertEqual(self.inspector.currentIndex(), AbstractInspector.ERROR_PAGE_IDX)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
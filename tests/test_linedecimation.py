@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the min/max envelope decimation of the line plot
+
+"""
+
+import unittest
+import numpy as np
+
+from argos.inspector.pgplugins.linedecimation import LineDecimator, minMaxEnvelope
+
+
+class TestLineDecimation(unittest.TestCase):
+
+    def setUp(self):
+        self.data = np.sin(np.arange(200000) / 1000.0)
+        self.data[123457] = 10.0  # a single peak
+        self.data[5000:6000] = np.nan
+        self.valid = np.isfinite(self.data)
+
+
+    def test_envelope(self):
+        data = np.array([1, 5, np.nan, 2, 7, 3, -1], dtype=np.float64)
+        valid = np.isfinite(data)
+        mins, maxs = minMaxEnvelope(data, data, 3, valid=valid)
+        np.testing.assert_array_equal(mins, [1, 2, -1])
+        np.testing.assert_array_equal(maxs, [5, 7, -1])
+
+        mins, maxs = minMaxEnvelope(data, data, 2, valid=np.zeros(7, dtype=bool))
+        self.assertTrue(np.all(mins == np.inf))
+        self.assertTrue(np.all(maxs == -np.inf))
+
+
+    def test_complete_view(self):
+        decimator = LineDecimator(self.data, self.valid)
+        x, y, connect = decimator.update(0, len(self.data), 1000)
+
+        self.assertLessEqual(len(x), 4 * 1000)
+        self.assertEqual(x[0], 0)
+        self.assertEqual(x[-1], len(self.data) - 1)
+        self.assertEqual(np.nanmax(y), 10.0)
+        self.assertEqual(np.nanmin(y), np.nanmin(self.data))
+        self.assertEqual(len(connect), len(x))
+        self.assertFalse(np.any(connect[(x > 5100) & (x < 5900)]))
+
+
+    def test_zoomed_view(self):
+        decimator = LineDecimator(self.data, self.valid)
+        decimator.update(0, len(self.data), 1000)
+
+        # Zoomed in: the data points themselves are shown in the visible range.
+        x, y, connect = decimator.update(123000, 123500, 1000)
+        levelNr, groupSize, start, stop = decimator.shownRange
+        self.assertEqual((levelNr, groupSize), (0, 1))
+        self.assertTrue(start <= 123000 and 123500 <= stop)
+        inRange = (x >= start) & (x < stop)
+        np.testing.assert_array_equal(x[inRange], np.arange(start, stop))
+        np.testing.assert_array_equal(y[inRange], self.data[start:stop])
+
+        # The complete line is still spanned and the peak is present.
+        self.assertEqual(x[0], 0)
+        self.assertEqual(x[-1], len(self.data) - 1)
+        self.assertEqual(np.nanmax(y), 10.0)
+
+        # Small pans don't require a new decimation.
+        self.assertIsNone(decimator.update(123100, 123600, 1000))
+        self.assertIsNotNone(decimator.update(150000, 150500, 1000))
+
+
+    def test_index_range(self):
+        """ The view range is given in x-values, which are the indices of the data.
+        """
+        decimator = LineDecimator(self.data, self.valid)
+        self.assertEqual(decimator.indexRange(123000, 123500), (123000, 123501))
+        self.assertEqual(decimator.indexRange(123500, 123000), (123000, 123501))
+        self.assertEqual(decimator.indexRange(-10, 1e9), (0, len(self.data)))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the ring buffer and the slice player of the collector playback
+
+"""
+
+import threading
+import time
+import unittest
+import numpy as np
+
+from argos.collect.playback import RingBuffer, SlicePlayer
+from argos.collect.slicecache import SliceCache
+from argos.qt import QtWidgets
+from argos.repo.baserti import RtiMetadata
+
+TIMEOUT = 5.0 # seconds
+
+
+class ArrayRti(object):
+    """ Minimal stand-in for a repository tree item that is not backed by a file.
+    """
+    fileName = None
+
+    def __init__(self, array):
+        self.array = array
+        self.arrayShape = array.shape
+        self.metadata = RtiMetadata(isSliceable=True, arrayShape=array.shape, nDims=array.ndim,
+                                    dimensionNames=None, elementTypeName='', unit='',
+                                    missingDataValue=None)
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+
+class SlowArrayRti(ArrayRti):
+    """ Stand-in for a file-backed repository tree item of which reading takes long.
+    """
+    fileName = __file__
+    nodePath = '/slow'
+
+    def __init__(self, array, readDuration):
+        super(SlowArrayRti, self).__init__(array)
+        self.readDuration = readDuration
+
+    def __getitem__(self, index):
+        time.sleep(self.readDuration)
+        return self.array[index]
+
+
+def producerThreads():
+    """ Returns the producer threads of the slice players that are alive.
+    """
+    return [thread for thread in threading.enumerate()
+            if thread.name == "SlicePlayer" and thread.is_alive()]
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_order(self):
+        ringBuffer = RingBuffer(3)
+        for item in range(3):
+            self.assertTrue(ringBuffer.put(item))
+        self.assertEqual(len(ringBuffer), 3)
+        self.assertEqual([ringBuffer.get() for _ in range(3)], [0, 1, 2])
+        self.assertIsNone(ringBuffer.get())
+
+
+    def test_full_buffer_blocks_producer(self):
+        ringBuffer = RingBuffer(2)
+        producer = threading.Thread(target=lambda: [ringBuffer.put(item) for item in range(3)])
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(ringBuffer), 2)
+
+        self.assertEqual(ringBuffer.get(), 0)
+        producer.join(TIMEOUT)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual([ringBuffer.get(), ringBuffer.get()], [1, 2])
+
+
+    def test_close(self):
+        ringBuffer = RingBuffer(1)
+        ringBuffer.put('a')
+        results = []
+        producer = threading.Thread(target=lambda: results.append(ringBuffer.put('b')))
+        producer.start()
+        producer.join(0.1)
+        self.assertTrue(producer.is_alive())
+
+        ringBuffer.close() # wakes up the waiting producer
+        producer.join(TIMEOUT)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(results, [False])
+        self.assertTrue(ringBuffer.isClosed)
+        self.assertIsNone(ringBuffer.get())
+        self.assertFalse(ringBuffer.put('c'))
+
+
+
+class TestSlicePlayer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+    def setUp(self):
+        self.frames = []
+        self.player = SlicePlayer()
+        self.player.targetFps = 50
+        self.player.sigFrame.connect(lambda index, slicedArray: self.frames.append(index))
+        self.rti = ArrayRti(np.arange(5 * 3).reshape(5, 3))
+
+
+    def tearDown(self):
+        self.player.stop()
+
+
+    def processEvents(self, condition):
+        """ Processes events until the condition is True. Returns False after a time out.
+        """
+        endTime = time.time() + TIMEOUT
+        while not condition():
+            if time.time() > endTime:
+                return False
+            self.app.processEvents()
+            time.sleep(0.005)
+        return True
+
+
+    def test_lifecycle(self):
+        self.assertFalse(self.player.isPlaying)
+        self.player.start(self.rti, (0, slice(None)), 0, 3, 5)
+        self.assertTrue(self.player.isPlaying)
+        self.assertTrue(self.processEvents(lambda: len(self.frames) >= 8))
+
+        # The playback starts at the first index and loops. Frames may be skipped if the
+        # display can't keep up.
+        self.assertEqual(self.frames[0], 3)
+        self.assertTrue(set(self.frames) <= set(range(5)), self.frames)
+
+        # Restarting stops the previous producer first.
+        self.player.start(self.rti, (0, slice(None)), 0, 0, 5)
+        self.assertEqual(len(producerThreads()), 1)
+
+        self.player.stop()
+        self.assertFalse(self.player.isPlaying)
+        self.assertEqual(producerThreads(), [])
+
+        numFrames = len(self.frames)
+        time.sleep(0.1)
+        self.app.processEvents()
+        self.assertEqual(len(self.frames), numFrames)
+
+
+    def test_stop_during_slow_read(self):
+        rti = SlowArrayRti(np.arange(5 * 3).reshape(5, 3), readDuration=1.0)
+        numCached = len(SliceCache.singleton())
+        self.player.start(rti, (0, slice(None)), 0, 0, 5)
+        time.sleep(0.1) # the producer is now reading the first frame
+
+        # Stopping doesn't wait for the read. The producer discards its result and then ends.
+        startTime = time.time()
+        self.player.stop()
+        self.assertLess(time.time() - startTime, 0.5)
+        self.assertFalse(self.player.isPlaying)
+
+        endTime = time.time() + TIMEOUT
+        while producerThreads() and time.time() < endTime:
+            time.sleep(0.01)
+        self.assertEqual(producerThreads(), [])
+        self.app.processEvents()
+        self.assertEqual(self.frames, [])
+
+        # Playback frames are not put in the shared slice cache.
+        self.assertEqual(len(SliceCache.singleton()), numCached)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
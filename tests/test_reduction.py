@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the streaming reduction of spin box dimensions
+
+"""
+
+import unittest
+import numpy as np
+import numpy.ma as ma
+
+import argos.collect.reduction as reduction
+from argos.collect.reduction import Reduction, ReductionAccumulator, readReduction
+from argos.collect.slicecache import SliceCache
+from argos.repo.baserti import RtiMetadata
+
+
+class ArrayRti(object):
+    """ Minimal stand-in for a repository tree item that is not backed by a file.
+    """
+    fileName = None
+
+    def __init__(self, array):
+        self.array = array
+        self.arrayShape = array.shape
+        self.metadata = RtiMetadata(isSliceable=True, arrayShape=array.shape, nDims=array.ndim,
+                                    dimensionNames=None, elementTypeName='', unit='',
+                                    missingDataValue=None)
+        self.numReads = 0
+
+    def __getitem__(self, index):
+        self.numReads += 1
+        return self.array[index]
+
+
+
+class TestReduction(unittest.TestCase):
+
+    def setUp(self):
+        self.orgChunkBytes = reduction.REDUCTION_CHUNK_BYTES
+        reduction.REDUCTION_CHUNK_BYTES = 8 * 4 * 5 * 3 # Three time steps per chunk.
+
+        data = np.arange(10 * 4 * 5, dtype=np.float64).reshape(10, 4, 5)
+        data[2, 1, 1] = np.nan
+        mask = np.zeros(data.shape, dtype=bool)
+        mask[:, 0, 0] = True  # completely masked in time
+        mask[3, 2, 2] = True
+        self.array = ma.MaskedArray(data, mask=mask)
+
+
+    def tearDown(self):
+        reduction.REDUCTION_CHUNK_BYTES = self.orgChunkBytes
+
+
+    def test_streaming_reductions(self):
+        rti = ArrayRti(self.array)
+        readFunction = lambda rti, sliceTuple: rti[sliceTuple]
+
+        expectedFunctions = {'mean': ma.mean, 'max': ma.max, 'min': ma.min, 'sum': ma.sum}
+        for reducer, function in expectedFunctions.items():
+            rti.numReads = 0
+            result = readReduction(readFunction, rti, (Reduction(1, 9, reducer), slice(None),
+                                                       slice(None)))
+            self.assertEqual(rti.numReads, 3)
+            expected = function(self.array[1:9], axis=0)
+
+            # Elements are only masked if they are masked for all indices in the range.
+            self.assertTrue(np.array_equal(ma.getmaskarray(result),
+                                           np.all(self.array.mask[1:9], axis=0)))
+            valid = ~ma.getmaskarray(expected)
+            self.assertTrue(np.allclose(result.data[valid], expected.data[valid], equal_nan=True))
+            self.assertTrue(np.isnan(result.data[1, 1]), "{} should propagate NaNs".format(reducer))
+
+
+    def test_nanmean(self):
+        acc = ReductionAccumulator('nanmean', axis=0)
+        acc.add(self.array[:5])
+        acc.add(self.array[5:])
+        result = acc.result()
+        self.assertTrue(result.mask[0, 0])
+        self.assertAlmostEqual(result[1, 1], np.mean([self.array.data[t, 1, 1]
+                                                      for t in range(10) if t != 2]))
+
+
+    def test_result_is_cached(self):
+        rti = ArrayRti(self.array)
+        rti.fileName = __file__ # Only RTIs of existing files are cached.
+        rti.nodePath = '/cube'
+        cache = SliceCache()
+
+        sliceTuple = (slice(None), Reduction(0, 4, 'max'), slice(None))
+        first = cache.readSlice(rti, sliceTuple)
+        numReads = rti.numReads
+        second = cache.readSlice(rti, sliceTuple)
+        self.assertIs(first, second)
+        self.assertEqual(rti.numReads, numReads)
+        self.assertEqual(first.shape, (10, 5))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
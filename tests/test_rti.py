@@ -10,6 +10,15 @@ from argos.repo.memoryrtis import ArrayRti
 
 
 
+class InvalidUnitRti(ArrayRti):
+    """ Array RTI whose unit attribute can't be read.
+    """
+    @property
+    def unit(self):
+        raise ValueError("Invalid unit attribute")
+
+
+
 class TestUntypedCtis(unittest.TestCase):
 
     def setUp(self):
@@ -38,6 +47,35 @@ class TestUntypedCtis(unittest.TestCase):
         assert_array_equal(self.rti[slices], self.arr[slices])
 
 
+    def test_metadata(self):
+        """ The metadata is made once and discarded when the RTI is opened or closed.
+        """
+        metadata = self.rti.metadata
+        self.assertTrue(metadata.isSliceable)
+        self.assertEqual(metadata.arrayShape, (6, 4))
+        self.assertEqual(metadata.nDims, 2)
+        self.assertEqual(metadata.dimensionNames, ('Dim0', 'Dim1'))
+        self.assertEqual(metadata.elementTypeName, self.rti.elementTypeName)
+        self.assertIs(self.rti.metadata, metadata)
+
+        self.rti.open()
+        self.assertIsNot(self.rti.metadata, metadata)
+        metadata = self.rti.metadata
+        self.rti.close()
+        self.assertIsNot(self.rti.metadata, metadata)
+
+
+    def test_metadata_with_failing_property(self):
+        """ A property that raises doesn't make the other metadata unavailable.
+        """
+        rti = InvalidUnitRti(self.arr, 'invalid unit')
+        metadata = rti.metadata
+        self.assertEqual(metadata.unit, '')
+        self.assertTrue(metadata.isSliceable)
+        self.assertEqual(metadata.arrayShape, (6, 4))
+        self.assertEqual(metadata.elementTypeName, rti.elementTypeName)
+
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the slice cache that is shared by the collectors
+
+"""
+
+import unittest
+import numpy as np
+import numpy.ma as ma
+
+from argos.collect.slicecache import SliceCache, sliceKey, regionTiles, REGION_TILE_SIZE
+from argos.repo.baserti import RtiMetadata
+from argos.utils.masks import PackedMask, MissingValueMask
+
+
+class ArrayRti(object):
+    """ Minimal stand-in for a repository tree item that is not backed by a file.
+    """
+    fileName = None
+
+    def __init__(self, array, missingDataValue=None):
+        self.array = array
+        self.arrayShape = array.shape
+        self.metadata = RtiMetadata(isSliceable=True, arrayShape=array.shape, nDims=array.ndim,
+                                    dimensionNames=None, elementTypeName='', unit='',
+                                    missingDataValue=missingDataValue)
+
+    def __getitem__(self, index):
+        return self.array[index]
+
+
+class FileRti(ArrayRti):
+    """ Stand-in for an RTI that is backed by a (fictitious) file.
+    """
+    fileName = 'array.h5'
+    nodePath = '/array'
+
+
+class CountingSliceCache(SliceCache):
+    """ Slice cache that counts how often the modification time of the file is determined.
+    """
+    def __init__(self, *args, **kwargs):
+        super(CountingSliceCache, self).__init__(*args, **kwargs)
+        self.numModificationTimeCalls = 0
+
+    def fileModificationTime(self, rti):
+        self.numModificationTimeCalls += 1
+        return 1.0
+
+
+class TestSliceCache(unittest.TestCase):
+
+    def test_slice_key(self):
+        key = sliceKey((slice(None), 3, slice(1, 5, 2)))
+        self.assertEqual(hash(key), hash(sliceKey((slice(None), 3, slice(1, 5, 2)))))
+        self.assertNotEqual(key, sliceKey((slice(None), 4, slice(1, 5, 2))))
+
+
+    def test_hits_and_misses(self):
+        cache = SliceCache(maxBytes=1000)
+        arr = np.arange(10, dtype=np.int64)
+
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', arr)
+        self.assertIs(cache.get('a'), arr)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.numBytes, 80)
+
+
+    def test_memory_budget(self):
+        cache = SliceCache(maxBytes=200)
+        for key in 'abc':
+            cache.put(key, np.zeros(10, dtype=np.int64)) # 80 bytes each
+
+        # The least recently used entry is discarded
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+
+        # Getting an entry makes it the most recently used one
+        cache.put('f', np.zeros(10, dtype=np.int64))
+        self.assertIsNone(cache.get('c'))
+        self.assertIsNotNone(cache.get('b'))
+
+        # Masks are included in the budget
+        cache.put('d', ma.MaskedArray(np.zeros(10, dtype=np.int64), mask=np.zeros(10, dtype=bool)))
+        self.assertEqual(cache.numBytes, 80 + 90)
+
+        # Arrays that are larger than the budget are not cached.
+        cache.put('e', np.zeros(100, dtype=np.int64))
+        self.assertIsNone(cache.get('e'))
+
+        cache.maxBytes = 100
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.numBytes, 100)
+
+
+    def test_region_tiles(self):
+        tiles = regionTiles(slice(REGION_TILE_SIZE - 2, 2 * REGION_TILE_SIZE + 5, 1))
+        self.assertEqual(tiles, [slice(REGION_TILE_SIZE - 2, REGION_TILE_SIZE, 1),
+                                 slice(REGION_TILE_SIZE, 2 * REGION_TILE_SIZE, 1),
+                                 slice(2 * REGION_TILE_SIZE, 2 * REGION_TILE_SIZE + 5, 1)])
+
+        # With a step the tiles still contain REGION_TILE_SIZE elements
+        tiles = regionTiles(slice(0, 4 * REGION_TILE_SIZE, 2))
+        self.assertEqual(len(tiles), 2)
+
+
+    def test_read_region(self):
+        data = np.arange(600 * 3 * 700).reshape(600, 3, 700)
+        array = ma.MaskedArray(data, mask=(data % 7 == 0))
+        rti = ArrayRti(array)
+        cache = SliceCache()
+
+        sliceTuple = (slice(100, 550, 3), 1, slice(200, 650, 2))
+        region = cache.readSlice(rti, sliceTuple)
+        expected = array[sliceTuple]
+        self.assertEqual(region.shape, expected.shape)
+        self.assertTrue(np.array_equal(region.data, expected.data))
+        self.assertTrue(np.array_equal(region.mask, ma.getmaskarray(expected)))
+
+        # The region of unmasked tiles has a boolean mask
+        region = cache.readSlice(ArrayRti(data), sliceTuple)
+        self.assertIs(region.storedMask, False)
+
+
+    def test_compact_masks_are_cached(self):
+        data = np.arange(300 * 200).reshape(300, 200) % 11
+        cache = CountingSliceCache()
+
+        rti = FileRti(ma.MaskedArray(data, mask=(data == 3)), missingDataValue=3)
+        awm = cache.readSlice(rti, (slice(None), slice(None)))
+        self.assertIsInstance(awm.storedMask, MissingValueMask)
+        self.assertEqual(cache.numBytes, data.nbytes) # the mask takes no memory
+
+        cache.clear()
+        rti = FileRti(ma.MaskedArray(data, mask=(data % 5 == 0)), missingDataValue=3)
+        awm = cache.readSlice(rti, (slice(None), slice(None)))
+        self.assertIsInstance(awm.storedMask, PackedMask)
+        self.assertTrue(np.array_equal(awm.mask, data % 5 == 0))
+        self.assertEqual(cache.numBytes, data.nbytes + data.size // 8)
+        self.assertIs(cache.readSlice(rti, (slice(None), slice(None))), awm)
+
+
+    def test_modification_time_once_per_region(self):
+        rti = FileRti(np.arange(1000 * 1000).reshape(1000, 1000))
+        cache = CountingSliceCache()
+
+        sliceTuple = (slice(0, 1000), slice(0, 1000))
+        self.assertFalse(cache.isCached(rti, sliceTuple))
+        self.assertEqual(cache.numModificationTimeCalls, 1)
+
+        cache.readSlice(rti, sliceTuple)
+        self.assertEqual(cache.numModificationTimeCalls, 2)
+        self.assertEqual(len(cache), 16) # all tiles are cached
+
+        self.assertTrue(cache.isCached(rti, sliceTuple))
+        self.assertEqual(cache.numModificationTimeCalls, 3)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
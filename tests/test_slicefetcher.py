@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the slice fetcher that reads slices in a worker thread
+
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+import numpy as np
+
+from argos.collect.slicecache import SliceCache
+from argos.collect.slicefetcher import SliceFetcher
+from argos.qt import Qt
+from argos.repo.baserti import RtiMetadata
+
+TIMEOUT = 5.0 # seconds
+
+
+class RecordingRti(object):
+    """ Minimal stand-in for a repository tree item that records which slices are read.
+
+        Reading blocks until the gate is set, so that tests can queue requests while the worker
+        is busy.
+    """
+    nodePath = '/array'
+
+    def __init__(self, array, fileName=None):
+        self.array = array
+        self.arrayShape = array.shape
+        self.metadata = RtiMetadata(isSliceable=True, arrayShape=array.shape, nDims=array.ndim,
+                                    dimensionNames=None, elementTypeName='', unit='',
+                                    missingDataValue=None)
+        self.fileName = fileName
+        self.reads = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __getitem__(self, index):
+        self.gate.wait(TIMEOUT)
+        self.reads.append(index)
+        return self.array[index]
+
+
+def waitUntil(condition):
+    """ Waits until condition() is True. Returns False if it takes longer than TIMEOUT.
+    """
+    endTime = time.time() + TIMEOUT
+    while not condition():
+        if time.time() > endTime:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestSliceFetcher(unittest.TestCase):
+
+    def setUp(self):
+        SliceCache.singleton().clear()
+        self.fetched = []
+        self.fetcher = SliceFetcher()
+        # Direct connection: the tests have no event loop to deliver queued signals.
+        self.fetcher.sigSliceFetched.connect(self.sliceFetched, type=Qt.DirectConnection)
+
+
+    def tearDown(self):
+        SliceCache.singleton().clear()
+
+
+    def sliceFetched(self, requestNr, slicedArray, exception):
+        self.fetched.append((requestNr, slicedArray, exception))
+
+
+    def test_superseded_requests(self):
+        rti = RecordingRti(np.arange(50).reshape(5, 10))
+        rti.gate.clear()
+
+        firstNr = self.fetcher.request(rti, (0,))
+        self.assertTrue(waitUntil(lambda: self.fetcher._pending is None)) # first is being read
+        secondNr = self.fetcher.request(rti, (1,))
+        thirdNr = self.fetcher.request(rti, (2,))
+        self.assertFalse(self.fetcher.isCurrent(firstNr))
+        self.assertFalse(self.fetcher.isCurrent(secondNr))
+        self.assertTrue(self.fetcher.isCurrent(thirdNr))
+
+        rti.gate.set()
+        self.assertTrue(waitUntil(lambda: len(self.fetched) == 2))
+        self.assertEqual(rti.reads, [(0,), (2,)]) # the second request was dropped unread
+        self.assertEqual([requestNr for requestNr, _, _ in self.fetched], [firstNr, thirdNr])
+        np.testing.assert_array_equal(self.fetched[1][1].data, rti.array[2])
+
+        self.fetcher.cancel()
+        self.assertFalse(self.fetcher.isCurrent(thirdNr))
+
+
+    def test_prefetch_cap(self):
+        fileHandle, fileName = tempfile.mkstemp()
+        os.close(fileHandle)
+        try:
+            rti = RecordingRti(np.zeros((20, 10), dtype=np.int64), fileName=fileName)
+            sliceTuples = [(row,) for row in range(20)]
+            self.fetcher.prefetch(rti, sliceTuples, maxBytes=200) # each slice has 80 bytes
+
+            # The queue is emptied when the third slice brings the total over the cap.
+            self.assertTrue(waitUntil(lambda: not self.fetcher._prefetchQueue))
+            self.assertEqual(rti.reads, [(0,), (1,), (2,)])
+            self.assertTrue(SliceCache.singleton().isCached(rti, (2,)))
+            self.assertFalse(SliceCache.singleton().isCached(rti, (3,)))
+            self.assertEqual(self.fetched, []) # no signals for prefetched slices
+        finally:
+            os.remove(fileName)
+
+
+    def test_prefetch_cancel_and_replace(self):
+        fileHandle, fileName = tempfile.mkstemp()
+        os.close(fileHandle)
+        try:
+            rti = RecordingRti(np.zeros((20, 10), dtype=np.int64), fileName=fileName)
+            rti.gate.clear()
+            self.fetcher.prefetch(rti, [(row,) for row in range(5)], maxBytes=10000)
+            self.assertTrue(waitUntil(lambda: len(self.fetcher._prefetchQueue) == 4))
+
+            # A new position replaces the slices that are still waiting.
+            self.fetcher.prefetch(rti, [(10,), (11,)], maxBytes=10000)
+            rti.gate.set()
+            self.assertTrue(waitUntil(lambda: len(rti.reads) == 3))
+            self.assertEqual(rti.reads, [(0,), (10,), (11,)])
+
+            # Cancelling drops the slices that are still waiting.
+            rti.gate.clear()
+            self.fetcher.prefetch(rti, [(15,), (16,), (17,)], maxBytes=10000)
+            self.assertTrue(waitUntil(lambda: len(self.fetcher._prefetchQueue) == 2))
+            self.fetcher.cancelPrefetch()
+            rti.gate.set()
+            self.assertTrue(waitUntil(lambda: len(rti.reads) == 4))
+            time.sleep(0.1)
+            self.assertEqual(rti.reads, [(0,), (10,), (11,), (15,)])
+        finally:
+            os.remove(fileName)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the streaming export of the table inspector
+
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import h5py
+import numpy as np
+
+from argos.inspector.qtplugins.tableexport import (exportTable, exportStrips, CsvTableWriter,
+                                                   NpyTableWriter, Hdf5TableWriter)
+from argos.utils.masks import ArrayWithMask
+
+
+class TestTableExport(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.array = np.arange(1000 * 30, dtype=np.float64).reshape(1000, 30)
+        self.mask = np.zeros(self.array.shape, dtype=bool)
+        self.mask[10, 3] = True
+        self.readRows = []
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+
+    def readStrip(self, rowStart, rowStop):
+        self.readRows.append((rowStart, rowStop))
+        return ArrayWithMask(self.array[rowStart:rowStop], self.mask[rowStart:rowStop], -1.0)
+
+
+    def export(self, writer, **kwargs):
+        return exportTable(self.readStrip, self.array.shape[0], self.array.shape[1], writer,
+                           maxBytes=30 * 8 * 100, **kwargs)
+
+
+    def test_strips(self):
+        self.assertEqual(exportStrips(250, 10, 8, maxBytes=800),
+                         [(row, row + 10) for row in range(0, 250, 10)])
+        self.assertEqual(exportStrips(25, 10, 8, maxBytes=800), [(0, 10), (10, 20), (20, 25)])
+        self.assertEqual(exportStrips(3, 1000, 8, maxBytes=800), [(0, 1), (1, 2), (2, 3)])
+
+
+    def test_npy(self):
+        fileName = os.path.join(self.tempDir, 'table.npy')
+        self.assertTrue(self.export(NpyTableWriter(fileName)))
+        self.assertEqual(max(rowStop - rowStart for rowStart, rowStop in self.readRows), 100)
+
+        expected = self.array.copy()
+        expected[10, 3] = -1.0 # masked values are replaced by the fill value
+        np.testing.assert_array_equal(np.load(fileName), expected)
+
+
+    def test_hdf5(self):
+        fileName = os.path.join(self.tempDir, 'table.h5')
+        self.assertTrue(self.export(Hdf5TableWriter(fileName, 'group/table')))
+        with h5py.File(fileName, 'r') as h5File:
+            dataset = h5File['group/table']
+            self.assertEqual(dataset.attrs['_FillValue'], -1.0)
+            self.assertEqual(dataset[10, 3], -1.0)
+            np.testing.assert_array_equal(dataset[11:], self.array[11:])
+
+        # The dataset can't be overwritten
+        self.assertRaises(ValueError, self.export, Hdf5TableWriter(fileName, 'group/table'))
+
+
+    def test_csv(self):
+        fileName = os.path.join(self.tempDir, 'table.csv')
+        self.assertTrue(self.export(CsvTableWriter(fileName)))
+        with open(fileName, newline='') as csvFile:
+            rows = list(csv.reader(csvFile))
+
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual(rows[10][3], '')
+        self.assertEqual([float(value) for value in rows[999]], list(self.array[999]))
+
+
+    def test_csv_structured(self):
+        self.array = np.zeros((5, 2), dtype=[('a', np.int32), ('b', 'S3')])
+        self.array['a'] = np.arange(10).reshape(5, 2)
+        self.array['b'] = b'xy'
+        self.mask = np.zeros(self.array.shape, dtype=[('a', bool), ('b', bool)])
+        self.mask['b'][4, 1] = True
+
+        fileName = os.path.join(self.tempDir, 'table.csv')
+        self.assertTrue(self.export(CsvTableWriter(fileName)))
+        with open(fileName, newline='') as csvFile:
+            rows = list(csv.reader(csvFile))
+
+        self.assertEqual(rows[0], ['0 : a', '0 : b', '1 : a', '1 : b'])
+        self.assertEqual(rows[1], ['0', 'xy', '1', 'xy'])
+        self.assertEqual(rows[5], ['8', 'xy', '9', ''])
+
+
+    def test_cancel(self):
+        fileName = os.path.join(self.tempDir, 'table.npy')
+        progressRows = []
+        def progress(rowsDone):
+            progressRows.append(rowsDone)
+            return rowsDone < 300
+
+        self.assertFalse(self.export(NpyTableWriter(fileName), progress=progress))
+        self.assertEqual(progressRows, [0, 100, 200, 300])
+        self.assertFalse(os.path.exists(fileName))
+
+
+    def test_cancel_hdf5(self):
+        cancel = lambda rowsDone: rowsDone < 300
+
+        # A file that was created by the export is removed.
+        fileName = os.path.join(self.tempDir, 'table.h5')
+        self.assertFalse(self.export(Hdf5TableWriter(fileName, 'table'), progress=cancel))
+        self.assertFalse(os.path.exists(fileName))
+
+        # From an existing file only the new dataset is removed.
+        with h5py.File(fileName, 'w') as h5File:
+            h5File['other'] = np.arange(3)
+        self.assertFalse(self.export(Hdf5TableWriter(fileName, 'table'), progress=cancel))
+        with h5py.File(fileName, 'r') as h5File:
+            self.assertEqual(list(h5File.keys()), ['other'])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
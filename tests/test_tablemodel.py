@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Tests the block reading of the table inspector model
+
+"""
+
+import unittest
+import numpy as np
+
+from argos.inspector.qtplugins.table import (TableInspectorModel, TABLE_BLOCK_SIZE,
+                                             TABLE_MAX_BLOCKS, formatCells, allMaskedCells)
+from argos.utils.cls import to_string
+from argos.utils.masks import ArrayWithMask
+
+
+def setFormats(model):
+    """ Sets the formats of the model, as the table inspector does from its config.
+    """
+    model.strFormat = model.intFormat = model.numFormat = model.otherFormat = '{}'
+    model.maskFormat = '--'
+
+
+class TestTableInspectorModel(unittest.TestCase):
+
+    def setUp(self):
+        self.array = np.arange(2000 * 1500).reshape(2000, 1500)
+        self.readBlocks = []
+        self.prefetchedBlocks = []
+
+        self.model = TableInspectorModel()
+        setFormats(self.model)
+        self.model.updateState(self.readBlock, {}, True, shape=self.array.shape,
+                               prefetchBlocks=self.prefetchedBlocks.extend)
+
+
+    def readBlock(self, blockSlices):
+        rowSlice, colSlice = blockSlices
+        self.readBlocks.append((rowSlice.start, colSlice.start))
+        return ArrayWithMask(self.array[rowSlice, colSlice], False, None)
+
+
+    def test_blocks_are_read_on_demand(self):
+        self.assertEqual(self.readBlocks, [(0, 0)]) # the first block determines the dtype
+
+        self.assertEqual(self.model.data(self.model.index(1999, 1499)), str(1999 * 1500 + 1499))
+        self.assertEqual(self.model.data(self.model.index(1998, 1490)), str(1998 * 1500 + 1490))
+        self.assertEqual(len(self.readBlocks), 2)
+        self.assertEqual(self.readBlocks[-1], (1792, 1280))
+        self.assertIsNone(self.model.data(self.model.index(2000, 0)))
+
+
+    def test_lru_and_read_ahead(self):
+        for row in range(0, 2000, TABLE_BLOCK_SIZE):
+            for col in range(0, 1500, TABLE_BLOCK_SIZE):
+                self.model.data(self.model.index(row, col))
+        self.assertLessEqual(len(self.model._blocks), TABLE_MAX_BLOCKS)
+
+        # Scrolling down prefetches the blocks below.
+        del self.prefetchedBlocks[:]
+        self.model.updateState(self.readBlock, {}, True, shape=self.array.shape,
+                               prefetchBlocks=self.prefetchedBlocks.extend)
+        self.model.data(self.model.index(TABLE_BLOCK_SIZE, 0))
+        self.assertEqual([(rowSlice.start, colSlice.start)
+                          for rowSlice, colSlice in self.prefetchedBlocks],
+                         [(2 * TABLE_BLOCK_SIZE, 0), (3 * TABLE_BLOCK_SIZE, 0)])
+
+
+    def test_cell_strings(self):
+        strings = self.model.cellStrings([0, 1999], [1, 1499, 1500])
+        self.assertEqual(strings.shape, (2, 3))
+        for (i, row), (j, col) in [((0, 0), (0, 1)), ((1, 1999), (0, 1)), ((1, 1999), (1, 1499))]:
+            self.assertEqual(strings[i, j], self.model.data(self.model.index(row, col)))
+        self.assertTrue(all(string is None for string in strings[:, 2])) # outside the table
+
+
+    def test_separate_fields(self):
+        dtype = np.dtype([('a', np.int32), ('b', np.float64)])
+        array = np.zeros((300, 10), dtype=dtype)
+        array['a'] = np.arange(3000).reshape(300, 10)
+        array['b'] = array['a'] / 2
+        mask = np.zeros(array.shape, dtype=[('a', bool), ('b', bool)])
+        mask['b'][299, 9] = True
+
+        def readBlock(blockSlices):
+            return ArrayWithMask(array[tuple(blockSlices)], mask[tuple(blockSlices)], None)
+
+        rtiInfo = {'x-dim': 'dim-1', 'y-dim': 'dim-0'}
+        model = TableInspectorModel()
+        setFormats(model)
+        model.updateState(readBlock, rtiInfo, True, shape=array.shape)
+        self.assertEqual(model.columnCount(), 20)
+
+        blockRow, row = divmod(299, TABLE_BLOCK_SIZE)
+        values, masked = model._block(blockRow, 0).field('a')
+        self.assertEqual(values[row, 9], 2999)
+        self.assertFalse(masked[row, 9])
+        values, masked = model._block(blockRow, 0).field('b')
+        self.assertEqual(values[row, 9], 1499.5)
+        self.assertTrue(masked[row, 9])
+        self.assertEqual(model.data(model.index(299, 19)), '--')
+
+        formatted, row, col = model._formattedCell(model.index(299, 18))
+        self.assertEqual(formatted.strings[row, col], model.data(model.index(299, 18)))
+        self.assertFalse(formatted.masked[row, col])
+        formatted, row, col = model._formattedCell(model.index(299, 19))
+        self.assertTrue(formatted.masked[row, col])
+
+
+
+
+class TestFormatCells(unittest.TestCase):
+
+    def test_same_as_to_string(self):
+        """ formatCells should give the same strings as to_string does for each cell.
+        """
+        arrays = [np.linspace(-1e5, 1e5, 12).reshape(3, 4),
+                  np.linspace(-1e5, 1e5, 12).reshape(3, 4).astype(np.float32),
+                  np.arange(12, dtype=np.int16).reshape(3, 4),
+                  np.arange(12).reshape(3, 4) % 3 == 0,
+                  np.array([[b'ab', b'\xff'], [b'', b'cd']]),
+                  np.array([[u'ab', u'c'], [u'', u'de']]),
+                  np.array([[1, 'a'], [None, 2.5]], dtype=object)]
+
+        formatsList = [dict(strFormat='{}', intFormat='{}', numFormat='{}', otherFormat='{}',
+                            maskFormat='{!r}'),
+                       dict(strFormat='{!r}', intFormat='{:#x}', numFormat='{:8.3e}',
+                            otherFormat='{!r}', maskFormat='--')]
+
+        for array in arrays:
+            mask = np.zeros(array.shape, dtype=bool)
+            mask[0, 1] = True
+            masked = allMaskedCells(mask, array.shape)
+            for formats in formatsList:
+                strings = formatCells(array, masked, encoding='utf-8', **formats)
+                for idx in np.ndindex(*array.shape):
+                    self.assertEqual(strings[idx], to_string(array[idx], masked=masked[idx],
+                                                             decode_bytes='utf-8', **formats))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
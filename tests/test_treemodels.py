@@ -52,6 +52,41 @@ class TestTreeItemGetByPath(unittest.TestCase):
         self.assertRaises(TypeError, self.rootItem.findByNodePath, 444)
 
 
+class TestTreeItemChildNumber(unittest.TestCase):
+
+    def setUp(self):
+        self.rootItem = BaseTreeItem('root')
+        for idx in range(5):
+            self.rootItem.insertChild(BaseTreeItem('item{}'.format(idx)))
+
+
+    def checkChildNumbers(self):
+        for row, childItem in enumerate(self.rootItem.childItems):
+            self.assertEqual(childItem.childNumber(), row)
+
+
+    def testInsertAndRemove(self):
+        self.checkChildNumbers()
+        self.assertEqual(self.rootItem.childNumber(), 0)
+
+        self.rootItem.insertChild(BaseTreeItem('first'), position=0)
+        self.rootItem.insertChild(BaseTreeItem('middle'), position=3)
+        self.checkChildNumbers()
+
+        removedItem = self.rootItem.child(2)
+        self.rootItem.removeChild(2)
+        self.checkChildNumbers()
+        self.assertRaises(ValueError, removedItem.childNumber)
+
+
+    def testChildItemsChangedDirectly(self):
+        """ The row numbers are renewed if the list of children was changed directly
+        """
+        self.rootItem.childItems.reverse()
+        self.checkChildNumbers()
+
+
+
 class TestGetByPath(unittest.TestCase):
 
 
@@ -124,6 +159,26 @@ class TestGetByPath(unittest.TestCase):
         self.assertRaises(TypeError, self.getLastItem, 444)
 
 
+    def testInsertItems(self):
+        insertedRows = []
+        self.model.rowsInserted.connect(lambda _parent, first, last:
+                                        insertedRows.append((first, last)))
+
+        items = [BaseTreeItem('bulk{}'.format(idx)) for idx in range(3)]
+        self.model.insertItems(items, position=1, parentIndex=self.index0)
+        self.assertEqual(insertedRows, [(1, 3)])
+
+        self.assertEqual([item.nodeName for item in self.item0.childItems],
+                         ['item1', 'bulk0', 'bulk1', 'bulk2', 'item1a'])
+        for row, item in enumerate(self.item0.childItems):
+            self.assertEqual(item.childNumber(), row)
+
+        checkItem, checkIndex = self.getLastItem('item0/bulk2')
+        self.assertIs(checkItem, items[2])
+        self.assertEqual(checkItem.nodePath, '/item0/bulk2')
+        self.assertEqual(checkIndex.row(), 3)
+
+
     def testLastPathItemStartAtIndex(self):
 
         # Sanity check
@@ -9,6 +9,11 @@ import unittest
 
 from argos.utils.cls import is_a_string, is_text, is_binary
 from argos.utils.misc import python2
+from argos.utils.masks import ArrayWithMask, replaceMaskedValue, maskedEqual
+from argos.utils.masks import PackedMask, MissingValueMask, compactMask, DisplayBufferPool
+from argos.utils.masks import SliceStats, ApproximateSliceStats
+import argos.utils.masks as masks
+import numpy.ma as ma
 import numpy as np
 
 
@@ -105,7 +110,226 @@ class TestStringTypeDetection(unittest.TestCase):
         pass
 
 
-if __name__ == '__main__':
-    unittest.main()
+class TestArrayWithMask(unittest.TestCase):
+
+    def test_copy_on_write(self):
+        data = np.arange(6, dtype=np.float64).reshape(2, 3)
+        awm = ArrayWithMask(data, np.array([[False, True, False], [False, False, False]]), None)
+        awm.setReadOnly()
+        self.assertTrue(awm.isReadOnly)
+
+        awm.replaceMaskedValueWithNan()
+        self.assertFalse(awm.isReadOnly)
+        self.assertTrue(np.isnan(awm.data[0, 1]))
+        self.assertEqual(data[0, 1], 1.0) # the original is untouched
+
+
+    def test_read_only_without_masked_values(self):
+        data = np.arange(3, dtype=np.float64)
+        awm = ArrayWithMask(data, False, None)
+        awm.setReadOnly()
+        awm.replaceMaskedValue(-1)
+        self.assertIs(awm.data, data) # No copy needed
 
+        mask = np.array([False, False, True])
+        result = replaceMaskedValue(awm.data, mask, -1, copyOnReplace=False)
+        self.assertEqual(result[2], -1)
+        self.assertEqual(data[2], 2.0)
 
+
+
+class TestCompactMasks(unittest.TestCase):
+
+    def setUp(self):
+        self.data = np.arange(2 * 3 * 5).reshape(2, 3, 5) % 7
+        self.mask = (self.data == 3)
+
+
+    def test_packed_mask(self):
+        packed = PackedMask.fromArray(self.mask)
+        self.assertEqual(packed.nbytes, 4) # 30 bits
+        self.assertTrue(np.array_equal(packed.expand(), self.mask))
+
+        transposed = packed.transpose((2, 0, 1))
+        expected = np.transpose(self.mask, (2, 0, 1))
+        self.assertEqual(transposed.shape, expected.shape)
+        self.assertTrue(np.array_equal(transposed.expand(), expected))
+
+        for index in [(1, 0, 2), (slice(None), 1), (3, slice(1, None), slice(None, None, 2)),
+                      (Ellipsis, 1)]:
+            self.assertTrue(np.array_equal(transposed[index], expected[index]),
+                            "Mismatch for index: {}".format(index))
+
+
+    def test_compact_mask(self):
+        self.assertIs(compactMask(np.zeros((3, 4), dtype=bool)), False)
+        self.assertIs(compactMask(np.ones((3, 4), dtype=bool)), True)
+        self.assertIsInstance(compactMask(self.mask), PackedMask)
+
+        missingValueMask = compactMask(self.mask, data=self.data, missingValue=3)
+        self.assertIsInstance(missingValueMask, MissingValueMask)
+        self.assertTrue(np.array_equal(missingValueMask[1, :, 2], self.mask[1, :, 2]))
+
+        # The data is compared block by block.
+        orgBlockSize = masks.COMPARE_BLOCK_SIZE
+        masks.COMPARE_BLOCK_SIZE = 5 # One row per block
+        try:
+            self.assertIsInstance(compactMask(self.mask, data=self.data, missingValue=3),
+                                  MissingValueMask)
+            otherMask = self.mask.copy()
+            otherMask[1, 2, 4] = True
+            self.assertIsInstance(compactMask(otherMask, data=self.data, missingValue=3),
+                                  PackedMask)
+        finally:
+            masks.COMPARE_BLOCK_SIZE = orgBlockSize
+
+
+    def test_copy_and_expand_dims(self):
+        packed = PackedMask.fromArray(self.mask).transpose((2, 0, 1))
+        expected = np.expand_dims(np.transpose(self.mask, (2, 0, 1)), 1)
+        self.assertTrue(np.array_equal(packed.expandDims(1).expand(), expected))
+        self.assertTrue(np.array_equal(packed.expandDims(1)[:, 0, 1], expected[:, 0, 1]))
+
+        awm = ArrayWithMask(self.data, self.mask, None)
+        awm.compactMask(missingValue=3)
+        copied = awm.copy()
+        self.assertIsInstance(copied.storedMask, MissingValueMask)
+        copied.data[self.mask] = 0 # The mask of the original is not affected.
+        self.assertTrue(np.array_equal(awm.mask, self.mask))
+        self.assertEqual(awm.expandDims(3).maskAt((Ellipsis, 0)).shape, self.mask.shape)
+
+
+    def test_array_with_mask(self):
+        awm = ArrayWithMask(self.data.astype(np.float64), self.mask, None)
+        awm.compactMask(missingValue=3)
+        awm.setReadOnly()
+        awm = awm.transpose()
+        self.assertTrue(awm.hasCompactMask)
+        self.assertTrue(np.array_equal(awm.maskAt((slice(None), 2)), self.mask.T[:, 2]))
+
+        # The mask remains valid after the masked values have been replaced.
+        awm.replaceMaskedValueWithNan()
+        self.assertTrue(np.array_equal(awm.mask, self.mask.T))
+        self.assertTrue(np.all(np.isnan(awm.data[self.mask.T])))
+
+        scalarMask = ArrayWithMask(self.data, False, None).maskIndex()
+        self.assertEqual(scalarMask.shape, self.data.shape)
+        self.assertEqual(scalarMask.strides, (0, 0, 0))
+
+
+    def test_display_buffer(self):
+        orgBlockSize = masks.DISPLAY_BLOCK_SIZE
+        masks.DISPLAY_BLOCK_SIZE = 10 # Two rows of 5 elements per block.
+        try:
+            data = self.data[0].astype(np.float32).T.copy()  # 5 x 3
+            data[4, 0] = np.inf
+            expected = np.where(self.mask[0].T | np.isinf(data), np.nan, data)
+
+            pool = DisplayBufferPool()
+            for mask in [self.mask[0].T, PackedMask.fromArray(self.mask[0].T)]:
+                displayArray = pool.displayArray(ArrayWithMask(data, mask, None))
+                self.assertEqual(displayArray.dtype, np.float32)
+                self.assertTrue(np.array_equal(displayArray, expected, equal_nan=True))
+
+            # Arrays of the same shape alternate between two buffers.
+            otherArray = pool.displayArray(ArrayWithMask(data, False, None))
+            self.assertIsNot(otherArray, displayArray)
+            self.assertIs(pool.displayArray(ArrayWithMask(data, False, None)), displayArray)
+            self.assertIs(pool.displayArray(ArrayWithMask(data, False, None)), otherArray)
+            self.assertTrue(np.all(np.isnan(pool.displayArray(ArrayWithMask(data, True, None)))))
+        finally:
+            masks.DISPLAY_BLOCK_SIZE = orgBlockSize
+
+
+    def test_slice_stats(self):
+        data = self.data.astype(np.float64)
+        data[0, 1, 1] = np.nan
+        orgData = data.copy()
+        awm = ArrayWithMask(data, self.mask, None)
+        stats = awm.stats
+        self.assertIs(awm.transpose().stats, stats)
+
+        validData = data[~self.mask & ~np.isnan(data)]
+        self.assertEqual(stats.count, len(validData))
+        self.assertEqual(stats.discardedRange(0), (np.min(validData), np.max(validData)))
+        for percentage in [0.1, 2, 10, 50]:
+            self.assertTrue(np.allclose(stats.discardedRange(percentage),
+                                        np.percentile(validData, (percentage, 100 - percentage))))
+        self.assertTrue(np.array_equal(data, orgData, equal_nan=True),
+                        "The data should not be reordered")
+
+        # The statistics of a compact mask are the same.
+        compactAwm = ArrayWithMask(data, PackedMask.fromArray(self.mask), None)
+        self.assertEqual(compactAwm.stats.percentiles([2, 50, 98]), stats.percentiles([2, 50, 98]))
+
+        # The statistics are recalculated when the mask is replaced.
+        awm.mask = True
+        self.assertEqual(awm.stats.count, 0)
+        self.assertTrue(np.all(np.isnan(awm.stats.discardedRange(1))))
+
+
+    def test_approximate_slice_stats(self):
+        orgBlockSize = masks.STATS_BLOCK_SIZE
+        masks.STATS_BLOCK_SIZE = 1000 # Ten rows per block
+        try:
+            data = np.random.RandomState(42).normal(size=(95, 100)).astype(np.float32)
+            data[3, 4] = np.nan
+            data[5, 6] = np.inf
+            mask = np.zeros(data.shape, dtype=bool)
+            mask[10:12] = True
+            mask[7, 8] = True
+            data[7, 8] = -np.inf  # masked, so it is ignored
+
+            for compact in [False, True]:
+                awm = ArrayWithMask(data, mask, None)
+                if compact:
+                    awm.compactMask()
+                exact = SliceStats(awm)
+                approx = ApproximateSliceStats(awm, relativeError=0.001)
+
+                self.assertEqual(approx.count, exact.count)
+                self.assertEqual(approx.discardedRange(0), exact.discardedRange(0))
+                maxError = approx.relativeError * (exact.percentile(100 * (exact.count - 2) /
+                                                                    (exact.count - 1)) - exact.min)
+                for percentage in [0.5, 1, 5, 20, 50]:
+                    for approxValue, exactValue in zip(approx.discardedRange(percentage),
+                                                       exact.discardedRange(percentage)):
+                        self.assertLessEqual(abs(approxValue - exactValue), maxError)
+        finally:
+            masks.STATS_BLOCK_SIZE = orgBlockSize
+
+
+    def test_approximate_stats_switch(self):
+        """ Only large arrays get approximate statistics, and only until the exact ones exist.
+        """
+        orgMinSize = masks.APPROXIMATE_STATS_MIN_SIZE
+        masks.APPROXIMATE_STATS_MIN_SIZE = 100
+        try:
+            small = ArrayWithMask(np.arange(100, dtype=np.float64), False, None)
+            self.assertNotIsInstance(small.approximateStats, ApproximateSliceStats)
+            self.assertIs(small.approximateStats, small.stats)
+
+            large = ArrayWithMask(np.arange(101, dtype=np.float64), False, None)
+            approx = large.approximateStats
+            self.assertIsInstance(approx, ApproximateSliceStats)
+            self.assertIs(large.approximateStats, approx)
+
+            exact = large.stats
+            self.assertIs(large.approximateStats, exact)
+        finally:
+            masks.APPROXIMATE_STATS_MIN_SIZE = orgMinSize
+
+
+    def test_masked_equal(self):
+        self.assertIs(maskedEqual(self.data, None).mask, ma.nomask)
+        self.assertIs(maskedEqual(self.data, 100).mask, ma.nomask)
+        self.assertTrue(np.array_equal(maskedEqual(self.data, 3).mask, self.mask))
+
+        structured = np.array([(1, 2.0), (3, 4.0), (1, 3.0)], dtype=[('a', 'i4'), ('b', 'f8')])
+        result = maskedEqual(structured, (1, 4.0))
+        self.assertEqual(result.mask.tolist(), [(True, False), (False, True), (True, False)])
+
+
+
+if __name__ == '__main__':
+    unittest.main()